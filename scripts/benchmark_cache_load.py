@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark loading the GeoTIFF metadata cache into a url → metadata lookup.
+
+Each mode runs in a fresh subprocess and reports wall time and the peak
+RSS the load added on top of the interpreter and imports:
+
+- iterrows   pd.read_csv + per-row coercion into a dict of dicts (the
+             loader item_create/item_reprocess used before MetadataLookup)
+- migrate    CSV → typed Parquet snapshot → MetadataLookup (first run
+             after the CSV changed)
+- snapshot   memory-mapped Parquet snapshot → MetadataLookup (steady state)
+
+Usage:
+    python scripts/benchmark_cache_load.py
+    python scripts/benchmark_cache_load.py --modes iterrows snapshot --repeat 3
+"""
+
+import argparse
+import concurrent.futures
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from metadata_cache import MetadataLookup, cache_load, cache_migrate
+from stac_utils import PATH_RESULTS_CSV, fix_url
+
+MODES = ["iterrows", "migrate", "snapshot"]
+
+
+def _lookup_iterrows(path_csv: str) -> dict:
+    df_all = pd.read_csv(path_csv)
+    result = {}
+    for _, row in df_all.iterrows():
+        entry = {"is_geotiff": row["is_geotiff"], "is_cog": row["is_cog"]}
+        for col in ["epsg", "height", "width", "transform", "bounds"]:
+            if col in row and pd.notna(row[col]):
+                entry[col] = int(row[col]) if col in ("epsg", "height", "width") else row[col]
+            else:
+                entry[col] = None
+        result[fix_url(row["url"])] = entry
+    return result
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _run_mode(mode: str, path_csv: str, path_parquet: str) -> dict:
+    """Build the lookup once → {seconds, rss_mb, entries}."""
+    baseline = _peak_rss_mb()
+    start = time.perf_counter()
+    if mode == "iterrows":
+        lookup = _lookup_iterrows(path_csv)
+    elif mode == "migrate":
+        lookup = MetadataLookup(cache_migrate(path_csv, path_parquet))
+    else:
+        lookup = MetadataLookup(cache_load(path_csv, path_parquet))
+    seconds = time.perf_counter() - start
+    return {"seconds": seconds, "rss_mb": _peak_rss_mb() - baseline, "entries": len(lookup)}
+
+
+def _run_mode_isolated(mode: str, path_csv: str, path_parquet: str) -> dict:
+    ctx = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+        return pool.submit(_run_mode, mode, path_csv, path_parquet).result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark metadata cache loading")
+    parser.add_argument("--csv", default=PATH_RESULTS_CSV,
+                        help=f"Cache CSV to load (default: {PATH_RESULTS_CSV})")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES,
+                        help="Modes to compare (default: all)")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per mode; best is reported (default: 1)")
+    args = parser.parse_args()
+
+    with open(args.csv) as f:
+        rows = sum(1 for _ in f) - 1
+    print(f"Benchmarking {rows} cache rows from {args.csv}")
+    print()
+    print(f"{'mode':<10} {'entries':>8} {'best s':>8} {'peak RSS MB':>12}")
+
+    # Snapshots go to a scratch dir so the working cache is left untouched
+    with tempfile.TemporaryDirectory() as tmp:
+        path_parquet = os.path.join(tmp, "cache.parquet")
+        for mode in args.modes:
+            if mode == "snapshot" and not os.path.exists(path_parquet):
+                _run_mode_isolated("migrate", args.csv, path_parquet)
+            runs = [_run_mode_isolated(mode, args.csv, path_parquet) for _ in range(args.repeat)]
+            best = min(runs, key=lambda r: r["seconds"])
+            print(f"{mode:<10} {best['entries']:>8} {best['seconds']:>8.3f} "
+                  f"{max(r['rss_mb'] for r in runs):>12.1f}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark remote GeoTIFF metadata extraction: time and HTTP requests per file.
+
+Each mode runs in a fresh subprocess so GDAL's /vsicurl/ caches start cold:
+
+- gdal:<profile>  rasterio-only read under a stac_utils.GDAL_PROFILES entry
+                  (requests counted from GDAL's CPL_DEBUG log)
+- fast            geotiff_header range reader, falling back to rasterio under
+                  the "header" profile when the parser can't decide
+
+Usage:
+    python scripts/benchmark_extract.py                          # 20 URLs, all modes
+    python scripts/benchmark_extract.py --count 100 --offset 5000
+    python scripts/benchmark_extract.py --modes gdal:default fast
+"""
+
+import argparse
+import concurrent.futures
+import logging
+import multiprocessing
+import statistics
+import sys
+import time
+
+import requests
+
+from geotiff_header import header_read
+from stac_utils import (
+    GDAL_PROFILES,
+    GdalRequestCounter,
+    encode_url_for_gdal,
+    fix_url,
+    geotiff_extract_metadata,
+)
+
+
+def _run_mode(mode: str, urls: list[str]) -> list[dict]:
+    """Extract every URL under one mode → [{url, seconds, requests, is_geotiff}]."""
+    counter = GdalRequestCounter().attach()
+    session = requests.Session()
+    session_requests = []
+    session.hooks["response"].append(lambda resp, *args, **kwargs: session_requests.append(resp.url))
+
+    kind, _, profile = mode.partition(":")
+    rows = []
+    for url in urls:
+        counter.count = 0
+        session_requests.clear()
+        start = time.perf_counter()
+        if kind == "fast":
+            header = header_read(encode_url_for_gdal(fix_url(url)), session=session)
+            if header is None:
+                record = geotiff_extract_metadata(url, fast=False, gdal_profile="header")
+            else:
+                record = {"is_geotiff": True}
+        else:
+            record = geotiff_extract_metadata(url, fast=False, gdal_profile=profile)
+        rows.append({
+            "url": url,
+            "seconds": time.perf_counter() - start,
+            "requests": counter.count + len(session_requests),
+            "is_geotiff": record["is_geotiff"],
+        })
+    return rows
+
+
+def _run_mode_isolated(mode: str, urls: list[str]) -> list[dict]:
+    """Run _run_mode in a spawned process (cold GDAL cache, CPL_DEBUG on)."""
+    ctx = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=ctx,
+                                                initializer=_debug_init) as pool:
+        return pool.submit(_run_mode, mode, urls).result()
+
+
+def _debug_init():
+    # CPL_DEBUG must be set process-wide so every rasterio.Env inherits it
+    import os
+    os.environ["CPL_DEBUG"] = "ON"
+    logging.getLogger("rasterio._env").propagate = False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark GeoTIFF metadata extraction")
+    parser.add_argument("--urls-file", default="data/urls_list.txt",
+                        help="File containing URLs (default: data/urls_list.txt)")
+    parser.add_argument("--count", type=int, default=20, help="Number of URLs to read (default: 20)")
+    parser.add_argument("--offset", type=int, default=0, help="Skip this many URLs first (default: 0)")
+    parser.add_argument("--modes", nargs="+",
+                        default=[f"gdal:{p}" for p in GDAL_PROFILES] + ["fast"],
+                        help="Modes to compare (default: every GDAL profile + fast)")
+    args = parser.parse_args()
+
+    with open(args.urls_file) as f:
+        urls = [line.strip() for line in f if line.strip()]
+    urls = urls[args.offset:args.offset + args.count]
+    print(f"Benchmarking {len(urls)} URLs from {args.urls_file}")
+    print()
+    print(f"{'mode':<16} {'files':>6} {'ok':>5} {'total s':>9} {'s/file':>8} "
+          f"{'req/file':>9} {'req max':>8}")
+
+    for mode in args.modes:
+        rows = _run_mode_isolated(mode, urls)
+        seconds = sum(r["seconds"] for r in rows)
+        request_counts = [r["requests"] for r in rows]
+        print(f"{mode:<16} {len(rows):>6} {sum(r['is_geotiff'] for r in rows):>5} "
+              f"{seconds:>9.2f} {seconds / len(rows):>8.3f} "
+              f"{statistics.mean(request_counts):>9.2f} {max(request_counts):>8}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
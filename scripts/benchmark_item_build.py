@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Benchmark cached item building: thread pool vs process pool.
+
+Builds items for URLs that are fully cached (no remote reads) into a
+scratch directory with item_create.items_build, once per executor, and
+reports throughput. The lookup load and bbox batch are timed separately
+since both executors share them.
+
+Usage:
+    python scripts/benchmark_item_build.py                        # 2000 items
+    python scripts/benchmark_item_build.py --count 100000         # production-size build
+    python scripts/benchmark_item_build.py --executors process --workers 4 8 16
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from item_create import items_build
+from metadata_cache import MetadataLookup, cache_load
+from stac_utils import fix_url
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cached STAC item building")
+    parser.add_argument("--urls-file", default="data/urls_list.txt",
+                        help="File containing URLs (default: data/urls_list.txt)")
+    parser.add_argument("--count", type=int, default=2000, help="Number of cached items to build (default: 2000)")
+    parser.add_argument("--executors", nargs="+", choices=["thread", "process"], default=["thread", "process"],
+                        help="Executors to compare (default: both)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[os.cpu_count() or 1],
+                        help="Worker counts to try (default: CPU count)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    lookup = MetadataLookup(cache_load())
+    with open(args.urls_file) as f:
+        urls = [line.strip() for line in f if line.strip()]
+    urls = [url for url in urls if (lookup.get(fix_url(url)) or {}).get("epsg") is not None][:args.count]
+    lookup.bbox_prepare([fix_url(url) for url in urls])
+    print(f"Loaded lookup and {len(urls)} cached URLs in {time.perf_counter() - start:.2f}s")
+    print()
+
+    rows = []
+    for executor in args.executors:
+        for workers in args.workers:
+            with tempfile.TemporaryDirectory() as path_local:
+                start = time.perf_counter()
+                item_ids = items_build(urls, "benchmark", path_local, lookup,
+                                       executor=executor, workers=workers)
+                seconds = time.perf_counter() - start
+            rows.append((executor, workers, len(item_ids), seconds))
+
+    print(f"{'executor':<9} {'workers':>7} {'items':>7} {'seconds':>8} {'items/s':>8}")
+    for executor, workers, n_items, seconds in rows:
+        print(f"{executor:<9} {workers:>7} {n_items:>7} {seconds:>8.2f} {n_items / seconds:>8.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Benchmark source URL access checks (checks/sec) against a local HTTP stand-in.
+
+The stand-in runs in its own process and answers HEAD requests over
+HTTP/1.1 keep-alive. --handshake-ms is slept once per new connection,
+standing in for the TCP + TLS handshake to the objectstore, and
+--latency-ms is slept per request. --fail-rate answers that share of
+requests with 503.
+
+Modes:
+
+- unpooled  requests.head per URL, no Session: a new connection per check
+            (check_url_accessible before it pooled connections)
+- thread    check_url_accessible (per-thread keep-alive session), --workers threads
+- async     urls_check_async engine, --concurrency in flight
+
+Usage:
+    python scripts/benchmark_url_check.py                         # 2000 URLs, all modes
+    python scripts/benchmark_url_check.py --count 5000 --handshake-ms 60 --latency-ms 25
+    python scripts/benchmark_url_check.py --modes thread async --fail-rate 0.02
+"""
+
+import argparse
+import concurrent.futures
+import http.server
+import multiprocessing
+import random
+import sys
+import time
+
+import requests
+
+from stac_utils import PATH_S3, check_url_accessible, fix_url, url_access_result
+from urls_check_async import urls_check_batch
+
+MODES = ["unpooled", "thread", "async"]
+
+
+def _serve(port: int, handshake_ms: float, latency_ms: float, fail_rate: float, connections, ready):
+    """Run the stand-in server until the process is terminated."""
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            super().setup()
+            with connections.get_lock():
+                connections.value += 1
+            time.sleep(handshake_ms / 1000)
+
+        def do_HEAD(self):
+            time.sleep(latency_ms / 1000)
+            self.send_response(503 if random.random() < fail_rate else 200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    class Server(http.server.ThreadingHTTPServer):
+        request_queue_size = 1024
+
+    with Server(("127.0.0.1", port), Handler) as server:
+        ready.set()
+        server.serve_forever()
+
+
+def _check_unpooled(url: str, timeout: int = 10) -> dict:
+    """The pre-pooling check: one requests.head (and connection) per URL."""
+    try:
+        resp = requests.head(url, timeout=timeout, allow_redirects=True)
+        return url_access_result(url, resp.status_code, "" if resp.status_code == 200 else resp.reason)
+    except requests.RequestException as e:
+        return url_access_result(url, None, str(e))
+
+
+def _run_mode(mode: str, urls: list[str], workers: int, concurrency: int, retries: int) -> list[dict]:
+    if mode == "async":
+        return urls_check_batch(urls, concurrency=concurrency, retries=retries, backoff=0.05)
+    check = _check_unpooled if mode == "unpooled" else check_url_accessible
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(check, urls))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark URL access checks against a local HTTP stand-in")
+    parser.add_argument("--urls-file", default="data/urls_list.txt",
+                        help="URLs whose paths are requested (default: data/urls_list.txt)")
+    parser.add_argument("--count", type=int, default=2000, help="Number of URLs to check (default: 2000)")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES,
+                        help="Modes to compare (default: all)")
+    parser.add_argument("--workers", type=int, default=16,
+                        help="Threads for unpooled/thread (default: 16, urls_check_access.py's default)")
+    parser.add_argument("--concurrency", type=int, default=64, help="In-flight requests for async (default: 64)")
+    parser.add_argument("--retries", type=int, default=3, help="Retries for async (default: 3)")
+    parser.add_argument("--handshake-ms", type=float, default=40.0,
+                        help="Delay per new connection (default: 40)")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Delay per request (default: 20)")
+    parser.add_argument("--fail-rate", type=float, default=0.0,
+                        help="Share of requests answered 503 (default: 0)")
+    parser.add_argument("--port", type=int, default=8765, help="Stand-in port (default: 8765)")
+    args = parser.parse_args()
+
+    with open(args.urls_file) as f:
+        paths = [fix_url(line.strip())[len(PATH_S3):] for line in f if line.strip()]
+    urls = [f"http://127.0.0.1:{args.port}{path}" for path in paths[:args.count]]
+
+    ctx = multiprocessing.get_context("spawn")
+    connections, ready = ctx.Value("i", 0), ctx.Event()
+    server = ctx.Process(target=_serve, daemon=True,
+                         args=(args.port, args.handshake_ms, args.latency_ms, args.fail_rate, connections, ready))
+    server.start()
+    ready.wait(10)
+
+    print(f"Checking {len(urls)} URLs against the stand-in (handshake {args.handshake_ms:g} ms, "
+          f"latency {args.latency_ms:g} ms, 503 rate {args.fail_rate:g})")
+    print()
+    print(f"{'mode':<10} {'checks':>7} {'ok':>6} {'seconds':>8} {'checks/s':>9} {'connections':>12}")
+    try:
+        for mode in args.modes:
+            connections.value = 0
+            start = time.perf_counter()
+            results = _run_mode(mode, urls, args.workers, args.concurrency, args.retries)
+            seconds = time.perf_counter() - start
+            print(f"{mode:<10} {len(results):>7} {sum(r['accessible'] for r in results):>6} "
+                  f"{seconds:>8.2f} {len(results) / seconds:>9.1f} {connections.value:>12}")
+    finally:
+        server.terminate()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
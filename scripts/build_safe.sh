@@ -186,7 +186,7 @@ log "✓ collection.json present"
 
 # Run STAC item validation
 VALIDATION_LOG="${LOG_DIR}/${TIMESTAMP}_validation.log"
-if python scripts/item_validate.py 2>&1 | tee "$VALIDATION_LOG"; then
+if python scripts/item_validate.py --prune 2>&1 | tee "$VALIDATION_LOG"; then
     log "✓ STAC item validation passed"
 else
     log "⚠️  Some items failed validation - check $VALIDATION_LOG"
@@ -3,14 +3,39 @@
 QA script to compare local STAC catalogue with S3 before syncing.
 
 This script:
-1. Samples a percentage of local STAC items
-2. Downloads their S3 counterparts
+1. Samples a percentage of local STAC items (or all of them with --all)
+2. Fetches their S3 counterparts into memory, many at a time over one
+   pooled boto3 client
 3. Compares key fields (id, datetime, properties)
 4. Reports differences and errors
 5. Logs results to logs/ directory
 
+The default sample is stratified rather than uniform. Items are grouped
+by NTS block, year and EPSG, and the budget is drawn one item per stratum
+per round, so a 100-item sample spreads across the catalogue instead of
+re-checking its largest sheets. Strata come from the item ids and the
+metadata cache, so no item is parsed: the EPSG is the cache's for the
+item's GeoTIFF, or the id's UTM zone (utm10) where the cache has none.
+Part of the budget (--changed-share, default half) goes to items changed
+since the last publish, the ones a sync is about to send: those whose
+md5 differs from data/s3_manifest.csv or that it doesn't list. Item md5s
+come from the build's .item_hashes.csv (item_hashes.py); only items it
+doesn't record are read and hashed. A manifest listing fewer than half
+the local items (one CI wrote without seeding it) would make nearly
+everything look changed, so the bucket is listed instead, with a
+warning. All of this is only done for stratified samples. The seed defaults to today's date, so a rerun on the same day checks the same
+items. Stratified results are also reported per stratum.
+
+With --hash-first, the sample is first checked without downloading
+anything: each local item's md5 is compared with its object's ETag from
+one paginated ListObjectsV2 pass over the bucket (md5 = ETag for the
+single-part uploads items get). Only items whose hashes differ are
+fetched and field-diffed, so a full-catalogue QA costs one listing plus a
+GET per changed item. Items whose bytes differ but whose compared fields
+match are reported separately and don't fail the check.
+
 Usage:
-    python scripts/catalogue_qa.py [--sample-percent 1] [--max-items 100]
+    python scripts/catalogue_qa.py [--sample-percent 1] [--max-items 100] [--all] [--workers 32]
 
 Examples:
     # Check 1% sample (default)
@@ -18,26 +43,58 @@ Examples:
 
     # Check 5% sample, max 200 items
     python scripts/catalogue_qa.py --sample-percent 5 --max-items 200
+
+    # Uniform sample, reproducible
+    python scripts/catalogue_qa.py --sampling random --seed 42
+
+    # Check every item
+    python scripts/catalogue_qa.py --all --workers 64
+
+    # Every item, hashes first (one listing + GETs for mismatches only)
+    python scripts/catalogue_qa.py --all --hash-first
+
+    # Against a local S3 stand-in (moto server, MinIO)
+    python scripts/catalogue_qa.py --all --endpoint-url http://127.0.0.1:5000 --s3-bucket s3://test --profile ""
 """
 
 import argparse
+import concurrent.futures
+import itertools
 import json
-import subprocess
 import random
 import os
+import re
 import sys
+from collections import Counter, defaultdict
 from datetime import datetime
 from pathlib import Path
 
+import boto3
+from botocore.config import Config
+from tqdm import tqdm
 
-def download_s3_item(s3_path: str, local_temp_path: str, profile: str = "airvine") -> bool:
-    """Download item from S3 to local temp location."""
-    result = subprocess.run(
-        ["aws", "s3", "cp", s3_path, local_temp_path, "--profile", profile],
-        capture_output=True,
-        text=True
-    )
-    return result.returncode == 0, result.stderr.strip()
+from collection_links import nts_group
+from item_hashes import ITEM_HASHES_NAME, ItemHashes, content_hash
+from s3_upload import PATH_S3_MANIFEST, bucket_parse, manifest_from_bucket, manifest_read
+from stac_utils import PATH_RESULTS_CSV, fix_url, url_to_item_id
+
+SAMPLING_STRATEGIES = ["stratified", "random"]
+UTM_ZONE_PATTERN = re.compile(r"_utm(\d{1,2})_")
+# Below this share of local items listed, the manifest is treated as partial
+MANIFEST_COVERAGE_MIN = 0.5
+
+
+def s3_client(profile: str = "airvine", endpoint_url: str | None = None, workers: int = 32):
+    """boto3 S3 client with a connection pool sized for `workers` concurrent requests."""
+    session = boto3.Session(profile_name=profile or None)
+    return session.client("s3", endpoint_url=endpoint_url,
+                          config=Config(max_pool_connections=workers,
+                                        retries={"max_attempts": 5, "mode": "adaptive"}))
+
+
+def fetch_s3_item(client, bucket: str, key: str) -> dict:
+    """GET an item JSON and parse it in memory."""
+    return json.loads(client.get_object(Bucket=bucket, Key=key)["Body"].read())
 
 
 def compare_items(local_json: dict, s3_json: dict, item_file: str) -> list:
@@ -77,6 +134,135 @@ def compare_items(local_json: dict, s3_json: dict, item_file: str) -> list:
     return diffs
 
 
+def item_epsg_codes(path_csv: str = PATH_RESULTS_CSV) -> dict[str, str]:
+    """{item_id: "EPSG:code"} from the metadata cache ({} without one)."""
+    if not os.path.exists(path_csv):
+        return {}
+    from metadata_cache import cache_load
+
+    table = cache_load(path_csv)
+    return {url_to_item_id(fix_url(url)): f"EPSG:{code}"
+            for url, code in zip(table.column("url").to_pylist(), table.column("epsg").to_pylist())
+            if code is not None}
+
+
+def item_stratum(item_file: str, epsg_codes: dict[str, str]) -> str:
+    """"block/year/EPSG:code" of an item; the id's UTM zone stands in for a code the cache lacks."""
+    item_id = item_file.removesuffix(".json")
+    block, year = nts_group(item_id)
+    code = epsg_codes.get(item_id)
+    if code is None:
+        match = UTM_ZONE_PATTERN.search(item_id)
+        code = f"utm{match.group(1)}" if match else "unknown"
+    return f"{block}/{year}/{code}"
+
+
+def item_hashes_recorded(local_dir: Path, item_files: list[str]) -> dict[str, str]:
+    """{item_file: md5} for item_files recorded in the build's .item_hashes.csv."""
+    recorded = ItemHashes(str(local_dir)).previous
+    return {item_file: recorded[item_file.removesuffix(".json")]
+            for item_file in item_files if item_file.removesuffix(".json") in recorded}
+
+
+def items_changed(hashes: dict[str, str], manifest: dict[str, tuple[str, int]], prefix: str) -> set[str]:
+    """Items whose md5 differs from the manifest's (or that it doesn't list)."""
+    return {item_file for item_file, md5 in hashes.items()
+            if manifest.get(prefix + item_file, ("",))[0] != md5}
+
+
+def _round_robin(item_files: list[str], strata: dict[str, str], size: int, rng: random.Random) -> list[str]:
+    """Up to size items, one per stratum per round; strata and items in rng order."""
+    groups = defaultdict(list)
+    for item_file in item_files:
+        groups[strata[item_file]].append(item_file)
+    order = sorted(groups)
+    rng.shuffle(order)
+    for key in order:
+        rng.shuffle(groups[key])
+    rounds = itertools.chain.from_iterable(itertools.zip_longest(*(groups[key] for key in order)))
+    return list(itertools.islice((item_file for item_file in rounds if item_file is not None), max(size, 0)))
+
+
+def sample_stratified(item_files: list[str], strata: dict[str, str], changed: set[str], size: int,
+                      changed_share: float, rng: random.Random) -> list[str]:
+    """Stratified sample with changed_share of the budget reserved for changed items.
+
+    Whatever one pool can't fill (too few changed or unchanged items) goes
+    to the other.
+    """
+    changed_items = [item_file for item_file in item_files if item_file in changed]
+    other_items = [item_file for item_file in item_files if item_file not in changed]
+    picked = _round_robin(changed_items, strata, min(len(changed_items), round(size * changed_share)), rng)
+    picked += _round_robin(other_items, strata, size - len(picked), rng)
+    if len(picked) < size:
+        taken = set(picked)
+        picked += _round_robin([item_file for item_file in changed_items if item_file not in taken],
+                               strata, size - len(picked), rng)
+    return picked
+
+
+def _error_file(error: str) -> str:
+    """Item file an error message is about."""
+    return error.split(":", 1)[0]
+
+
+def check_item(client, bucket: str, prefix: str, local_dir: Path, item_file: str) -> tuple[list, str | None]:
+    """Compare one local item with its S3 copy → (diffs, error)."""
+    try:
+        s3_json = fetch_s3_item(client, bucket, prefix + item_file)
+    except Exception as e:
+        return [], f"{item_file}: S3 download failed - {e}"
+    try:
+        with open(local_dir / item_file) as f:
+            local_json = json.load(f)
+        return compare_items(local_json, s3_json, item_file), None
+    except Exception as e:
+        return [], f"{item_file}: Comparison error - {str(e)}"
+
+
+def items_check(client, bucket: str, prefix: str, local_dir: Path, item_files: list[str],
+                workers: int = 32) -> tuple[list[dict], list[str]]:
+    """Fetch and compare item_files in a thread pool → (differences, errors), in item_files order."""
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(tqdm(
+            pool.map(lambda item_file: check_item(client, bucket, prefix, local_dir, item_file), item_files),
+            total=len(item_files),
+            desc="Comparing",
+        ))
+    differences = [{'file': item_file, 'diffs': diffs}
+                   for item_file, (diffs, _) in zip(item_files, results) if diffs]
+    errors = [error for _, error in results if error]
+    return differences, errors
+
+
+def local_hashes(local_dir: Path, item_files: list[str], workers: int = 32) -> dict[str, str]:
+    """{item_file: md5} of the local item bytes."""
+    def file_hash(item_file):
+        return content_hash((local_dir / item_file).read_bytes())
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        return dict(zip(item_files, pool.map(file_hash, item_files)))
+
+
+def hashes_compare(hashes: dict[str, str], listing: dict[str, tuple[str, int]],
+                   prefix: str) -> tuple[list[str], list[str], list[str]]:
+    """Split items by local md5 vs listed ETag → (matching, mismatched, missing on S3).
+
+    Multipart objects are listed with an empty md5 and count as mismatched,
+    so they get the field diff.
+    """
+    matching, mismatched, missing = [], [], []
+    for item_file, md5 in hashes.items():
+        listed = listing.get(prefix + item_file)
+        if listed is None:
+            missing.append(item_file)
+        elif listed[0] == md5:
+            matching.append(item_file)
+        else:
+            mismatched.append(item_file)
+    return matching, mismatched, missing
+
+
 def main():
     parser = argparse.ArgumentParser(description="QA check local STAC catalogue against S3")
     parser.add_argument(
@@ -89,7 +275,40 @@ def main():
         '--max-items',
         type=int,
         default=100,
-        help="Maximum number of items to check (default: 100)"
+        help="Maximum number of items to check (default: 100; 0 = no limit)"
+    )
+    parser.add_argument(
+        '--all',
+        action='store_true',
+        help="Check every local item (overrides --sample-percent and --max-items)"
+    )
+    parser.add_argument(
+        '--sampling',
+        choices=SAMPLING_STRATEGIES,
+        default="stratified",
+        help="stratified: by NTS block/year/EPSG, weighted to changed items; random: uniform (default: stratified)"
+    )
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=int(datetime.now().strftime("%Y%m%d")),
+        help="Sampling seed (default: today's date, YYYYMMDD)"
+    )
+    parser.add_argument(
+        '--changed-share',
+        type=float,
+        default=0.5,
+        help="Share of the sample reserved for changed items (default: 0.5)"
+    )
+    parser.add_argument(
+        '--manifest',
+        default=PATH_S3_MANIFEST,
+        help=f"Manifest of the last publish; items whose md5 differs count as changed (default: {PATH_S3_MANIFEST})"
+    )
+    parser.add_argument(
+        '--hash-first',
+        action='store_true',
+        help="Compare local md5s with S3 ETags from one bucket listing; download and diff only mismatches"
     )
     parser.add_argument(
         '--local-dir',
@@ -104,7 +323,17 @@ def main():
     parser.add_argument(
         '--profile',
         default="airvine",
-        help="AWS profile to use"
+        help="AWS profile to use (\"\" = default credential chain)"
+    )
+    parser.add_argument(
+        '--endpoint-url',
+        help="S3 endpoint (e.g. a local moto server or MinIO)"
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=32,
+        help="Concurrent S3 fetches (default: 32)"
     )
 
     args = parser.parse_args()
@@ -127,7 +356,10 @@ def main():
     log(f"Timestamp: {timestamp}")
     log(f"Local directory: {args.local_dir}")
     log(f"S3 bucket: {args.s3_bucket}")
-    log(f"Sample: {args.sample_percent}% (max {args.max_items} items)")
+    if args.all:
+        log("Sample: all items")
+    else:
+        log(f"Sample: {args.sample_percent}% (max {args.max_items or 'unlimited'} items)")
     log(f"Log file: {log_file}")
     log("")
 
@@ -137,65 +369,80 @@ def main():
         log(f"❌ Error: Local directory not found: {local_dir}")
         return 1
 
-    all_items = [f.name for f in local_dir.glob("*.json") if f.name != "collection.json"]
+    all_items = sorted(f.name for f in local_dir.glob("*.json") if f.name != "collection.json")
     log(f"Found {len(all_items)} local items")
 
+    bucket, prefix = bucket_parse(args.s3_bucket)
+    client = s3_client(args.profile, args.endpoint_url, args.workers)
+    stratified = args.sampling == "stratified" and not args.all
+    changed, strata, listing = set(), {}, None
+    if stratified:
+        published = manifest_read(args.manifest)
+        n_published = sum(1 for item_file in all_items if prefix + item_file in published)
+        if n_published < len(all_items) * MANIFEST_COVERAGE_MIN:
+            log(f"⚠️  {args.manifest} lists only {n_published} of {len(all_items)} local items "
+                f"(never seeded with s3_upload.py --manifest-from-bucket?): listing the bucket instead")
+            listing = published = manifest_from_bucket(client, bucket, prefix)
+        hashes = item_hashes_recorded(local_dir, all_items)
+        n_recorded = len(hashes)
+        hashes |= local_hashes(local_dir, [f for f in all_items if f not in hashes], args.workers)
+        changed = items_changed(hashes, published, prefix)
+        log(f"Changed since the last publish: {len(changed)} items "
+            f"({n_recorded} hashes from {ITEM_HASHES_NAME}, {len(hashes) - n_recorded} computed)")
+        epsg_codes = item_epsg_codes()
+        strata = {item_file: item_stratum(item_file, epsg_codes) for item_file in all_items}
+        log(f"Strata (NTS block/year/EPSG): {len(set(strata.values()))}")
+
     # Calculate sample size
-    sample_size = int(len(all_items) * (args.sample_percent / 100))
-    sample_size = min(sample_size, args.max_items)
-    sample_size = max(1, sample_size)  # At least 1 item
+    if args.all:
+        sample_size = len(all_items)
+    else:
+        sample_size = int(len(all_items) * (args.sample_percent / 100))
+        if args.max_items:
+            sample_size = min(sample_size, args.max_items)
+        sample_size = max(1, min(sample_size, len(all_items)))  # At least 1 item
 
     log(f"Sampling {sample_size} items for comparison")
     log("")
 
-    # Random sample
-    sample_items = random.sample(all_items, sample_size)
+    rng = random.Random(args.seed)
+    if args.all:
+        sample_items = all_items
+    elif stratified:
+        sample_items = sample_stratified(all_items, strata, changed, sample_size, args.changed_share, rng)
+        n_changed = sum(1 for item_file in sample_items if item_file in changed)
+        log(f"Sampling: stratified, seed {args.seed} - {n_changed} changed, "
+            f"{sample_size - n_changed} unchanged items from {len({strata[f] for f in sample_items})} strata")
+        log("")
+    else:
+        sample_items = rng.sample(all_items, sample_size)
+        log(f"Sampling: random, seed {args.seed}")
+        log("")
 
     # Compare items
-    differences = []
-    errors = []
-    temp_dir = Path("/tmp/stac_qa")
-    temp_dir.mkdir(exist_ok=True)
-
-    log("Comparing items...")
-    for i, item_file in enumerate(sample_items, 1):
-        if i % 10 == 0:
-            log(f"  Progress: {i}/{sample_size}")
-
-        local_path = local_dir / item_file
-        s3_path = f"{args.s3_bucket}/{item_file}"
-        temp_file = temp_dir / item_file
-
-        # Download from S3
-        success, error_msg = download_s3_item(s3_path, str(temp_file), args.profile)
-
-        if not success:
-            errors.append(f"{item_file}: S3 download failed - {error_msg}")
-            continue
-
-        # Load and compare JSONs
-        try:
-            with open(local_path) as f:
-                local_json = json.load(f)
-            with open(temp_file) as f:
-                s3_json = json.load(f)
-
-            diffs = compare_items(local_json, s3_json, item_file)
-            if diffs:
-                differences.append({
-                    'file': item_file,
-                    'diffs': diffs
-                })
-        except Exception as e:
-            errors.append(f"{item_file}: Comparison error - {str(e)}")
-        finally:
-            # Cleanup temp file
-            if temp_file.exists():
-                temp_file.unlink()
-
-    # Cleanup temp directory
-    if temp_dir.exists():
-        temp_dir.rmdir()
+    started = datetime.now()
+    hash_only = []
+    if args.hash_first:
+        log("Listing S3 objects and hashing local items...")
+        if listing is None:
+            listing = manifest_from_bucket(client, bucket, prefix)
+        hashes = local_hashes(local_dir, sample_items, args.workers)
+        matching, to_fetch, missing = hashes_compare(hashes, listing, prefix)
+        log(f"Listed {len(listing)} objects: {len(matching)} items match by hash, "
+            f"{len(to_fetch)} differ, {len(missing)} missing on S3")
+    else:
+        to_fetch, missing = sample_items, []
+
+    log(f"Comparing {len(to_fetch)} items ({args.workers} concurrent fetches)...")
+    differences, errors = items_check(client, bucket, prefix, local_dir, to_fetch, args.workers)
+    errors = [f"{item_file}: not found on S3" for item_file in missing] + errors
+    if args.hash_first:
+        # Hashes differ but the compared fields don't: bytes changed outside them
+        differing = {item['file'] for item in differences}
+        failed = {_error_file(error) for error in errors}
+        hash_only = [item_file for item_file in to_fetch if item_file not in differing | failed]
+    elapsed = (datetime.now() - started).total_seconds()
+    log(f"Compared {sample_size} items in {elapsed:.1f}s")
 
     # Report results
     log("")
@@ -205,6 +452,8 @@ def main():
     log(f"Items checked: {sample_size}")
     log(f"Differences found: {len(differences)}")
     log(f"Errors: {len(errors)}")
+    if args.hash_first:
+        log(f"Hash differs, compared fields match: {len(hash_only)}")
     log("")
 
     if differences:
@@ -223,6 +472,29 @@ def main():
             log(f"  ... and {len(errors) - 20} more errors")
         log("")
 
+    if hash_only:
+        log("Items whose bytes differ outside the compared fields:")
+        for item_file in hash_only[:20]:
+            log(f"  - {item_file}")
+        if len(hash_only) > 20:
+            log(f"  ... and {len(hash_only) - 20} more")
+        log("")
+
+    if stratified:
+        checked = Counter(strata[item_file] for item_file in sample_items)
+        checked_changed = Counter(strata[item_file] for item_file in sample_items if item_file in changed)
+        differing = Counter(strata[item['file']] for item in differences)
+        failing = Counter(strata[_error_file(error)] for error in errors)
+        log("Per stratum (NTS block/year/EPSG):")
+        log(f"  {'stratum':<28} {'checked':>8} {'changed':>8} {'diffs':>6} {'errors':>7}")
+        shown = sorted(checked) if len(checked) <= 50 else sorted(differing.keys() | failing.keys())
+        for stratum in shown:
+            log(f"  {stratum:<28} {checked[stratum]:>8} {checked_changed[stratum]:>8} "
+                f"{differing[stratum]:>6} {failing[stratum]:>7}")
+        if len(shown) < len(checked):
+            log(f"  ... and {len(checked) - len(shown)} more strata with no differences or errors")
+        log("")
+
     if not differences and not errors:
         log("✓ All sampled items match between local and S3")
         log("")
@@ -15,11 +15,13 @@ import argparse
 import glob
 import logging
 import os
+import shutil
 import sys
 
 import pystac
 from pystac import Collection, Extent, SpatialExtent, TemporalExtent
 
+from collection_links import ITEM_INDEX_NAME, NTS_DIR
 from stac_utils import (
     BBOX_BC,
     date_extract_from_path,
@@ -58,6 +60,11 @@ def main():
             for item_file in old_items:
                 os.remove(item_file)
             logger.info("Test mode: Cleaned up %d old item JSONs", len(old_items))
+        # Item link layouts left by item_create.py --links index|nts
+        if os.path.exists(f"{path_local}/{ITEM_INDEX_NAME}"):
+            os.remove(f"{path_local}/{ITEM_INDEX_NAME}")
+        if os.path.isdir(f"{path_local}/{NTS_DIR}"):
+            shutil.rmtree(f"{path_local}/{NTS_DIR}")
 
     # Load URLs
     urls_file = "data/urls_list.txt"
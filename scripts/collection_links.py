@@ -0,0 +1,251 @@
+"""
+Collection item links kept out of pystac.Link objects.
+
+collection.json carries one rel=item link per item (~98k). Loading it with
+pystac.Collection.from_file builds a Link object for each, and every save
+re-serializes all of them. Here the item links are split off when the
+collection is read and handled as a plain list of hrefs; pystac only sees
+the small remainder of the document.
+
+Three layouts on save:
+
+- inline  item links written into collection.json exactly as pystac's
+          save_object would (existing order, new items appended) — what
+          the pgstac registration scripts crawl today
+- index   collection.json without item links, plus item_index.txt next to
+          it: sorted item ids, one per line (href = PATH_S3_STAC/<id>.json)
+- nts     child catalogs per NTS 1:250k block and year, parsed from the item
+          id (094-094i-2024-... → nts/094i/catalog.json → nts/094i/2024/
+          catalog.json, which links the items); ids without a mapsheet go
+          under nts/other/unknown/. Item JSONs stay where they are. Only
+          the year catalogs that gain items (and their block catalogs) are
+          rewritten, so an incremental run touches a few small files.
+
+Loading accepts any layout (or several, merged), so a catalog can be
+switched between them by saving with another option. nts catalogs are
+read from the output directory when present, otherwise from S3.
+
+Used by:
+- item_create.py (--links)
+- collection_create.py (test-mode cleanup)
+- item_reprocess.py
+"""
+
+import concurrent.futures
+import json
+import logging
+import os
+import re
+from collections import defaultdict
+
+import pystac
+
+from stac_utils import PATH_S3_JSON, PATH_S3_STAC
+
+logger = logging.getLogger(__name__)
+
+ITEM_INDEX_NAME = "item_index.txt"
+LINK_LAYOUTS = ["inline", "index", "nts"]
+NTS_DIR = "nts"
+NTS_ID_PATTERN = re.compile(r"^\d{3}-(\d{3}[a-p])-(\d{4})-")
+
+STAC_IO = pystac.StacIO.default()
+
+
+def item_href(item_id: str) -> str:
+    return f"{PATH_S3_STAC}/{item_id}.json"
+
+
+def item_id_from_href(href: str) -> str:
+    return os.path.basename(href).removesuffix(".json")
+
+
+class ItemLinks:
+    """Ordered, de-duplicated item hrefs of a collection.
+
+    loaded is how many were read from disk; hrefs added afterwards are new
+    this run (pystac's set_self_href puts the self link between the two).
+    """
+
+    def __init__(self, hrefs: list[str], nts_loaded: set[tuple[str, str]] = frozenset()):
+        self.hrefs: list[str] = []
+        self.seen: set[str] = set()
+        for href in hrefs:
+            self.add(href)
+        self.loaded = len(self.hrefs)
+        # (block, year) catalogs read from an existing nts layout
+        self.nts_loaded = set(nts_loaded)
+
+    def add(self, href: str) -> bool:
+        """Append href unless already linked; returns whether it was added."""
+        if href in self.seen:
+            return False
+        self.hrefs.append(href)
+        self.seen.add(href)
+        return True
+
+    def __contains__(self, href: str) -> bool:
+        return href in self.seen
+
+    def __len__(self) -> int:
+        return len(self.hrefs)
+
+
+def nts_group(item_id: str) -> tuple[str, str]:
+    """(NTS block, year) of an item id; ("other", "unknown") if it has none."""
+    match = NTS_ID_PATTERN.match(item_id)
+    return (match.group(1), match.group(2)) if match else ("other", "unknown")
+
+
+def _nts_href(*parts: str) -> str:
+    return "/".join([PATH_S3_STAC, NTS_DIR, *parts, "catalog.json"])
+
+
+def _nts_read(href: str, path_local: str) -> dict:
+    """A published nts catalog, from the local output dir if present, else S3."""
+    path = os.path.join(path_local, href[len(PATH_S3_STAC):].lstrip("/"))
+    return json.loads(STAC_IO.read_text(path if os.path.exists(path) else href))
+
+
+def _nts_load(block_hrefs: list[str], path_local: str) -> tuple[list[str], set[tuple[str, str]]]:
+    """Item hrefs and (block, year) groups of an existing nts layout."""
+    year_hrefs = []
+    for href in block_hrefs:
+        block = _nts_read(href, path_local)
+        year_hrefs.extend(link["href"] for link in block["links"] if link["rel"] == "child")
+    with concurrent.futures.ThreadPoolExecutor(max_workers=16) as pool:
+        years = list(pool.map(lambda href: _nts_read(href, path_local), year_hrefs))
+    hrefs = []
+    groups = set()
+    for href, year in zip(year_hrefs, years):
+        block_name, year_name = href.split("/")[-3:-1]
+        groups.add((block_name, year_name))
+        hrefs.extend(link["href"] for link in year["links"] if link["rel"] == "item")
+    return hrefs, groups
+
+
+def _catalog_dict(catalog_id: str, title: str, description: str, href: str,
+                  parent_href: str, links: list[dict]) -> dict:
+    return {
+        "type": "Catalog",
+        "id": catalog_id,
+        "stac_version": pystac.get_stac_version(),
+        "description": description,
+        "links": [
+            {"rel": "root", "href": PATH_S3_JSON, "type": "application/json"},
+            {"rel": "parent", "href": parent_href, "type": "application/json"},
+            {"rel": "self", "href": href, "type": "application/json"},
+            *links,
+        ],
+        "title": title,
+    }
+
+
+def _nts_save(collection: pystac.Collection, item_links: ItemLinks, path_local: str) -> list[dict]:
+    """Write the nts catalogs that changed → child links for the collection."""
+    groups = defaultdict(list)
+    for href in item_links.hrefs:
+        groups[nts_group(item_id_from_href(href))].append(href)
+    touched = {nts_group(item_id_from_href(href)) for href in item_links.hrefs[item_links.loaded:]}
+    touched |= groups.keys() - item_links.nts_loaded
+
+    def write(catalog: dict, href: str):
+        path = os.path.join(path_local, href[len(PATH_S3_STAC):].lstrip("/"))
+        STAC_IO.write_text_to_href(path, STAC_IO.json_dumps(catalog))
+
+    years_by_block = defaultdict(list)
+    for block, year in groups:
+        years_by_block[block].append(year)
+    for block, year in sorted(touched):
+        href = _nts_href(block, year)
+        write(_catalog_dict(
+            f"{collection.id}-{block}-{year}", f"NTS {block} {year}",
+            f"{collection.title or collection.id}: NTS 1:250k mapsheet {block}, {year}",
+            href, _nts_href(block),
+            [{"rel": "item", "href": h, "type": "application/json"} for h in sorted(groups[block, year])],
+        ), href)
+    for block in sorted({block for block, _ in touched}):
+        href = _nts_href(block)
+        write(_catalog_dict(
+            f"{collection.id}-{block}", f"NTS {block}",
+            f"{collection.title or collection.id}: NTS 1:250k mapsheet {block}",
+            href, PATH_S3_JSON,
+            [{"rel": "child", "href": _nts_href(block, year), "type": "application/json",
+              "title": f"NTS {block} {year}"} for year in sorted(years_by_block[block])],
+        ), href)
+    logger.info("Wrote %d of %d nts year catalogs", len(touched), len(groups))
+    return [{"rel": "child", "href": _nts_href(block), "type": "application/json", "title": f"NTS {block}"}
+            for block in sorted(years_by_block)]
+
+
+def collection_load(path_collection: str) -> tuple[pystac.Collection, ItemLinks]:
+    """Read a collection without building its item links → (collection, item links).
+
+    Item hrefs come from inline rel=item links (in document order), then
+    any ids in the item_index.txt sidecar and any items in nts child
+    catalogs that aren't already linked.
+    """
+    d = json.loads(STAC_IO.read_text(path_collection))
+    nts_prefix = f"{PATH_S3_STAC}/{NTS_DIR}/"
+    hrefs = [link["href"] for link in d["links"] if link.get("rel") == "item"]
+    block_hrefs = [link["href"] for link in d["links"]
+                   if link.get("rel") == "child" and link["href"].startswith(nts_prefix)]
+    d["links"] = [link for link in d["links"]
+                  if link.get("rel") != "item" and link["href"] not in block_hrefs]
+    collection = pystac.Collection.from_dict(d, href=path_collection, migrate=True, preserve_dict=False)
+
+    path_local = os.path.dirname(path_collection)
+    path_index = os.path.join(path_local, ITEM_INDEX_NAME)
+    if os.path.exists(path_index):
+        with open(path_index) as f:
+            hrefs.extend(item_href(item_id) for item_id in f.read().splitlines() if item_id)
+    nts_loaded = set()
+    if block_hrefs:
+        nts_hrefs, nts_loaded = _nts_load(block_hrefs, path_local)
+        hrefs.extend(nts_hrefs)
+    item_links = ItemLinks(hrefs, nts_loaded)
+    logger.info("Loaded collection %s with %d item links", collection.id, len(item_links))
+    return collection, item_links
+
+
+def collection_save(collection: pystac.Collection, item_links: ItemLinks, path_collection: str,
+                    links: str = "inline"):
+    """Write the collection with its item links in the chosen layout.
+
+    collection must not hold rel=item Link objects itself (load it with
+    collection_load, then set_self_href as item_create does). inline output
+    is byte-identical to from_file + set_self_href + add_link per new item +
+    save_object: other links first, then the loaded items, the self link,
+    and the items added this run.
+    """
+    # The collection is its own root; resolving the root link to this object
+    # keeps to_dict from downloading the published collection.json to find it
+    root_link = collection.get_single_link(pystac.RelType.ROOT)
+    if (root_link is not None and not root_link.is_resolved()
+            and root_link.get_href(transform_href=False) == collection.get_self_href()):
+        root_link.target = collection
+
+    d = collection.to_dict(include_self_link=True)
+    path_local = os.path.dirname(path_collection)
+    path_index = os.path.join(path_local, ITEM_INDEX_NAME)
+    if links != "index" and os.path.exists(path_index):
+        os.remove(path_index)
+
+    if links == "inline":
+        def item_dicts(hrefs):
+            return [{"rel": "item", "href": href, "type": "application/json"} for href in hrefs]
+
+        others = [link for link in d["links"] if link["rel"] != "self"]
+        self_links = [link for link in d["links"] if link["rel"] == "self"]
+        d["links"] = (others + item_dicts(item_links.hrefs[:item_links.loaded])
+                      + self_links + item_dicts(item_links.hrefs[item_links.loaded:]))
+    elif links == "nts":
+        d["links"].extend(_nts_save(collection, item_links, path_local))
+    else:
+        item_ids = sorted({item_id_from_href(href) for href in item_links.hrefs})
+        tmp_path = f"{path_index}.tmp"
+        with open(tmp_path, "w") as f:
+            f.writelines(f"{item_id}\n" for item_id in item_ids)
+        os.replace(tmp_path, path_index)
+
+    STAC_IO.write_text_to_href(path_collection, STAC_IO.json_dumps(d))
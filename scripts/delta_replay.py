@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Replay incremental deltas onto a catalog snapshot and check the result.
+
+A PostgreSQL-free stand-in for upsert-based pgstac registration: items are
+keyed by id, each delta (item_bundle.py) upserts its items and then drops
+its tombstoned ids, in timestamp order. The replayed catalog is compared
+item by item with a full rebuild, so a delta chain can be trusted before it
+is applied to the database.
+
+Snapshots and rebuilds can be bundles (a directory with manifest.json) or
+directories of loose item JSONs.
+
+Usage:
+    python scripts/delta_replay.py --baseline <snapshot> --deltas-dir <out>/deltas --expected <full rebuild>
+    python scripts/delta_replay.py --baseline <snapshot> --deltas d1 d2 --write-bundle /tmp/replayed
+
+Exit codes: 0 = replay matches the rebuild (or no --expected given),
+1 = differences found, 2 = bad input.
+"""
+
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+
+from item_bundle import BundleWriter, bundle_deleted, bundle_read, ndjson_line
+
+logger = logging.getLogger(__name__)
+
+
+def items_load(path: str) -> dict[str, dict]:
+    """{item_id: item dict} from a bundle or a directory of loose item JSONs."""
+    if os.path.exists(os.path.join(path, "manifest.json")):
+        return {item["id"]: item for item in bundle_read(path)}
+    items = {}
+    for path_json in sorted(glob.glob(os.path.join(path, "*.json"))):
+        if os.path.basename(path_json) == "collection.json":
+            continue
+        with open(path_json) as f:
+            item = json.load(f)
+        items[item["id"]] = item
+    return items
+
+
+def delta_apply(items: dict[str, dict], path_delta: str) -> tuple[int, int]:
+    """Upsert a delta's items, then drop its tombstones → (upserted, deleted)."""
+    upserted = 0
+    for item in bundle_read(path_delta):
+        items[item["id"]] = item
+        upserted += 1
+    deleted = 0
+    for item_id in bundle_deleted(path_delta):
+        if items.pop(item_id, None) is not None:
+            deleted += 1
+    return upserted, deleted
+
+
+def items_compare(actual: dict[str, dict], expected: dict[str, dict]) -> dict[str, list[str]]:
+    """Ids missing from, extra in, or differing in actual vs expected."""
+    return {
+        "missing": sorted(expected.keys() - actual.keys()),
+        "extra": sorted(actual.keys() - expected.keys()),
+        "changed": sorted(i for i in expected.keys() & actual.keys() if actual[i] != expected[i]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay item deltas onto a snapshot")
+    parser.add_argument("--baseline", required=True, help="Snapshot to start from (bundle or item dir)")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--deltas", nargs="+", help="Delta directories, applied in the order given")
+    group.add_argument("--deltas-dir", help="Directory of timestamped deltas, applied in name order")
+    parser.add_argument("--expected", help="Full rebuild to compare against (bundle or item dir)")
+    parser.add_argument("--write-bundle", help="Write the replayed catalog as a bundle here")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s",
+                        datefmt="%H:%M:%S")
+
+    if args.deltas_dir:
+        paths_delta = sorted(p for p in glob.glob(os.path.join(args.deltas_dir, "*")) if os.path.isdir(p))
+    else:
+        paths_delta = args.deltas
+    incomplete = [p for p in paths_delta if not os.path.exists(os.path.join(p, "manifest.json"))]
+    if incomplete:
+        logger.error("Deltas without a manifest (incomplete runs): %s", ", ".join(incomplete))
+        return 2
+
+    items = items_load(args.baseline)
+    logger.info("Baseline %s: %d items", args.baseline, len(items))
+    for path_delta in paths_delta:
+        upserted, deleted = delta_apply(items, path_delta)
+        logger.info("Applied %s: %d upserted, %d deleted → %d items",
+                    os.path.basename(path_delta.rstrip("/")), upserted, deleted, len(items))
+
+    if args.write_bundle:
+        collection_id = next(iter(items.values()), {}).get("collection", "")
+        with BundleWriter(args.write_bundle, collection_id) as writer:
+            for item_id in sorted(items):
+                writer.add(ndjson_line(items[item_id]))
+
+    if not args.expected:
+        return 0
+
+    expected = items_load(args.expected)
+    diff = items_compare(items, expected)
+    if not any(diff.values()):
+        logger.info("Replay matches %s (%d items)", args.expected, len(expected))
+        return 0
+    for kind, ids in diff.items():
+        if ids:
+            logger.error("%d %s: %s%s", len(ids), kind, ", ".join(ids[:10]), " ..." if len(ids) > 10 else "")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""
+asyncio metadata extraction engine.
+
+Multiplexes GeoTIFF header range requests over one pooled keep-alive
+connection set (aiohttp) instead of paying a GDAL/curl handshake per
+thread. A concurrency ceiling bounds in-flight requests, an optional
+per-host rate limit spaces them out, and URLs are pulled from a shared
+iterator by a fixed set of workers, so a 35k-URL batch never holds more
+than `concurrency` requests (or tasks) at once.
+
+Headers the fast parser can't decide fall back to the rasterio path in a
+small thread pool, exactly as geotiff_extract_metadata does.
+
+Used by:
+- item_create.py (--engine async)
+"""
+
+import asyncio
+import concurrent.futures
+import functools
+import logging
+import time
+from collections.abc import Callable
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from geotiff_header import HEADER_BYTES_INITIAL, HEADER_BYTES_MAX, HeaderTruncated, header_parse
+from stac_utils import encode_url_for_gdal, fix_url, geotiff_extract_metadata, metadata_from_header
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Space out request starts to at most `rate` per second (0 = unlimited)."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_start = 0.0
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        async with self.lock:
+            now = time.monotonic()
+            wait = self.next_start - now
+            self.next_start = max(now, self.next_start) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+async def _range_get(session: aiohttp.ClientSession, url: str, n_bytes: int) -> tuple[bytes, int | None]:
+    """GET the first n_bytes of url → (bytes, total file size if known)."""
+    headers = {"Range": f"bytes=0-{n_bytes - 1}"}
+    async with session.get(url, headers=headers) as resp:
+        resp.raise_for_status()
+        if resp.status == 206:
+            data = await resp.read()
+            total = resp.headers.get("Content-Range", "").rpartition("/")[2]
+            total = int(total) if total.isdigit() else None
+            expected = n_bytes if total is None else min(n_bytes, total)
+            if len(data) < expected:
+                raise ValueError(f"short range response: {len(data)} of {expected} bytes")
+            return data, total
+        # Server ignored the Range header: read just what we asked for (less only at EOF)
+        try:
+            return await resp.content.readexactly(n_bytes), None
+        except asyncio.IncompleteReadError as e:
+            return e.partial, len(e.partial)
+
+
+async def header_read_async(session: aiohttp.ClientSession, url: str, limiter: RateLimiter,
+                            initial_bytes: int = HEADER_BYTES_INITIAL) -> dict | None:
+    """Async twin of geotiff_header.header_read (same growth and give-up rules)."""
+    n_bytes = initial_bytes
+    try:
+        while True:
+            await limiter.acquire()
+            buf, total = await _range_get(session, url, n_bytes)
+            try:
+                return header_parse(buf)
+            except HeaderTruncated as e:
+                if total is not None and e.needed > total:
+                    return None
+                n_bytes = max(e.needed, n_bytes * 2)
+                if n_bytes > HEADER_BYTES_MAX:
+                    return None
+    except Exception as e:
+        # Network or parser failure (struct.error, a degenerate header, ...):
+        # the caller falls back to rasterio for this URL only
+        logger.debug("Async header read failed for %s: %s", url, e)
+        return None
+
+
+async def _extract_all(urls: list[str], concurrency: int, rate_limit: float,
+                       fallback_workers: int, timeout: int, gdal_profile: str,
+                       on_result: Callable[[dict], None] | None) -> list[dict]:
+    results: list[dict | None] = [None] * len(urls)
+    pending = iter(enumerate(urls))
+    limiters: dict[str, RateLimiter] = {}
+    loop = asyncio.get_running_loop()
+    fallback = functools.partial(geotiff_extract_metadata, fast=False, gdal_profile=gdal_profile)
+
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=concurrency,
+                                     ttl_dns_cache=300, keepalive_timeout=60)
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=fallback_workers) as fallback_pool:
+        async with aiohttp.ClientSession(connector=connector, timeout=client_timeout) as session:
+
+            async def worker():
+                for i, url in pending:
+                    gdal_url = encode_url_for_gdal(fix_url(url))
+                    host = urlsplit(gdal_url).netloc
+                    limiter = limiters.setdefault(host, RateLimiter(rate_limit))
+                    header = await header_read_async(session, gdal_url, limiter)
+                    record = None
+                    if header is not None:
+                        try:
+                            record = metadata_from_header(url, header)
+                        except Exception as e:
+                            logger.debug("Header of %s not usable (%s), opening with rasterio", url, e)
+                    if record is None:
+                        record = await loop.run_in_executor(fallback_pool, fallback, url)
+                    results[i] = record
+                    if on_result is not None:
+                        on_result(record)
+
+            await asyncio.gather(*(worker() for _ in range(min(concurrency, len(urls)))))
+
+    return results
+
+
+def metadata_extract_batch(urls: list[str], concurrency: int = 64, rate_limit: float = 0.0,
+                           fallback_workers: int = 8, timeout: int = 60,
+                           gdal_profile: str = "default",
+                           on_result: Callable[[dict], None] | None = None) -> list[dict]:
+    """Extract metadata for many URLs with the asyncio engine.
+
+    concurrency caps in-flight requests (and pooled connections); rate_limit
+    caps request starts per second per host (0 = unlimited). on_result is
+    called with each record as it completes (e.g. a progress bar update).
+    gdal_profile applies to the rasterio fallback reads.
+
+    Returns records in input order, same shape as geotiff_extract_metadata.
+    """
+    if not urls:
+        return []
+    return asyncio.run(_extract_all(urls, concurrency, rate_limit, fallback_workers,
+                                    timeout, gdal_profile, on_result))
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Parity checks for the GeoTIFF readers against their references.
+
+`--check` writes a small corpus of GeoTIFFs to a temporary directory:
+COGs (classic and BigTIFF), tiled and untiled files with and without
+overviews, overviews appended after the image data, an external .ovr
+sidecar and a COG whose ghost header was invalidated by a later edit.
+Then it runs two checks:
+
+- stac_utils.cog_validate_dataset against rio_cogeo.cogeo.cog_validate,
+  the code it was ported from. The verdict, errors and warnings must be
+  identical on every file.
+- geotiff_header.header_read, served by a local Range-capable HTTP
+  server, against rasterio: EPSG, shape, transform and bounds, and
+  is_cog against cog_validate. The reader may return None (undecided,
+  rasterio takes over) but must never disagree. The same files are also
+  served by a server that ignores Range (200, whole file) and by one that
+  answers with short 206 bodies; the latter must come back undecided.
+
+rio-cogeo is only needed here, as the parity reference.
+
+Usage:
+    python scripts/geotiff_check.py --check
+    python scripts/geotiff_check.py --check --keep /tmp/geotiff_fixtures
+
+Exit codes: 0 = every check agrees, 1 = mismatches found.
+"""
+
+import argparse
+import http.server
+import logging
+import math
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+
+import numpy as np
+import rasterio
+from rasterio.enums import Resampling
+from rasterio.transform import from_origin
+
+from geotiff_header import header_read
+from stac_utils import cog_validate_dataset
+
+try:
+    from rio_cogeo.cogeo import cog_validate
+except ImportError:
+    cog_validate = None
+
+logger = logging.getLogger(__name__)
+
+FIXTURE_CRS = "EPSG:3005"
+FIXTURE_TRANSFORM = from_origin(1200000.0, 500000.0, 1.0, 1.0)
+SERVER_MODES = ["range", "no-range", "short"]
+
+
+def _profile(width: int, height: int, **options) -> dict:
+    return {"driver": "GTiff", "width": width, "height": height, "count": 1, "dtype": "float32",
+            "crs": FIXTURE_CRS, "transform": FIXTURE_TRANSFORM, "nodata": -9999.0, **options}
+
+
+def _data(width: int, height: int) -> np.ndarray:
+    y, x = np.mgrid[0:height, 0:width]
+    return (np.sin(x / 37.0) * np.cos(y / 23.0) * 100).astype("float32")[np.newaxis]
+
+
+def _write(path: str, width: int, height: int, overviews: list[int] | None = None, **options):
+    with rasterio.open(path, "w", **_profile(width, height, **options)) as dst:
+        dst.write(_data(width, height))
+        if overviews:
+            dst.build_overviews(overviews, Resampling.average)
+
+
+def _cog(path: str, width: int, height: int, **options):
+    """Write through GDAL's COG driver (ghost header, overviews before data)."""
+    tmp_path = f"{path}.src.tif"
+    _write(tmp_path, width, height, tiled=True, blockxsize=256, blockysize=256)
+    with rasterio.open(tmp_path) as src:
+        profile = {**src.profile, "driver": "COG", "blocksize": 256, "compress": "deflate",
+                   "overview_resampling": "average", **options}
+        for key in ("tiled", "blockxsize", "blockysize", "interleave"):
+            profile.pop(key, None)
+        with rasterio.open(path, "w", **profile) as dst:
+            dst.write(src.read())
+    os.remove(tmp_path)
+
+
+def _cog_edited(path: str, width: int, height: int):
+    """COG whose ghost header flags the layout as broken by a later edit.
+
+    GDAL flips KNOWN_INCOMPATIBLE_EDITION in place (the trailing space
+    leaves room for YES) when an update can't keep the layout; do the same.
+    """
+    _cog(path, width, height)
+    with open(path, "r+b") as f:
+        head = f.read(1024)
+        f.seek(0)
+        f.write(head.replace(b"KNOWN_INCOMPATIBLE_EDITION=NO\n ", b"KNOWN_INCOMPATIBLE_EDITION=YES\n", 1))
+
+
+def _external_ovr(path: str, width: int, height: int):
+    _write(path, width, height, tiled=True, blockxsize=256, blockysize=256)
+    with rasterio.Env(TIFF_USE_OVR=True), rasterio.open(path, "r+") as dst:
+        dst.build_overviews([2, 4], Resampling.average)
+
+
+FIXTURES = [
+    ("cog", lambda p: _cog(p, 2048, 1536)),
+    ("cog_bigtiff", lambda p: _cog(p, 2048, 1536, BIGTIFF="YES")),
+    ("cog_edited", lambda p: _cog_edited(p, 2048, 1536)),
+    ("tiled_overviews_appended", lambda p: _write(p, 2048, 1536, [2, 4], tiled=True, blockxsize=256,
+                                                  blockysize=256)),
+    ("tiled_no_overviews", lambda p: _write(p, 1024, 1024, tiled=True, blockxsize=256, blockysize=256)),
+    ("untiled", lambda p: _write(p, 1024, 768)),
+    ("untiled_overviews", lambda p: _write(p, 1024, 768, [2])),
+    ("small_untiled", lambda p: _write(p, 300, 200)),
+    ("external_ovr", lambda p: _external_ovr(p, 2048, 1536)),
+]
+
+
+def fixtures_write(directory: str) -> list[str]:
+    """Write FIXTURES into directory → their paths."""
+    paths = []
+    for name, write in FIXTURES:
+        path = os.path.join(directory, f"{name}.tif")
+        write(path)
+        paths.append(path)
+    return paths
+
+
+def cog_parity(paths: list[str]) -> list[str]:
+    """cog_validate_dataset vs cog_validate on each file → mismatch descriptions."""
+    mismatches = []
+    for path in paths:
+        expected = cog_validate(path, quiet=True)
+        with rasterio.open(path) as src:
+            actual = cog_validate_dataset(src)
+        name = os.path.basename(path)
+        if tuple(actual) != tuple(expected):
+            mismatches.append(f"{name}: cog_validate_dataset {actual} != cog_validate {expected}")
+        logger.info("%-28s cog_validate %-5s errors %d warnings %d%s", name, expected[0],
+                    len(expected[1]), len(expected[2]), "" if tuple(actual) == tuple(expected) else "  MISMATCH")
+    return mismatches
+
+
+def _serve(directory: str, mode: str) -> http.server.ThreadingHTTPServer:
+    """Serve directory on a free port in a daemon thread; mode is one of SERVER_MODES."""
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            path = os.path.join(directory, os.path.basename(self.path))
+            if not os.path.isfile(path):
+                self.send_error(404)
+                return
+            with open(path, "rb") as f:
+                data = f.read()
+            match = re.fullmatch(r"bytes=(\d+)-(\d+)", self.headers.get("Range", ""))
+            if match is None or mode == "no-range":
+                self.send_response(200)
+                body = data
+            else:
+                start, end = int(match.group(1)), min(int(match.group(2)), len(data) - 1)
+                if mode == "short":
+                    end = start + (end - start) // 2
+                body = data[start:end + 1]
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # header_read stops reading a 200 once it has enough bytes
+
+        def log_message(self, format, *args):
+            pass
+
+    class Server(http.server.ThreadingHTTPServer):
+        def handle_error(self, request, client_address):
+            pass
+
+    server = Server(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _close(a: list[float], b: list[float]) -> bool:
+    return len(a) == len(b) and all(math.isclose(x, y, rel_tol=0, abs_tol=1e-6) for x, y in zip(a, b))
+
+
+def header_parity(directory: str, paths: list[str]) -> list[str]:
+    """header_read over HTTP vs rasterio and cog_validate → mismatch descriptions."""
+    mismatches = []
+    for mode in SERVER_MODES:
+        server = _serve(directory, mode)
+        try:
+            decided = 0
+            for path in paths:
+                name = os.path.basename(path)
+                if os.path.exists(f"{path}.ovr"):
+                    continue  # sidecars are invisible to a header read; never used on the objectstore
+                header = header_read(f"http://127.0.0.1:{server.server_port}/{name}")
+                if header is None:
+                    continue
+                decided += 1
+                if mode == "short":
+                    mismatches.append(f"{name} [{mode}]: parsed a truncated range response")
+                    continue
+                with rasterio.open(path) as src:
+                    expected = {"epsg": src.crs.to_epsg(), "width": src.width, "height": src.height,
+                                "transform": list(src.transform)[:6], "bounds": list(src.bounds)}
+                expected["is_cog"] = cog_validate(path, quiet=True)[0]
+                for key, value in expected.items():
+                    same = _close(header[key], value) if key in ("transform", "bounds") else header[key] == value
+                    if not same:
+                        mismatches.append(f"{name} [{mode}]: {key} {header[key]} != {value}")
+            logger.info("header_read [%s]: %d of %d files decided (the rest fall back to rasterio)",
+                        mode, decided, len(paths))
+        finally:
+            server.shutdown()
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the GeoTIFF readers against rio-cogeo and rasterio")
+    parser.add_argument("--check", action="store_true", help="Write the fixture corpus and run both checks")
+    parser.add_argument("--keep", help="Write the fixtures here and keep them (default: a temporary directory)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s",
+                        datefmt="%Y-%m-%d %H:%M:%S")
+    logging.getLogger("rasterio").setLevel(logging.ERROR)  # GDAL warns on every open of cog_edited
+
+    if not args.check:
+        parser.print_help()
+        return 1
+    if cog_validate is None:
+        logger.error("rio-cogeo is the parity reference: pip install rio-cogeo")
+        return 1
+
+    directory = args.keep or tempfile.mkdtemp(prefix="geotiff_check_")
+    os.makedirs(directory, exist_ok=True)
+    try:
+        paths = fixtures_write(directory)
+        mismatches = cog_parity(paths) + header_parity(directory, paths)
+    finally:
+        if not args.keep:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    for mismatch in mismatches:
+        logger.error("MISMATCH: %s", mismatch)
+    if mismatches:
+        logger.error("%d mismatches", len(mismatches))
+        return 1
+    logger.info("No mismatches")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,389 @@
+"""
+Lightweight GeoTIFF header reader for metadata extraction.
+
+Fetches the first few KB of a remote GeoTIFF with an HTTP Range request
+(growing the range only when IFDs or tag arrays spill past it), walks the
+TIFF IFD chain and decodes everything stac_utils.geotiff_extract_metadata
+needs: EPSG from the GeoKeys, shape, affine transform, native bounds and
+the COG layout checks of rio_cogeo.cog_validate. No GDAL involved.
+
+The parser is deliberately conservative: anything it cannot decide with
+certainty (user-defined CRS, PixelIsPoint rasters, GCPs, vertical CRS,
+unusual GeoKeys, non-TIFF bytes, HTTP errors) returns None, and the
+caller falls back to the rasterio path.
+
+Used by:
+- stac_utils.py (geotiff_extract_metadata fast path)
+- geotiff_check.py (--check, parity against rasterio over a local HTTP server)
+"""
+
+import logging
+import struct
+import threading
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Initial range request; GDAL-written COGs keep every IFD and tag array in
+# the first few KB ("ghost header" layout), so one request usually suffices.
+HEADER_BYTES_INITIAL = 16 * 1024
+HEADER_BYTES_MAX = 1024 * 1024
+
+# TIFF field type → (struct format char, byte size)
+_TIFF_TYPES = {
+    1: ("B", 1), 2: ("c", 1), 3: ("H", 2), 4: ("I", 4), 5: ("II", 8),
+    6: ("b", 1), 7: ("B", 1), 8: ("h", 2), 9: ("i", 4), 10: ("ii", 8),
+    11: ("f", 4), 12: ("d", 8), 13: ("I", 4), 16: ("Q", 8), 17: ("q", 8), 18: ("Q", 8),
+}
+
+TAG_NEW_SUBFILE_TYPE = 254
+TAG_IMAGE_WIDTH = 256
+TAG_IMAGE_LENGTH = 257
+TAG_STRIP_OFFSETS = 273
+TAG_TILE_WIDTH = 322
+TAG_TILE_OFFSETS = 324
+TAG_MODEL_PIXEL_SCALE = 33550
+TAG_MODEL_TIEPOINT = 33922
+TAG_MODEL_TRANSFORMATION = 34264
+TAG_GEO_KEY_DIRECTORY = 34735
+
+GEOKEY_MODEL_TYPE = 1024
+GEOKEY_RASTER_TYPE = 1025
+GEOKEY_GEOGRAPHIC_TYPE = 2048
+GEOKEY_GEOG_ANGULAR_UNITS = 2054
+GEOKEY_PROJECTED_CS_TYPE = 3072
+GEOKEY_PROJ_LINEAR_UNITS = 3076
+
+# GeoKeys that never change how GDAL resolves an EPSG-coded CRS. Citations
+# are free text; the unit keys are accepted only at their EPSG defaults.
+_GEOKEYS_ACCEPTED = {
+    GEOKEY_MODEL_TYPE, GEOKEY_RASTER_TYPE, 1026, GEOKEY_GEOGRAPHIC_TYPE, 2049,
+    GEOKEY_GEOG_ANGULAR_UNITS, GEOKEY_PROJECTED_CS_TYPE, 3073, GEOKEY_PROJ_LINEAR_UNITS,
+}
+
+_local = threading.local()
+
+
+class HeaderTruncated(Exception):
+    """Raised when the parser needs bytes beyond the fetched range."""
+
+    def __init__(self, needed: int):
+        super().__init__(f"header needs {needed} bytes")
+        self.needed = needed
+
+
+class _Reader:
+    """Bounds-checked struct access over a partial file buffer."""
+
+    def __init__(self, buf: bytes):
+        self.buf = buf
+        if buf[:2] == b"II":
+            self.order = "<"
+        elif buf[:2] == b"MM":
+            self.order = ">"
+        else:
+            raise ValueError("not a TIFF file")
+        magic = self.unpack("H", 2)[0]
+        if magic == 42:
+            self.bigtiff = False
+            self.first_ifd = self.unpack("I", 4)[0]
+        elif magic == 43:
+            self.bigtiff = True
+            self.first_ifd = self.unpack("Q", 8)[0]
+        else:
+            raise ValueError(f"unknown TIFF magic {magic}")
+
+    def unpack(self, fmt: str, offset: int) -> tuple:
+        fmt = self.order + fmt
+        end = offset + struct.calcsize(fmt)
+        if end > len(self.buf):
+            raise HeaderTruncated(end)
+        return struct.unpack_from(fmt, self.buf, offset)
+
+
+def _ifd_read(r: _Reader, offset: int) -> tuple[dict, int]:
+    """Read one IFD → ({tag: (type, count, value_offset)}, next IFD offset).
+
+    value_offset is where the values live: inline in the entry when they fit,
+    otherwise the file offset stored in the entry.
+    """
+    if r.bigtiff:
+        count_fmt, entry_fmt, entry_size, inline_size, next_fmt = "Q", "HHQ", 20, 8, "Q"
+    else:
+        count_fmt, entry_fmt, entry_size, inline_size, next_fmt = "H", "HHI", 12, 4, "I"
+    count_size = struct.calcsize(count_fmt)
+
+    n_entries = r.unpack(count_fmt, offset)[0]
+    tags = {}
+    for i in range(n_entries):
+        entry = offset + count_size + i * entry_size
+        tag, typ, count = r.unpack(entry_fmt, entry)
+        if typ not in _TIFF_TYPES:
+            continue
+        size = _TIFF_TYPES[typ][1] * count
+        value_at = entry + entry_size - inline_size
+        if size > inline_size:
+            value_at = r.unpack(next_fmt, value_at)[0]
+        tags[tag] = (typ, count, value_at)
+    next_ifd = r.unpack(next_fmt, offset + count_size + n_entries * entry_size)[0]
+    return tags, next_ifd
+
+
+def _tag_values(r: _Reader, tags: dict, tag: int, start: int = 0, n: int | None = None) -> list:
+    """Decode values [start, start + n) of a tag (all remaining when n is None)."""
+    typ, count, value_at = tags[tag]
+    fmt, size = _TIFF_TYPES[typ]
+    n = max(count - start if n is None else min(n, count - start), 0)
+    offset = value_at + start * size
+    # Bounds-check before building the format: count comes from the file
+    if offset + n * size > len(r.buf):
+        raise HeaderTruncated(offset + n * size)
+    values = r.unpack(f"{n * len(fmt)}{fmt[0]}", offset)
+    if typ in (5, 10):
+        return [values[i] / values[i + 1] for i in range(0, len(values), 2)]
+    return list(values)
+
+
+def _tag_value(r: _Reader, tags: dict, tag: int, default=None):
+    return _tag_values(r, tags, tag, n=1)[0] if tag in tags else default
+
+
+def _first_data_offset(r: _Reader, tags: dict) -> int | None:
+    """Offset of the first non-empty tile/strip (BLOCK_OFFSET walk in cog_validate)."""
+    tag = TAG_TILE_OFFSETS if TAG_TILE_OFFSETS in tags else TAG_STRIP_OFFSETS
+    if tag not in tags:
+        return None
+    count = tags[tag][1]
+    for i in range(count):
+        offset = _tag_values(r, tags, tag, start=i, n=1)[0]
+        if offset > 0:
+            return offset
+    return None
+
+
+def _geokeys(r: _Reader, tags: dict) -> dict | None:
+    """Decode SHORT-valued GeoKeys → {key_id: value}, None when absent.
+
+    Keys stored in the double/ascii params tags are recorded with value None;
+    none of the keys the EPSG lookup relies on live there.
+    """
+    if TAG_GEO_KEY_DIRECTORY not in tags:
+        return None
+    header = _tag_values(r, tags, TAG_GEO_KEY_DIRECTORY, n=4)
+    n_keys = header[3]
+    entries = _tag_values(r, tags, TAG_GEO_KEY_DIRECTORY, start=4, n=n_keys * 4)
+    keys = {}
+    for i in range(0, len(entries), 4):
+        key_id, location, _, value = entries[i:i + 4]
+        keys[key_id] = value if location == 0 else None
+    return keys
+
+
+def _epsg_from_geokeys(keys: dict) -> int | None:
+    """EPSG code GDAL would report for these GeoKeys, None when unsure."""
+    if set(keys) - _GEOKEYS_ACCEPTED:
+        return None
+    if keys.get(GEOKEY_RASTER_TYPE, 1) != 1:
+        # PixelIsPoint: GDAL shifts the transform by half a pixel
+        return None
+    if keys.get(GEOKEY_PROJ_LINEAR_UNITS, 9001) != 9001:
+        return None
+    if keys.get(GEOKEY_GEOG_ANGULAR_UNITS, 9102) != 9102:
+        return None
+
+    model = keys.get(GEOKEY_MODEL_TYPE)
+    if model == 1:
+        code = keys.get(GEOKEY_PROJECTED_CS_TYPE)
+    elif model == 2:
+        code = keys.get(GEOKEY_GEOGRAPHIC_TYPE)
+    else:
+        return None
+    # 32767 = user-defined; 0/None = missing
+    if not code or code >= 32767:
+        return None
+    return code
+
+
+def _transform(r: _Reader, tags: dict) -> list[float] | None:
+    """6-element affine (rasterio order) from the GeoTIFF model tags.
+
+    Same precedence as GDAL: pixel scale + a single tiepoint, then the
+    transformation matrix. Multiple tiepoints are GCPs — undecidable here.
+    """
+    if TAG_MODEL_PIXEL_SCALE in tags and TAG_MODEL_TIEPOINT in tags:
+        sx, sy = _tag_values(r, tags, TAG_MODEL_PIXEL_SCALE, n=2)
+        tiepoints = _tag_values(r, tags, TAG_MODEL_TIEPOINT)
+        if len(tiepoints) != 6 or sx == 0 or sy == 0:
+            return None
+        i, j, _, x, y, _ = tiepoints
+        return [float(sx), 0.0, float(x - i * sx), 0.0, float(-sy), float(y - j * -sy)]
+    if TAG_MODEL_TRANSFORMATION in tags:
+        m = _tag_values(r, tags, TAG_MODEL_TRANSFORMATION)
+        if len(m) != 16:
+            return None
+        return [float(m[0]), float(m[1]), float(m[3]), float(m[4]), float(m[5]), float(m[7])]
+    return None
+
+
+def _bounds(transform: list[float], width: int, height: int) -> list[float]:
+    """Native bounds [left, bottom, right, top], matching rasterio's dataset.bounds."""
+    a, b, c, d, e, f = transform
+    xs = [c, a * width + c, b * height + c, a * width + b * height + c]
+    ys = [f, d * width + f, e * height + f, d * width + e * height + f]
+    return [min(xs), min(ys), max(xs), max(ys)]
+
+
+def _cog_errors(r: _Reader, levels: list[dict]) -> list[str]:
+    """COG layout errors for the main image + overviews (cog_validate checks).
+
+    External .ovr sidecars are not visible from the header; they are never
+    used on the objectstore.
+    """
+    errors = []
+    main = levels[0]
+    overviews = levels[1:]
+
+    for ix, level in enumerate(levels):
+        if level["width"] > 512 or level["height"] > 512:
+            if level["block_width"] == level["width"]:
+                errors.append("not tiled" if ix == 0 else f"overview {ix - 1} not tiled")
+
+    if main["ifd_offset"] > 300:
+        errors.append("main IFD offset > 300")
+
+    ghost_at = 16 if r.bigtiff else 8
+    ghost = r.buf[ghost_at:ghost_at + 512]
+    if ghost.startswith(b"GDAL_STRUCTURAL_METADATA") and b"KNOWN_INCOMPATIBLE_EDITION=YES" in ghost:
+        errors.append("layout optimizations invalidated")
+
+    for ix, level in enumerate(overviews):
+        if level["decimation"] <= 1:
+            errors.append(f"invalid decimation for overview {ix}")
+        if level["ifd_offset"] < levels[ix]["ifd_offset"]:
+            errors.append(f"IFD of overview {ix} before previous level")
+
+    data_offsets = [level["data_offset"] for level in levels if level["data_offset"]]
+    if data_offsets and data_offsets[-1] < levels[-1]["ifd_offset"]:
+        errors.append("first block of smallest level before its IFD")
+    for i in range(len(data_offsets) - 2, -1, -1):
+        if data_offsets[i] < data_offsets[i + 1]:
+            errors.append(f"first block of level {i} before level {i + 1}")
+    return errors
+
+
+def header_parse(buf: bytes) -> dict | None:
+    """Parse GeoTIFF metadata and COG status from the leading bytes of a file.
+
+    Raises HeaderTruncated when more bytes are needed. Returns None when the
+    header is readable but undecidable without GDAL.
+
+    Returns dict with is_cog, epsg, height, width, transform, bounds (lists).
+    """
+    r = _Reader(buf)
+
+    levels = []
+    geo_tags = None
+    offset = r.first_ifd
+    seen = set()
+    while offset and offset not in seen:
+        seen.add(offset)
+        tags, next_offset = _ifd_read(r, offset)
+        subfile_type = _tag_value(r, tags, TAG_NEW_SUBFILE_TYPE, 0)
+        if geo_tags is None:
+            geo_tags = tags
+        elif subfile_type & 4 or not subfile_type & 1:
+            # Mask or non-overview page: not part of the overview pyramid
+            offset = next_offset
+            continue
+        width = _tag_value(r, tags, TAG_IMAGE_WIDTH)
+        height = _tag_value(r, tags, TAG_IMAGE_LENGTH)
+        if not width or not height:
+            return None
+        levels.append({
+            "ifd_offset": offset,
+            "width": width,
+            "height": height,
+            "block_width": _tag_value(r, tags, TAG_TILE_WIDTH, width),
+            "decimation": round(levels[0]["width"] / width) if levels else 1,
+            "data_offset": _first_data_offset(r, tags),
+        })
+        offset = next_offset
+
+    if not levels:
+        return None
+    decimations = [level["decimation"] for level in levels[1:]]
+    if decimations != sorted(decimations):
+        # GDAL reorders unsorted overviews; leave that to the rasterio path
+        return None
+
+    keys = _geokeys(r, geo_tags)
+    if keys is None:
+        return None
+    epsg = _epsg_from_geokeys(keys)
+    transform = _transform(r, geo_tags)
+    if epsg is None or transform is None:
+        return None
+
+    width, height = levels[0]["width"], levels[0]["height"]
+    return {
+        "is_cog": not _cog_errors(r, levels),
+        "epsg": epsg,
+        "height": height,
+        "width": width,
+        "transform": transform,
+        "bounds": _bounds(transform, width, height),
+    }
+
+
+def _session() -> requests.Session:
+    """Per-thread keep-alive session (requests.Session is not thread-safe)."""
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+    return _local.session
+
+
+def _range_get(session: requests.Session, url: str, n_bytes: int, timeout: int) -> tuple[bytes, int | None]:
+    """GET the first n_bytes of url → (bytes, total file size if known)."""
+    headers = {"Range": f"bytes=0-{n_bytes - 1}"}
+    with session.get(url, headers=headers, timeout=timeout, stream=True) as resp:
+        resp.raise_for_status()
+        if resp.status_code == 206:
+            data = resp.content
+            total = resp.headers.get("Content-Range", "").rpartition("/")[2]
+            total = int(total) if total.isdigit() else None
+            expected = n_bytes if total is None else min(n_bytes, total)
+            if len(data) < expected:
+                raise ValueError(f"short range response: {len(data)} of {expected} bytes")
+            return data, total
+        # Server ignored the Range header: read just what we asked for
+        data = resp.raw.read(n_bytes)
+        return data, len(data) if len(data) < n_bytes else None
+
+
+def header_read(url: str, session: requests.Session | None = None,
+                initial_bytes: int = HEADER_BYTES_INITIAL, timeout: int = 30) -> dict | None:
+    """Fetch and parse a remote GeoTIFF header, None when undecidable.
+
+    Starts with initial_bytes and re-requests a larger range (at least
+    doubling) while IFDs or tag arrays spill past it, up to HEADER_BYTES_MAX.
+    url must already be fixed/encoded (see stac_utils.fix_url).
+    """
+    session = session or _session()
+    n_bytes = initial_bytes
+    try:
+        while True:
+            buf, total = _range_get(session, url, n_bytes, timeout)
+            try:
+                return header_parse(buf)
+            except HeaderTruncated as e:
+                if total is not None and e.needed > total:
+                    logger.debug("Header of %s points past end of file", url)
+                    return None
+                n_bytes = max(e.needed, n_bytes * 2)
+                if n_bytes > HEADER_BYTES_MAX:
+                    logger.debug("Header of %s exceeds %d bytes", url, HEADER_BYTES_MAX)
+                    return None
+    except (requests.RequestException, ValueError, struct.error) as e:
+        logger.debug("Fast header read failed for %s: %s", url, e)
+        return None
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Sharded NDJSON item bundles for bulk loading.
+
+A bundle is a directory of gzip-compressed NDJSON shards, one compact item
+JSON per line, plus a manifest:
+
+    bundles/20260301T092300Z/
+        items-0000.ndjson.gz     # items_per_shard items each
+        items-0001.ndjson.gz
+        manifest.json            # {collection, created, total, shards: [...]}
+
+A whole catalog is then a few sequential reads instead of one GET per item
+(`pypgstac load items` reads NDJSON directly). Shards are gzipped with a
+zero mtime, so the same items in the same order give the same bytes.
+
+item_create.py writes a bundle of the items it builds (--bundle also|only),
+and every --incremental run writes a delta: a bundle under deltas/ of the
+run's new items plus deleted.txt, the ids of items whose source URLs
+detect_changes.R found deleted (data/urls_deleted.txt). Deltas replay onto
+a snapshot in timestamp order (see delta_replay.py).
+
+This script bundles an existing directory of loose item JSONs, e.g. to
+produce a full-catalog snapshot.
+
+Usage:
+    python scripts/item_bundle.py                              # bundle the prod output dir
+    python scripts/item_bundle.py --test --items-per-shard 5000
+    python scripts/item_bundle.py --src /path/to/items --dest /tmp/bundle
+
+Used by:
+- item_create.py (--bundle, --incremental deltas)
+- delta_replay.py
+"""
+
+import argparse
+import glob
+import gzip
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+from datetime import datetime, timezone
+
+from tqdm import tqdm
+
+from stac_utils import get_output_dir
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+ITEMS_PER_SHARD = 10000
+
+
+def ndjson_line(item_dict: dict) -> bytes:
+    """Compact single-line JSON for an item (orjson when installed)."""
+    if orjson is not None:
+        return orjson.dumps(item_dict)
+    return json.dumps(item_dict, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def bundle_dir_default(path_local: str, kind: str = "bundles") -> str:
+    """Fresh timestamped directory under {path_local}/{kind}/ (bundles or deltas)."""
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    return os.path.join(path_local, kind, stamp)
+
+
+class BundleWriter:
+    """Write item lines into rotating items-NNNN.ndjson.gz shards.
+
+    Thread-safe. Each shard is written under a .tmp name and renamed when
+    full; manifest.json is written last on close, so a bundle with a
+    manifest is complete. A delta is a bundle that also lists deleted item
+    ids (tombstones).
+    """
+
+    def __init__(self, path_dir: str, collection_id: str, items_per_shard: int = ITEMS_PER_SHARD):
+        self.path_dir = path_dir
+        self.collection_id = collection_id
+        self.items_per_shard = items_per_shard
+        self.shards: list[dict] = []
+        self.lock = threading.Lock()
+        self.file = None
+        self.count = 0
+        self.deleted = None
+        os.makedirs(path_dir, exist_ok=True)
+
+    def add(self, line: bytes):
+        with self.lock:
+            if self.file is None:
+                self._open()
+            self.gz.write(line)
+            self.gz.write(b"\n")
+            self.count += 1
+            if self.count >= self.items_per_shard:
+                self._close_shard()
+
+    def _open(self):
+        self.name = f"items-{len(self.shards):04d}.ndjson.gz"
+        self.tmp_path = os.path.join(self.path_dir, f"{self.name}.tmp")
+        self.file = open(self.tmp_path, "wb")
+        self.gz = gzip.GzipFile(filename="", mode="wb", fileobj=self.file, mtime=0)
+        self.count = 0
+
+    def _close_shard(self):
+        self.gz.close()
+        self.file.close()
+        path = os.path.join(self.path_dir, self.name)
+        os.replace(self.tmp_path, path)
+        sha256 = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                sha256.update(chunk)
+        self.shards.append({
+            "href": self.name,
+            "count": self.count,
+            "bytes": os.path.getsize(path),
+            "sha256": sha256.hexdigest(),
+        })
+        self.file = None
+        self.count = 0
+
+    def tombstones(self, item_ids: list[str]):
+        """Record deleted item ids (deleted.txt, sorted) in this bundle."""
+        ids = sorted(set(item_ids))
+        with open(os.path.join(self.path_dir, "deleted.txt"), "w") as f:
+            f.writelines(f"{item_id}\n" for item_id in ids)
+        self.deleted = {"href": "deleted.txt", "count": len(ids)}
+
+    def close(self) -> dict:
+        """Finish the last shard and write manifest.json; returns the manifest."""
+        with self.lock:
+            if self.file is not None:
+                self._close_shard()
+            manifest = {
+                "collection": self.collection_id,
+                "created": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "format": "application/x-ndjson+gzip",
+                "total": sum(shard["count"] for shard in self.shards),
+                "shards": self.shards,
+            }
+            if self.deleted is not None:
+                manifest["deleted"] = self.deleted
+            path_manifest = os.path.join(self.path_dir, "manifest.json")
+            with open(f"{path_manifest}.tmp", "w") as f:
+                json.dump(manifest, f, indent=2)
+            os.replace(f"{path_manifest}.tmp", path_manifest)
+        logger.info("Wrote bundle %s: %d items in %d shards, %d deleted",
+                    self.path_dir, manifest["total"], len(self.shards),
+                    manifest.get("deleted", {}).get("count", 0))
+        return manifest
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def bundle_read(path_dir: str):
+    """Yield item dicts from a bundle, shard by shard in manifest order."""
+    with open(os.path.join(path_dir, "manifest.json")) as f:
+        manifest = json.load(f)
+    for shard in manifest["shards"]:
+        with gzip.open(os.path.join(path_dir, shard["href"]), "rb") as f:
+            for line in f:
+                yield json.loads(line)
+
+
+def bundle_deleted(path_dir: str) -> list[str]:
+    """Tombstoned item ids of a delta ([] for a plain bundle)."""
+    with open(os.path.join(path_dir, "manifest.json")) as f:
+        deleted = json.load(f).get("deleted")
+    if deleted is None:
+        return []
+    with open(os.path.join(path_dir, deleted["href"])) as f:
+        return f.read().splitlines()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bundle loose STAC item JSONs into NDJSON shards")
+    parser.add_argument("--test", action="store_true", help="Use the dev output directory")
+    parser.add_argument("--src", help="Directory of item JSONs (default: the output directory)")
+    parser.add_argument("--dest", help="Bundle directory (default: <src>/bundles/<timestamp>)")
+    parser.add_argument("--items-per-shard", type=int, default=ITEMS_PER_SHARD,
+                        help=f"Items per shard (default: {ITEMS_PER_SHARD})")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s",
+                        datefmt="%H:%M:%S")
+
+    path_src = args.src or get_output_dir(test_only=args.test)
+    path_collection = os.path.join(path_src, "collection.json")
+    if not os.path.exists(path_collection):
+        logger.error("collection.json not found in %s", path_src)
+        return 1
+    with open(path_collection) as f:
+        collection_id = json.load(f)["id"]
+
+    paths = sorted(p for p in glob.glob(os.path.join(path_src, "*.json"))
+                   if os.path.basename(p) != "collection.json")
+    logger.info("Bundling %d item JSONs from %s", len(paths), path_src)
+
+    with BundleWriter(args.dest or bundle_dir_default(path_src), collection_id,
+                      items_per_shard=args.items_per_shard) as writer:
+        for path in tqdm(paths, desc="Bundling items"):
+            with open(path, "rb") as f:
+                writer.add(ndjson_line(json.load(f)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
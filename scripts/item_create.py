@@ -11,52 +11,95 @@ Usage:
     python scripts/item_create.py --test --test-count 50   # Test with 50 items
     python scripts/item_create.py --incremental            # Process only new URLs
     python scripts/item_create.py --reprocess-invalid      # Re-process invalid items
+    python scripts/item_create.py --incremental --engine async --concurrency 128
+    python scripts/item_create.py --executor process --workers 8
+    python scripts/item_create.py --bundle also --items-per-shard 10000
+
+Every --incremental run (outside --test) also writes a delta under
+deltas/<timestamp>/ (see item_bundle.py) for upsert-based registration.
+A run with no new URLs but deletions in data/urls_deleted.txt writes a
+tombstone-only delta and builds nothing.
 """
 
 import argparse
 import concurrent.futures
+import functools
 import glob
 import logging
+import multiprocessing
 import os
 import sys
+import tempfile
 
-import pandas as pd
 import pystac
 import rio_stac
 from datetime import datetime, timezone
-from pystac import Link, RelType
 from tqdm import tqdm
 
+from collection_links import LINK_LAYOUTS, ItemLinks, collection_load, collection_save, item_href
+from extract_async import metadata_extract_batch
+from item_bundle import ITEMS_PER_SHARD, BundleWriter, bundle_dir_default, ndjson_line
+from item_hashes import ITEM_HASHES_NAME, ItemHashes, item_write
+from metadata_cache import (
+    CACHE_SCHEMA,
+    CacheAppender,
+    MetadataLookup,
+    cache_compact,
+    cache_load,
+    cache_needs_upgrade,
+)
 from stac_utils import (
     geotiff_extract_metadata,
     item_create_from_cache,
+    item_dict_from_cache,
     date_extract_from_path,
     datetime_parse_item,
     encode_url_for_gdal,
     fix_url,
     get_output_dir,
     url_to_item_id,
+    GDAL_PROFILES,
     PATH_S3,
     PATH_S3_JSON,
-    PATH_S3_STAC,
     PATH_RESULTS_CSV,
 )
 
 logger = logging.getLogger(__name__)
 
+URLS_DELETED_FILE = "data/urls_deleted.txt"
+
+STAC_IO = pystac.StacIO.default()
+
+
+def deleted_item_ids() -> list[str]:
+    """Ids of items whose source URLs detect_changes.R found deleted ([] if none)."""
+    if not os.path.exists(URLS_DELETED_FILE):
+        return []
+    with open(URLS_DELETED_FILE) as f:
+        return [url_to_item_id(url) for url in f.read().splitlines() if url]
+
 
 # =============================================================================
 # Item Processing
 # =============================================================================
 
 def process_item(path_item: str, collection_id: str, path_local: str,
-                 results_lookup: dict) -> dict | None:
+                 results_lookup: MetadataLookup, emit: str = "pystac",
+                 loose: bool = True, bundle: bool = False,
+                 hashes: ItemHashes | dict[str, str] | None = None) -> dict | None:
     """Process a single GeoTIFF URL to create a STAC item.
 
     Uses cached metadata when available (no remote read). Falls back to
     rio_stac for cache misses (should not happen if validation ran first).
-
-    Returns dict with item_id and item object, or None if processing fails.
+    emit="direct" writes cache hits from item_dict_from_cache without
+    building a pystac.Item (same bytes; see emit_verify). loose writes
+    {path_local}/{item_id}.json, skipped when the JSON matches its hash in
+    hashes (the previous build's, see item_hashes.py); bundle returns the
+    item's NDJSON line.
+
+    Returns dict with item_id, item object (None when emitted directly),
+    line (None unless bundle), and the JSON's hash and write status (None
+    unless loose), or None if processing fails.
     """
     href_item = fix_url(path_item)
     check = results_lookup.get(href_item)
@@ -83,7 +126,30 @@ def process_item(path_item: str, collection_id: str, path_local: str,
         "image/tiff; application=geotiff"
     )
 
+    path_item_json = f"{path_local}/{item_id}.json"
+    previous_hash = hashes.get(item_id) if hashes is not None else None
+    result = {"id": item_id, "item": None, "line": None, "hash": None, "status": None}
+
     try:
+        # Cache hit, direct emit: cached metadata → dict → JSON
+        if check.get("epsg") is not None and emit == "direct":
+            item_dict = item_dict_from_cache(
+                url=path_item,
+                item_id=item_id,
+                metadata=check,
+                collection_id=collection_id,
+                collection_url=PATH_S3_JSON,
+                media_type=media_type,
+                item_datetime=item_time,
+                datetime_unknown=datetime_is_unknown,
+            )
+            if loose:
+                result["hash"], result["status"] = item_write(
+                    path_item_json, STAC_IO.json_dumps(item_dict), previous_hash)
+            if bundle:
+                result["line"] = ndjson_line(item_dict)
+            return result
+
         # Cache hit: build from metadata (no remote read)
         if check.get("epsg") is not None:
             item = item_create_from_cache(
@@ -117,89 +183,194 @@ def process_item(path_item: str, collection_id: str, path_local: str,
         if datetime_is_unknown:
             item.properties["datetime_unknown"] = True
 
-        path_item_json = f"{path_local}/{item_id}.json"
-        item.save_object(dest_href=path_item_json, include_self_link=False)
-
-        return {"id": item_id, "item": item}
+        # Same bytes as item.save_object(dest_href=..., include_self_link=False)
+        item_dict = item.to_dict(include_self_link=False)
+        if loose:
+            result["hash"], result["status"] = item_write(
+                path_item_json, STAC_IO.json_dumps(item_dict), previous_hash)
+        if bundle:
+            result["line"] = ndjson_line(item_dict)
+        result["item"] = item
+        return result
     except Exception as e:
         logger.error("Error processing %s: %s", href_item, e)
         return None
 
 
+def emit_verify(urls: list[str], collection_id: str, results_lookup: MetadataLookup,
+                sample: int = 20) -> bool:
+    """Check direct emit against the pystac path, byte for byte.
+
+    Writes up to `sample` cache-hit items (spread across urls) both ways into
+    scratch directories and compares the files.
+    """
+    hits = [url for url in urls if (results_lookup.get(fix_url(url)) or {}).get("epsg") is not None]
+    if not hits:
+        return True
+    step = max(1, len(hits) // sample)
+    with tempfile.TemporaryDirectory() as path_pystac, tempfile.TemporaryDirectory() as path_direct:
+        for url in hits[::step][:sample]:
+            expected = process_item(url, collection_id, path_pystac, results_lookup, emit="pystac")
+            actual = process_item(url, collection_id, path_direct, results_lookup, emit="direct")
+            if expected is None or actual is None:
+                continue
+            name = f"{expected['id']}.json"
+            with open(os.path.join(path_pystac, name), "rb") as f_expected, \
+                    open(os.path.join(path_direct, name), "rb") as f_actual:
+                if f_expected.read() != f_actual.read():
+                    logger.warning("Direct emit differs from pystac for %s", url)
+                    return False
+    return True
+
+
+def _build_shard(urls: list[str], collection_id: str, path_local: str,
+                 results_lookup: MetadataLookup, emit: str, loose: bool,
+                 bundle: bool, hashes: dict[str, str]) -> list[dict]:
+    """Process-pool task: build one shard of items → process_item results without the item."""
+    results = (process_item(url, collection_id, path_local, results_lookup, emit, loose, bundle, hashes)
+               for url in urls)
+    return [{**result, "item": None} for result in results if result]
+
+
+def items_build(urls: list[str], collection_id: str, path_local: str,
+                results_lookup: MetadataLookup, executor: str = "thread",
+                workers: int = 32, emit: str = "pystac", loose: bool = True,
+                bundles: list[BundleWriter] = (), hashes: ItemHashes | None = None) -> list[str]:
+    """Build and write items for urls in parallel; return the ids created.
+
+    executor="thread" runs process_item in a thread pool. executor="process"
+    splits urls into shards across a process pool (item construction and
+    serialization are GIL-bound); each shard is sent only its own slice of
+    the lookup and sends back only item ids (and NDJSON lines when
+    bundling). emit and loose are passed to process_item; items are added
+    to each of bundles (e.g. a --bundle output and an incremental delta) in
+    the parent, and the hashes of written items are recorded in hashes.
+    """
+    item_ids = []
+
+    def collect(result):
+        item_ids.append(result["id"])
+        for bundle in bundles:
+            bundle.add(result["line"])
+        if hashes is not None and result["hash"] is not None:
+            hashes.record(result["id"], result["hash"], result["status"])
+
+    if executor == "thread":
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+            results = tqdm(
+                pool.map(lambda url: process_item(url, collection_id, path_local, results_lookup,
+                                                  emit, loose, bool(bundles), hashes), urls),
+                total=len(urls),
+                desc="Creating STAC Items",
+            )
+            for result in filter(None, results):
+                collect(result)
+            return item_ids
+
+    # ~4 shards per worker keeps the pool busy when shards finish unevenly
+    shard_size = max(1, -(-len(urls) // (workers * 4)))
+    shards = [urls[i:i + shard_size] for i in range(0, len(urls), shard_size)]
+    ctx = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool, \
+            tqdm(total=len(urls), desc="Creating STAC Items") as progress:
+        futures = {
+            pool.submit(_build_shard, shard, collection_id, path_local,
+                        results_lookup.subset([fix_url(url) for url in shard]),
+                        emit, loose, bool(bundles),
+                        hashes.subset([url_to_item_id(url) for url in shard]) if hashes is not None else {}
+                        ): len(shard)
+            for shard in shards
+        }
+        for future in concurrent.futures.as_completed(futures):
+            for result in future.result():
+                collect(result)
+            progress.update(futures[future])
+    return item_ids
+
+
 # =============================================================================
 # Validation
 # =============================================================================
 
-def load_validation_cache(urls_to_check: list[str]) -> dict:
+def load_validation_cache(urls_to_check: list[str], engine: str = "thread",
+                          concurrency: int = 64, rate_limit: float = 0.0,
+                          gdal_profile: str = "default") -> MetadataLookup:
     """Load cached metadata and extract metadata for new URLs as needed.
 
-    Returns lookup dict: {url: {is_geotiff, is_cog, epsg, height, width, transform, bounds}}
+    engine selects how cache misses are extracted: "thread" runs
+    geotiff_extract_metadata in a thread pool, "async" multiplexes header
+    requests over pooled connections (extract_async.metadata_extract_batch)
+    with at most `concurrency` in flight and `rate_limit` requests/second.
+    gdal_profile names the stac_utils.GDAL_PROFILES entry used whenever a
+    file has to be opened with rasterio.
+
+    Returns a MetadataLookup: .get(url) → {is_geotiff, is_cog, epsg, height,
+    width, transform, bounds}, keyed by fix_url(url).
 
     Old cache rows (missing spatial columns) trigger re-extraction on cache miss
     in process_item via the rio_stac fallback path.
     """
-    all_columns = ["url", "is_geotiff", "is_cog", "epsg", "height", "width", "transform", "bounds"]
-
     if os.path.exists(PATH_RESULTS_CSV):
-        df_existing = pd.read_csv(PATH_RESULTS_CSV)
-        existing_urls = set(df_existing["url"])
-        logger.info("Loaded %d existing validation results", len(df_existing))
+        table_existing = cache_load()
+        existing_urls = set(table_existing.column("url").to_pylist())
+        logger.info("Loaded %d existing validation results", table_existing.num_rows)
     else:
-        df_existing = pd.DataFrame(columns=all_columns)
+        table_existing = CACHE_SCHEMA.empty_table()
         existing_urls = set()
         logger.info("No existing validation cache found, will validate all URLs")
 
     # Detect old-format rows missing spatial metadata (all spatial columns null).
     # Rows that were extracted but have epsg=None (no CRS) are NOT re-upgraded —
     # they'll have height/width/transform populated from the extraction.
-    needs_upgrade = set()
-    if "transform" in df_existing.columns:
-        for _, row in df_existing.iterrows():
-            if row.get("is_geotiff") and pd.isna(row.get("transform")):
-                needs_upgrade.add(row["url"])
-    else:
-        needs_upgrade = {row["url"] for _, row in df_existing.iterrows() if row["is_geotiff"]}
+    needs_upgrade = cache_needs_upgrade(table_existing)
 
     urls_to_validate = [url for url in urls_to_check
                         if url not in existing_urls or url in needs_upgrade]
     if needs_upgrade:
-        # Drop old rows that will be re-extracted with spatial metadata
+        # Old rows stay in the CSV until compaction; the re-extracted row is
+        # appended after them and wins on load
         urls_upgrading = needs_upgrade & set(urls_to_validate)
         if urls_upgrading:
-            df_existing = df_existing[~df_existing["url"].isin(urls_upgrading)]
             logger.info("%d cached URLs need spatial metadata upgrade", len(urls_upgrading))
 
     logger.info("%d URLs need metadata extraction (%d already cached with full metadata)",
                 len(urls_to_validate), len(urls_to_check) - len(urls_to_validate))
 
     if urls_to_validate:
-        logger.info("Extracting metadata from %d GeoTIFFs...", len(urls_to_validate))
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            new_results = list(tqdm(
-                executor.map(geotiff_extract_metadata, urls_to_validate),
-                total=len(urls_to_validate),
-                desc="Extracting GeoTIFF metadata"
-            ))
-
-        df_new = pd.DataFrame(new_results)
-        df_all = pd.concat([df_existing, df_new], ignore_index=True) if len(df_existing) > 0 else df_new
-        df_all.to_csv(PATH_RESULTS_CSV, index=False)
-        logger.info("Saved %d validation results to %s", len(df_all), PATH_RESULTS_CSV)
+        # Results are appended to the cache as they complete, so an
+        # interrupted run resumes without repeating finished remote reads
+        logger.info("Extracting metadata from %d GeoTIFFs (engine=%s)...", len(urls_to_validate), engine)
+        with CacheAppender(PATH_RESULTS_CSV) as appender, \
+                tqdm(total=len(urls_to_validate), desc="Extracting GeoTIFF metadata") as progress:
+
+            def on_result(record):
+                appender.append(record)
+                progress.update()
+
+            if engine == "async":
+                metadata_extract_batch(
+                    urls_to_validate,
+                    concurrency=concurrency,
+                    rate_limit=rate_limit,
+                    gdal_profile=gdal_profile,
+                    on_result=on_result,
+                )
+            else:
+                extract = functools.partial(geotiff_extract_metadata, gdal_profile=gdal_profile)
+                with concurrent.futures.ThreadPoolExecutor() as executor:
+                    futures = [executor.submit(extract, url) for url in urls_to_validate]
+                    for future in concurrent.futures.as_completed(futures):
+                        on_result(future.result())
+
+        cache_compact(PATH_RESULTS_CSV)
+        table_all = cache_load()
+        logger.info("Saved %d new validation results to %s (%d total)",
+                    appender.written, PATH_RESULTS_CSV, table_all.num_rows)
     else:
-        df_all = df_existing
+        table_all = table_existing
         logger.info("All URLs cached, no remote reads needed")
 
-    # Build lookup with full metadata (NaN → None for missing spatial columns)
-    result = {}
-    for _, row in df_all.iterrows():
-        entry = {"is_geotiff": row["is_geotiff"], "is_cog": row["is_cog"]}
-        for col in ["epsg", "height", "width", "transform", "bounds"]:
-            if col in row and pd.notna(row[col]):
-                entry[col] = int(row[col]) if col in ("epsg", "height", "width") else row[col]
-            else:
-                entry[col] = None
-        result[fix_url(row["url"])] = entry
-    return result
+    return MetadataLookup(table_all)
 
 
 # =============================================================================
@@ -213,6 +384,25 @@ def main():
     parser.add_argument("--incremental", action="store_true", help="Process only new URLs from data/urls_new.txt")
     parser.add_argument("--reprocess-invalid", action="store_true", help="Re-process items from data/urls_invalid_items.txt")
     parser.add_argument("--workers", type=int, default=32, help="Number of parallel workers (default: 32)")
+    parser.add_argument("--emit", choices=["direct", "pystac"], default="direct",
+                        help="Cache-hit item writer: plain dict → JSON, or via pystac.Item (default: direct)")
+    parser.add_argument("--bundle", choices=["off", "also", "only"], default="off",
+                        help="Also (or only) write items as NDJSON bundle shards under bundles/ (default: off)")
+    parser.add_argument("--items-per-shard", type=int, default=ITEMS_PER_SHARD,
+                        help=f"Items per bundle shard (default: {ITEMS_PER_SHARD})")
+    parser.add_argument("--links", choices=LINK_LAYOUTS, default="inline",
+                        help="Item links inline in collection.json, in an item_index.txt sidecar, "
+                             "or in nts/<block>/<year>/ child catalogs (default: inline)")
+    parser.add_argument("--executor", choices=["thread", "process"], default="thread",
+                        help="Item builder pool: threads, or processes to sidestep the GIL (default: thread)")
+    parser.add_argument("--engine", choices=["thread", "async"], default="thread",
+                        help="Metadata extraction engine for cache misses (default: thread)")
+    parser.add_argument("--concurrency", type=int, default=64,
+                        help="Max in-flight header requests for --engine async (default: 64)")
+    parser.add_argument("--rate-limit", type=float, default=0.0,
+                        help="Max requests/second per host for --engine async (default: 0 = unlimited)")
+    parser.add_argument("--gdal-profile", choices=sorted(GDAL_PROFILES), default="default",
+                        help="GDAL /vsicurl/ config profile for rasterio reads (default: default)")
     args = parser.parse_args()
 
     logging.basicConfig(
@@ -228,7 +418,7 @@ def main():
     logger.info("Output directory: %s", path_local)
 
     # Load collection
-    collection = pystac.Collection.from_file(path_collection)
+    collection, item_links = collection_load(path_collection)
     collection.set_self_href(PATH_S3_JSON)
 
     # Select URL source based on mode
@@ -242,24 +432,36 @@ def main():
         urls_file = "data/urls_list.txt"
         mode_desc = "full"
 
+    path_items = []
+    if os.path.exists(urls_file):
+        with open(urls_file) as f:
+            path_items = f.read().splitlines()
+
+    # Deletions-only month: no items to build, but the deletions still need
+    # a delta or replayed deltas drift from the tree
+    deleted_ids = deleted_item_ids() if args.incremental and not args.test else []
+    if deleted_ids and not path_items:
+        delta = BundleWriter(bundle_dir_default(path_local, kind="deltas"), collection.id)
+        delta.tombstones(deleted_ids)
+        delta.close()
+        logger.info("No new URLs: wrote tombstone-only delta %s", delta.path_dir)
+        return 0
+
     if not os.path.exists(urls_file):
         logger.error("URLs file not found: %s", urls_file)
         return 1
 
-    with open(urls_file) as f:
-        path_items = f.read().splitlines()
-
     urls_to_check = path_items[:args.test_count] if args.test else path_items
     logger.info("Processing %d URLs (mode=%s, test=%s)", len(urls_to_check), mode_desc, args.test)
 
     # Handle existing items based on mode
     if args.reprocess_invalid:
-        existing_item_count = len([l for l in collection.links if l.rel == 'item'])
+        existing_item_count = len(item_links)
         logger.info("Reprocess mode: Updating %d items (collection has %d total)",
                      len(urls_to_check), existing_item_count)
     elif args.test and not args.incremental:
         # Clean slate for test runs
-        collection.links = [link for link in collection.links if link.rel != 'item']
+        item_links = ItemLinks([])
         logger.info("Test mode: Cleared existing item links")
 
         old_jsons = glob.glob(f"{path_local}/*-*.json")
@@ -267,55 +469,86 @@ def main():
             for json_file in old_jsons:
                 os.remove(json_file)
             logger.info("Test mode: Deleted %d old item JSON files", len(old_jsons))
+        if os.path.exists(f"{path_local}/{ITEM_HASHES_NAME}"):
+            os.remove(f"{path_local}/{ITEM_HASHES_NAME}")
     elif args.incremental:
-        existing_item_count = len([l for l in collection.links if l.rel == 'item'])
+        existing_item_count = len(item_links)
         logger.info("Incremental mode: Appending to %d existing items", existing_item_count)
 
     # Pre-validation
-    results_lookup = load_validation_cache(urls_to_check)
+    results_lookup = load_validation_cache(
+        urls_to_check,
+        engine=args.engine,
+        concurrency=args.concurrency,
+        rate_limit=args.rate_limit,
+        gdal_profile=args.gdal_profile,
+    )
+    n_bbox = results_lookup.bbox_prepare([fix_url(url) for url in urls_to_check])
+    logger.info("Precomputed %d WGS84 bboxes", n_bbox)
+
+    # Direct emit only if it reproduces the pystac output on a sample
+    emit = args.emit
+    if emit == "direct" and not emit_verify(urls_to_check, collection.id, results_lookup):
+        logger.warning("Direct emit check failed, falling back to pystac serialization")
+        emit = "pystac"
 
     # Parallel item creation
-    logger.info("Creating STAC items with %d workers...", args.workers)
+    logger.info("Creating STAC items with %d %s workers (emit=%s)...", args.workers, args.executor, emit)
+    bundles = []
+    if args.bundle != "off":
+        bundles.append(BundleWriter(bundle_dir_default(path_local), collection.id,
+                                    items_per_shard=args.items_per_shard))
+        if args.bundle == "only":
+            logger.warning("--bundle only: no loose item JSONs are written, but collection "
+                           "item links still point at them")
+    # Incremental runs also write a delta (new items + deleted ids) for upserts
+    delta = None
+    if args.incremental and not args.test:
+        delta = BundleWriter(bundle_dir_default(path_local, kind="deltas"), collection.id,
+                             items_per_shard=args.items_per_shard)
+        bundles.append(delta)
+    # Unchanged item JSONs (same hash as the last build) are not rewritten
+    hashes = ItemHashes(path_local)
+    built = False
     try:
-        with concurrent.futures.ThreadPoolExecutor(max_workers=args.workers) as executor:
-            results = list(filter(None, tqdm(
-                executor.map(
-                    lambda url: process_item(url, collection.id, path_local, results_lookup),
-                    urls_to_check
-                ),
-                total=len(urls_to_check),
-                desc="Creating STAC Items"
-            )))
+        item_ids = items_build(urls_to_check, collection.id, path_local, results_lookup,
+                               executor=args.executor, workers=args.workers, emit=emit,
+                               loose=args.bundle != "only", bundles=bundles, hashes=hashes)
+        built = True
     except Exception as e:
         logger.error("Parallel execution failed: %s", e)
-        results = []
+        item_ids = []
+    finally:
+        for bundle in bundles:
+            if bundle is delta and not built:
+                # No manifest → the delta is incomplete and won't be replayed
+                logger.warning("Delta %s left incomplete (no manifest)", delta.path_dir)
+                continue
+            if bundle is delta and deleted_ids:
+                delta.tombstones(deleted_ids)
+            bundle.close()
+        if hashes.current:
+            hashes.save()
+            logger.info("Item JSONs: %s", hashes.summary())
 
     # Add item links to collection (with duplicate prevention)
-    if results:
-        existing_item_hrefs = {link.target for link in collection.links if link.rel == 'item'}
-
+    if item_ids:
         added_count = 0
         skipped_count = 0
-        for result in results:
-            item_href = f"{PATH_S3_STAC}/{result['id']}.json"
-            if item_href not in existing_item_hrefs:
-                collection.add_link(Link(
-                    rel=RelType.ITEM,
-                    target=item_href,
-                    media_type="application/json"
-                ))
+        for item_id in item_ids:
+            if item_links.add(item_href(item_id)):
                 added_count += 1
             else:
                 skipped_count += 1
 
         logger.info("Created %d items, added %d links, skipped %d duplicates",
-                     len(results), added_count, skipped_count)
+                     len(item_ids), added_count, skipped_count)
     else:
         logger.warning("No items were created")
 
     # Save updated collection
-    collection.save_object(dest_href=path_collection)
-    logger.info("Collection saved to %s", path_collection)
+    collection_save(collection, item_links, path_collection, links=args.links)
+    logger.info("Collection saved to %s (%d item links, %s)", path_collection, len(item_links), args.links)
 
     return 0
 
@@ -0,0 +1,99 @@
+"""
+Content hashes of written item JSONs, to skip rewriting unchanged items.
+
+A full or reprocess run rebuilds every item, and most come out byte for
+byte the same as last time. Rewriting them anyway bumps their mtimes, so
+`aws s3 sync` uploads them again. Here each item's serialized JSON is
+hashed and checked against the manifest from the previous build. An
+unchanged item whose file is still on disk is not written, so its mtime
+stays put and sync skips it. Items the manifest doesn't list yet (e.g. the
+whole catalog on the first run) are compared with the file on disk.
+
+The manifest is .item_hashes.csv in the output directory (item_id,md5,
+sorted by id). The leading dot keeps s3_sync-ci.sh from uploading it. md5
+is the S3 ETag of a single-part upload, so the manifest can be compared
+with a bucket listing directly.
+
+Used by:
+- item_create.py
+- item_reprocess.py
+"""
+
+import csv
+import hashlib
+import logging
+import os
+import threading
+from collections import Counter
+
+import pystac
+
+logger = logging.getLogger(__name__)
+
+ITEM_HASHES_NAME = ".item_hashes.csv"
+ITEM_STATUSES = ["created", "updated", "unchanged"]
+
+STAC_IO = pystac.StacIO.default()
+
+
+def content_hash(data: bytes) -> str:
+    """md5 hex digest of item bytes (the S3 ETag for a single-part upload)."""
+    return hashlib.md5(data, usedforsecurity=False).hexdigest()
+
+
+def item_write(path_json: str, text: str, previous: str | None) -> tuple[str, str]:
+    """Write item JSON unless it matches its previous hash → (hash, status).
+
+    status is "unchanged" (not written: same hash, file present), "updated"
+    (replaced an existing item) or "created". With no previous hash (first
+    run with a manifest, or an item it doesn't list), a file already on disk
+    is hashed instead, so an identical one is left alone.
+    """
+    digest = content_hash(text.encode("utf-8"))
+    if os.path.exists(path_json):
+        if previous is None:
+            with open(path_json, "rb") as f:
+                previous = content_hash(f.read())
+        if digest == previous:
+            return digest, "unchanged"
+    STAC_IO.write_text_to_href(path_json, text)
+    return digest, "created" if previous is None else "updated"
+
+
+class ItemHashes:
+    """Previous build's item hashes plus the ones recorded this run. Thread-safe."""
+
+    def __init__(self, path_local: str):
+        self.path = os.path.join(path_local, ITEM_HASHES_NAME)
+        self.previous: dict[str, str] = {}
+        if os.path.exists(self.path):
+            with open(self.path, newline="") as f:
+                self.previous = {row["item_id"]: row["md5"] for row in csv.DictReader(f)}
+        self.current: dict[str, str] = {}
+        self.counts = Counter()
+        self.lock = threading.Lock()
+
+    def get(self, item_id: str) -> str | None:
+        return self.previous.get(item_id)
+
+    def subset(self, item_ids: list[str]) -> dict[str, str]:
+        """Previous hashes of item_ids only (what a process-pool shard needs)."""
+        return {item_id: self.previous[item_id] for item_id in item_ids if item_id in self.previous}
+
+    def record(self, item_id: str, digest: str, status: str):
+        with self.lock:
+            self.current[item_id] = digest
+            self.counts[status] += 1
+
+    def save(self):
+        """Write previous + this run's hashes, sorted by id, atomically."""
+        hashes = {**self.previous, **self.current}
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", newline="") as f:
+            writer = csv.writer(f, lineterminator="\n")
+            writer.writerow(["item_id", "md5"])
+            writer.writerows(sorted(hashes.items()))
+        os.replace(tmp_path, self.path)
+
+    def summary(self) -> str:
+        return ", ".join(f"{self.counts[status]} {status}" for status in ITEM_STATUSES)
@@ -5,8 +5,11 @@ Re-process invalid STAC items with updated datetime handling.
 This script:
 1. Reads URLs from data/urls_invalid_items.txt
 2. Recreates STAC items with placeholder datetime for items missing dates
-3. Overwrites invalid JSON files with valid versions
+3. Overwrites invalid JSON files with valid versions (skipping any whose
+   content hash is unchanged, see item_hashes.py)
 4. Flags items with datetime_unknown=True property
+5. Writes a delta under deltas/<timestamp>/ (see item_bundle.py) of the
+   items it rewrote, so replayed deltas keep up with the tree
 
 Usage:
     python scripts/item_reprocess.py
@@ -15,7 +18,6 @@ Usage:
 import pystac
 import rio_stac
 import concurrent.futures
-import pandas as pd
 import os
 from tqdm import tqdm
 from datetime import datetime, timezone
@@ -33,16 +35,25 @@ from stac_utils import (
     PATH_S3,
     PATH_RESULTS_CSV,
 )
+from collection_links import collection_load
+from item_bundle import BundleWriter, bundle_dir_default, ndjson_line
+from item_hashes import ItemHashes, item_write
+from metadata_cache import MetadataLookup, cache_load
 
 # Configuration
 PATH_LOCAL = get_output_dir(test_only=False)
 PATH_COLLECTION = f"{PATH_LOCAL}/collection.json"
 INVALID_URLS_FILE = "data/urls_invalid_items.txt"
 
-def process_item(path_item: str, collection, results_lookup) -> dict | None:
+STAC_IO = pystac.StacIO.default()
+
+def process_item(path_item: str, collection, results_lookup, hashes: ItemHashes,
+                 delta: BundleWriter | None = None) -> dict | None:
     """
     Process a single GeoTIFF URL to create a STAC item with datetime handling.
 
+    Items that are written (created or changed) are also added to delta.
+
     Returns dict with item_id and item object, or None if processing fails.
     """
     href_item = fix_url(path_item)
@@ -107,9 +118,13 @@ def process_item(path_item: str, collection, results_lookup) -> dict | None:
         if datetime_is_unknown:
             item.properties["datetime_unknown"] = True
 
-        # Save item JSON locally (overwrites invalid version)
+        # Save item JSON locally (overwrites invalid version unless unchanged)
         path_item_json = f"{PATH_LOCAL}/{item_id}.json"
-        item.save_object(dest_href=path_item_json, include_self_link=False)
+        item_dict = item.to_dict(include_self_link=False)
+        digest, status = item_write(path_item_json, STAC_IO.json_dumps(item_dict), hashes.get(item_id))
+        hashes.record(item_id, digest, status)
+        if delta is not None and status != "unchanged":
+            delta.add(ndjson_line(item_dict))
 
         return {
             "id": item_id,
@@ -127,7 +142,7 @@ def main():
 
     # Load collection
     print(f"Loading collection: {PATH_COLLECTION}")
-    collection = pystac.Collection.from_file(PATH_COLLECTION)
+    collection, _ = collection_load(PATH_COLLECTION)
     collection.set_self_href(PATH_S3_JSON)
     print(f"✓ Collection loaded: {collection.id}")
     print()
@@ -138,16 +153,7 @@ def main():
         print(f"❌ Validation cache not found: {PATH_RESULTS_CSV}")
         return 1
 
-    df_all = pd.read_csv(PATH_RESULTS_CSV)
-    results_lookup = {}
-    for _, row in df_all.iterrows():
-        entry = {"is_geotiff": row["is_geotiff"], "is_cog": row["is_cog"]}
-        for col in ["epsg", "height", "width", "transform", "bounds"]:
-            if col in row and pd.notna(row[col]):
-                entry[col] = int(row[col]) if col in ("epsg", "height", "width") else row[col]
-            else:
-                entry[col] = None
-        results_lookup[fix_url(row["url"])] = entry
+    results_lookup = MetadataLookup(cache_load())
     print(f"✓ Loaded {len(results_lookup)} validation results")
     print()
 
@@ -162,6 +168,7 @@ def main():
         urls_to_process = f.read().splitlines()
 
     print(f"✓ Loaded {len(urls_to_process)} URLs to re-process")
+    results_lookup.bbox_prepare([fix_url(url) for url in urls_to_process])
     print()
 
     # Process items in parallel
@@ -169,13 +176,15 @@ def main():
     print("(This will overwrite invalid JSON files with valid versions)")
     print()
 
+    hashes = ItemHashes(PATH_LOCAL)
+    delta = BundleWriter(bundle_dir_default(PATH_LOCAL, kind="deltas"), collection.id)
     try:
         with concurrent.futures.ThreadPoolExecutor(max_workers=32) as executor:
             results = list(filter(
                 None,
                 tqdm(
                     executor.map(
-                        lambda url: process_item(url, collection, results_lookup),
+                        lambda url: process_item(url, collection, results_lookup, hashes, delta),
                         urls_to_process
                     ),
                     total=len(urls_to_process),
@@ -183,8 +192,18 @@ def main():
                 )
             ))
     except Exception as e:
+        # No manifest → the delta is incomplete and won't be replayed
         print(f"❌ Parallel execution failed: {e}")
+        print(f"Delta {delta.path_dir} left incomplete (no manifest)")
         return 1
+    finally:
+        if hashes.current:
+            hashes.save()
+
+    if hashes.counts["created"] or hashes.counts["updated"]:
+        delta.close()
+    else:
+        os.rmdir(delta.path_dir)  # nothing rewritten, nothing to replay
 
     # Summary
     print()
@@ -194,6 +213,7 @@ def main():
     print(f"Total URLs: {len(urls_to_process)}")
     print(f"✓ Successfully re-processed: {len(results)}")
     print(f"✗ Failed: {len(urls_to_process) - len(results)}")
+    print(f"Item JSONs: {hashes.summary()}")
     print()
 
     if len(results) > 0:
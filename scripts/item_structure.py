@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Structural fast path for validating the items this pipeline writes.
+
+Nearly every item comes out of item_dict_from_cache / item_create_from_cache
+with the same shape: one Polygon footprint, a 4-number bbox, the five proj:*
+fields, a single collection link and a single GeoTIFF "image" asset.
+structure_check() tests exactly that shape and its invariants directly in
+Python (key sets, types, lengths, bbox ordering, closed rings, RFC 3339 UTC
+datetime, known media types). Every check is at least as strict as the
+STAC 1.1.0 item and projection v1.1.0 schemas, so an item that passes is
+schema-valid. Anything that deviates from the template — including items
+that are valid but shaped differently — is not rejected here; it is
+escalated to the full schema validator (stac_schemas.py).
+
+`--check` runs a corpus of deliberately broken variants of a template item
+(and optionally real item files) through both paths. It fails if any of
+them passes the fast path but fails the full schema. The template itself
+must pass the full schema first; if it doesn't (e.g. an extension schema
+is neither vendored nor reachable), every verdict would be "invalid" and
+the corpus would prove nothing, so the check stops with an error.
+
+Usage:
+    python scripts/item_structure.py --check
+    python scripts/item_structure.py --check --items-dir "$STAC_OUTPUT_DIR" --sample 2000
+
+Exit codes: 0 = no false passes, 1 = false passes found, 2 = the template
+fails the full schema (nothing was checked).
+
+Used by:
+- item_validate.py (--engine structure)
+"""
+
+import argparse
+import copy
+import glob
+import json
+import logging
+import math
+import os
+import random
+import re
+import sys
+from datetime import datetime, timezone
+
+from pystac.errors import STACValidationError
+
+from stac_schemas import item_validator
+from stac_utils import PATH_S3_JSON, PROJECTION_EXTENSION, item_dict_from_cache
+
+logger = logging.getLogger(__name__)
+
+STRUCTURE_STAC_VERSION = "1.1.0"
+MEDIA_TYPES = frozenset({
+    "image/tiff; application=geotiff; profile=cloud-optimized",
+    "image/tiff; application=geotiff",
+})
+ITEM_KEYS = frozenset({"type", "stac_version", "stac_extensions", "id", "geometry", "bbox",
+                       "properties", "links", "assets", "collection"})
+PROPERTY_KEYS = frozenset({"proj:epsg", "proj:geometry", "proj:bbox", "proj:shape", "proj:transform",
+                           "datetime"})
+LINK_KEYS = frozenset({"rel", "href", "type"})
+ASSET_KEYS = frozenset({"href", "type", "roles"})
+
+# RFC 3339 in UTC, the form pystac.utils.datetime_to_str writes
+DATETIME_UTC = re.compile(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d{1,6})?Z")
+# Absolute http(s) URL made only of RFC 3986 characters (no spaces, quotes, braces)
+HREF = re.compile(r"https?://[A-Za-z0-9\-._~:/?#\[\]@!$&'()*+,;=%]+")
+
+
+def _is_number(value) -> bool:
+    return type(value) in (int, float) and math.isfinite(value)
+
+
+def _is_int(value) -> bool:
+    return type(value) is int
+
+
+def _box_ok(box) -> bool:
+    """[minx, miny, maxx, maxy] of finite numbers, min <= max."""
+    return (type(box) is list and len(box) == 4 and all(map(_is_number, box))
+            and box[0] <= box[2] and box[1] <= box[3])
+
+
+def _polygon_ok(geometry) -> bool:
+    """A GeoJSON Polygon with a single closed 5-position ring of 2D finite numbers."""
+    if type(geometry) is not dict or geometry.keys() != {"type", "coordinates"} or geometry["type"] != "Polygon":
+        return False
+    rings = geometry["coordinates"]
+    if type(rings) is not list or len(rings) != 1 or type(rings[0]) is not list or len(rings[0]) != 5:
+        return False
+    ring = rings[0]
+    return (all(type(p) is list and len(p) == 2 and _is_number(p[0]) and _is_number(p[1]) for p in ring)
+            and ring[0] == ring[-1])
+
+
+def _datetime_ok(value) -> bool:
+    if type(value) is not str or not DATETIME_UTC.fullmatch(value):
+        return False
+    try:
+        datetime.strptime(value[:19], "%Y-%m-%dT%H:%M:%S")
+    except ValueError:
+        return False
+    return True
+
+
+def _href_ok(value) -> bool:
+    return type(value) is str and HREF.fullmatch(value) is not None
+
+
+def structure_check(item: dict) -> bool:
+    """True if item has the pipeline's template shape (and is therefore schema-valid).
+
+    False means "not the template", not "invalid" — escalate to the full
+    schema validator.
+    """
+    if type(item) is not dict or item.keys() != ITEM_KEYS:
+        return False
+    if (item["type"] != "Feature" or item["stac_version"] != STRUCTURE_STAC_VERSION
+            or item["stac_extensions"] != [PROJECTION_EXTENSION]):
+        return False
+    if type(item["id"]) is not str or not item["id"] or type(item["collection"]) is not str or not item["collection"]:
+        return False
+    if not _box_ok(item["bbox"]) or not _polygon_ok(item["geometry"]):
+        return False
+
+    properties = item["properties"]
+    if type(properties) is not dict:
+        return False
+    keys = properties.keys()
+    if keys != PROPERTY_KEYS and not (keys == PROPERTY_KEYS | {"datetime_unknown"}
+                                      and properties["datetime_unknown"] is True):
+        return False
+    if not _datetime_ok(properties["datetime"]):
+        return False
+    if not _is_int(properties["proj:epsg"]) or properties["proj:epsg"] <= 0:
+        return False
+    shape = properties["proj:shape"]
+    if type(shape) is not list or len(shape) != 2 or not all(_is_int(n) and n > 0 for n in shape):
+        return False
+    transform = properties["proj:transform"]
+    if (type(transform) is not list or len(transform) != 9 or not all(map(_is_number, transform))
+            or transform[6:] != [0.0, 0.0, 1.0]):
+        return False
+    if not _box_ok(properties["proj:bbox"]) or not _polygon_ok(properties["proj:geometry"]):
+        return False
+
+    links = item["links"]
+    if type(links) is not list or len(links) != 1:
+        return False
+    link = links[0]
+    if (type(link) is not dict or link.keys() != LINK_KEYS or link["rel"] != "collection"
+            or link["type"] != "application/json" or not _href_ok(link["href"])):
+        return False
+
+    assets = item["assets"]
+    if type(assets) is not dict or assets.keys() != {"image"}:
+        return False
+    asset = assets["image"]
+    return (type(asset) is dict and asset.keys() == ASSET_KEYS and asset["type"] in MEDIA_TYPES
+            and asset["roles"] == ["data"] and _href_ok(asset["href"]))
+
+
+def item_validate_structured(item: dict) -> bool:
+    """Validate item: fast path if it has the template shape, else the full schemas.
+
+    Raises STACValidationError if invalid; returns True if the item was
+    escalated to the full schemas.
+    """
+    if structure_check(item):
+        return False
+    item_validator().validate(item)
+    return True
+
+
+# =============================================================================
+# Corpus check
+# =============================================================================
+
+def template_item() -> dict:
+    """An item exactly as item_create.py writes a cache hit."""
+    left, bottom, right, top = 300000.0, 5500000.0, 301000.0, 5501000.0
+    url = "https://nrs.objectstore.gov.bc.ca/gdwuts/082/082e/2017/dem/bc_082e003_1_4_4_xl1m_17603.tif"
+    return item_dict_from_cache(
+        url=url,
+        item_id="082-082e-2017-dem-bc_082e003_1_4_4_xl1m_17603",
+        metadata={
+            "epsg": 26911, "height": 1000, "width": 1000,
+            "transform": [1.0, 0.0, left, 0.0, -1.0, top],
+            "bounds": [left, bottom, right, top],
+            "bbox": [-117.7, 49.6, -117.68, 49.61],
+        },
+        collection_id="stac-dem-bc",
+        collection_url=PATH_S3_JSON,
+        media_type="image/tiff; application=geotiff; profile=cloud-optimized",
+        item_datetime=datetime(2017, 1, 1, tzinfo=timezone.utc),
+    )
+
+
+def _set(path: str, value):
+    """Mutation setting item[path] (dot-separated, ints index lists) to value."""
+    def mutate(item):
+        *parents, last = [int(k) if k.lstrip("-").isdigit() else k for k in path.split(".")]
+        node = item
+        for key in parents:
+            node = node[key]
+        node[last] = value
+    return mutate
+
+
+def _drop(path: str):
+    def mutate(item):
+        *parents, last = path.split(".")
+        node = item
+        for key in parents:
+            node = node[int(key) if key.isdigit() else key]
+        del node[last]
+    return mutate
+
+
+def _ring(ring: list):
+    return {"type": "Polygon", "coordinates": [ring]}
+
+
+BROKEN_ITEMS = [
+    *[(f"missing {key}", _drop(key)) for key in sorted(ITEM_KEYS)],
+    ("extra top-level key", _set("foo", 1)),
+    ("type Point", _set("type", "Point")),
+    ("stac_version 1.0.0", _set("stac_version", "1.0.0")),
+    ("stac_version number", _set("stac_version", 1.1)),
+    ("no stac_extensions", _set("stac_extensions", [])),
+    ("projection v2.0.0", _set("stac_extensions", ["https://stac-extensions.github.io/projection/v2.0.0/schema.json"])),
+    ("empty id", _set("id", "")),
+    ("numeric id", _set("id", 123)),
+    ("null collection", _set("collection", None)),
+    ("bbox 3 numbers", _set("bbox", [1.0, 2.0, 3.0])),
+    ("bbox strings", _set("bbox", ["-117.7", "49.6", "-117.68", "49.61"])),
+    ("bbox west > east", _set("bbox", [-117.68, 49.6, -117.7, 49.61])),
+    ("bbox south > north", _set("bbox", [-117.7, 49.61, -117.68, 49.6])),
+    ("bbox NaN", _set("bbox.0", float("nan"))),
+    ("bbox bool", _set("bbox.0", True)),
+    ("bbox null", _set("bbox", None)),
+    ("geometry Point", _set("geometry", {"type": "Point", "coordinates": [-117.7, 49.6]})),
+    ("geometry no coordinates", _drop("geometry.coordinates")),
+    ("geometry null", _set("geometry", None)),
+    ("ring 3 positions", _set("geometry", _ring([[0, 0], [1, 0], [0, 0]]))),
+    ("ring not closed", _set("geometry.coordinates.0.4", [0.0, 0.0])),
+    ("ring string coordinate", _set("geometry.coordinates.0.0", ["a", "b"])),
+    ("ring 3D position", _set("geometry.coordinates.0.1", [1.0, 2.0, 3.0])),
+    ("properties list", _set("properties", [])),
+    ("missing datetime", _drop("properties.datetime")),
+    ("null datetime", _set("properties.datetime", None)),
+    ("date only", _set("properties.datetime", "2017-01-01")),
+    ("month 13", _set("properties.datetime", "2017-13-01T00:00:00Z")),
+    ("Feb 30", _set("properties.datetime", "2017-02-30T00:00:00Z")),
+    ("non-UTC offset", _set("properties.datetime", "2017-01-01T00:00:00+01:00")),
+    ("datetime_unknown string", _set("properties.datetime_unknown", "yes")),
+    ("extra property", _set("properties.foo", 1)),
+    ("proj:epsg string", _set("properties.proj:epsg", "26911")),
+    ("proj:epsg float", _set("properties.proj:epsg", 26911.5)),
+    ("proj:epsg bool", _set("properties.proj:epsg", True)),
+    ("proj:wkt2 number", _set("properties.proj:wkt2", 1)),
+    ("proj:shape 3 numbers", _set("properties.proj:shape", [1, 2, 3])),
+    ("proj:shape floats", _set("properties.proj:shape", [1000.5, 1000.5])),
+    ("proj:shape negative", _set("properties.proj:shape", [-1, 1000])),
+    ("proj:transform 8 numbers", _set("properties.proj:transform", [1.0] * 8)),
+    ("proj:transform string", _set("properties.proj:transform.0", "1")),
+    ("proj:bbox 5 numbers", _set("properties.proj:bbox", [1.0] * 5)),
+    ("proj:bbox strings", _set("properties.proj:bbox", ["1", "2", "3", "4"])),
+    ("proj:geometry Point", _set("properties.proj:geometry", {"type": "Point", "coordinates": "x"})),
+    ("proj:geometry missing", _drop("properties.proj:geometry")),
+    ("links object", _set("links", {})),
+    ("no links", _set("links", [])),
+    ("link self", _set("links.0.rel", "self")),
+    ("link empty href", _set("links.0.href", "")),
+    ("link null href", _set("links.0.href", None)),
+    ("link missing rel", _drop("links.0.rel")),
+    ("link not an object", _set("links.0", "collection")),
+    ("assets null", _set("assets", None)),
+    ("assets empty", _set("assets", {})),
+    ("asset renamed", lambda item: item.__setitem__("assets", {"data": item["assets"]["image"]})),
+    ("asset missing href", _drop("assets.image.href")),
+    ("asset null href", _set("assets.image.href", None)),
+    ("asset href with space", _set("assets.image.href", "https://example.com/a b.tif")),
+    ("asset png", _set("assets.image.type", "image/png")),
+    ("asset roles string", _set("assets.image.roles", "data")),
+    ("asset roles numbers", _set("assets.image.roles", [1])),
+    ("asset not an object", _set("assets.image", "https://example.com/a.tif")),
+]
+
+
+def verdicts(item: dict) -> tuple[bool, bool]:
+    """(passes the fast path, passes the full schemas) for item."""
+    try:
+        item_validator().validate(item)
+        schema_valid = True
+    except (STACValidationError, FileNotFoundError):
+        schema_valid = False
+    return structure_check(item), schema_valid
+
+
+def corpus_check(items: list[tuple[str, dict]]) -> list[str]:
+    """Run named items through both paths; return the names of false passes."""
+    false_passes = []
+    escalated = caught = 0
+    for name, item in items:
+        fast, schema = verdicts(item)
+        if fast and not schema:
+            false_passes.append(name)
+            logger.error("FALSE PASS: %s", name)
+        elif not fast and schema:
+            escalated += 1
+            logger.debug("escalated, schema-valid: %s", name)
+        elif not fast:
+            caught += 1
+    logger.info("%d items: %d fast-path passes, %d schema-invalid (all escalated), "
+                "%d schema-valid but escalated, %d false passes",
+                len(items), len(items) - caught - escalated, caught, escalated, len(false_passes))
+    return false_passes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the structural fast path against the full item schemas")
+    parser.add_argument("--check", action="store_true", help="Run the broken-item corpus through both paths")
+    parser.add_argument("--items-dir", help="Also check real item JSONs from this directory")
+    parser.add_argument("--sample", type=int, default=1000,
+                        help="Item JSONs to sample from --items-dir (default: 1000; 0 = all)")
+    parser.add_argument("--seed", type=int, default=0, help="Sampling seed (default: 0)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s",
+                        datefmt="%Y-%m-%d %H:%M:%S")
+
+    if not args.check:
+        parser.print_help()
+        return 1
+
+    template = template_item()
+    if not structure_check(template):
+        logger.error("Template item does not pass the fast path — structure_check is out of date")
+        return 1
+    try:
+        item_validator().validate(template)
+    except (STACValidationError, FileNotFoundError) as e:
+        logger.error("Template item fails the full schema, so the corpus can't be checked: %s", e)
+        return 2
+
+    corpus = [("template", template)]
+    for name, mutate in BROKEN_ITEMS:
+        item = copy.deepcopy(template)
+        mutate(item)
+        corpus.append((name, item))
+    false_passes = corpus_check(corpus)
+
+    if args.items_dir:
+        paths = sorted(glob.glob(os.path.join(args.items_dir, "*-*.json")))
+        if args.sample and len(paths) > args.sample:
+            paths = sorted(random.Random(args.seed).sample(paths, args.sample))
+        real = []
+        for path in paths:
+            try:
+                with open(path) as f:
+                    real.append((os.path.basename(path), json.load(f)))
+            except json.JSONDecodeError as e:
+                logger.warning("Skipping %s: %s", path, e)
+        false_passes += corpus_check(real)
+
+    if false_passes:
+        logger.error("%d false passes: %s", len(false_passes), ", ".join(false_passes))
+        return 1
+    logger.info("No false passes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
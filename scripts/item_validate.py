@@ -3,55 +3,89 @@
 Validate STAC item JSON files and track validation status.
 
 This script:
-1. Reads STAC item JSONs from the production directory
-2. Validates each using pystac
-3. Records results in data/stac_item_validation.csv
+1. Reads STAC item JSONs from the production directory, skipping items
+   whose bytes are unchanged since they were last validated
+2. Validates each using pystac (or, with --engine schema, against compiled
+   vendored schemas — see stac_schemas.py; --engine structure checks the
+   template shape first — see item_structure.py)
+3. Upserts results into data/stac_item_validation.csv (see validation_store.py)
 4. Reports invalid items for investigation/removal
 
+Each result records the file's size and md5 (and, in the local snapshot,
+its mtime). An item is revalidated when it is new, or when its size or
+mtime changed and its md5 no longer matches (so an item rewritten by
+item_reprocess.py is checked again, while a touched but identical file
+only has its mtime refreshed).
+Rows for items missing from the items directory are kept unless --prune
+is given (the CI output directory holds only the new items).
+
 Usage:
-    python scripts/item_validate.py [--collection COLLECTION_PATH] [--items-dir ITEMS_DIR]
+    python scripts/item_validate.py [--collection COLLECTION_PATH] [--items-dir ITEMS_DIR] [--workers N]
 
 Examples:
-    # Validate all items in prod directory
+    # Validate new and changed items in prod directory
     python scripts/item_validate.py
 
+    # Revalidate everything; drop rows for items no longer on disk
+    python scripts/item_validate.py --full --prune
+
     # Validate items from specific paths
     python scripts/item_validate.py --items-dir /path/to/items
+
+    # Validate across 8 processes
+    python scripts/item_validate.py --workers 8
+
+    # Validate raw JSON against the vendored schemas (no pystac.Item)
+    python scripts/item_validate.py --engine schema
+
+    # Same, with the structural fast path for template-shaped items
+    python scripts/item_validate.py --engine structure --workers 8
 """
 
 import argparse
-import csv
+import concurrent.futures
 import glob
 import json
+import multiprocessing
 import os
 import sys
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List
 
 import pystac
 from tqdm import tqdm
 
+from item_hashes import content_hash
+from item_structure import item_validate_structured
+from stac_schemas import item_validator
+from validation_store import PATH_VALIDATION_CSV, ValidationStore
+
 
 # Default paths
 DEFAULT_ITEMS_DIR = "/Users/airvine/Projects/gis/stac_dem_bc/stac/prod/stac_dem_bc"
 DEFAULT_COLLECTION_PATH = "/Users/airvine/Projects/gis/stac_dem_bc/stac/prod/stac_dem_bc/collection.json"
-VALIDATION_RESULTS_PATH = "data/stac_item_validation.csv"
 
 
-def validate_item(item_path: str) -> Dict[str, any]:
-    """
-    Validate a single STAC item JSON file.
+PHASES = ('read', 'parse', 'validate')
+ENGINES = ('pystac', 'schema', 'structure')
 
-    Returns dict with validation results:
-        {
-            'item_path': str,
-            'item_id': str,
-            'json_exists': bool,
-            'json_valid': bool,
-            'validation_error': str or None,
-            'last_checked': str (ISO timestamp)
-        }
+
+def validate_item_timed(item_path: str, engine: str = 'pystac') -> tuple[Dict[str, any], Dict[str, float]]:
+    """
+    Validate a single STAC item JSON file, timing each phase.
+
+    engine='pystac' builds a pystac.Item and calls item.validate();
+    engine='schema' validates the raw dict with stac_schemas.item_validator()
+    (vendored schemas, compiled once per process, no pystac.Item);
+    engine='structure' accepts template-shaped items with
+    item_structure.structure_check and sends the rest to the schemas.
+
+    Returns (result, timings): result as for validate_item, timings the
+    seconds spent reading/decoding the JSON ('read'), building the
+    pystac.Item ('parse', 0 unless engine='pystac') and validating it
+    ('validate').
     """
     result = {
         'item_path': item_path,
@@ -59,25 +93,51 @@ def validate_item(item_path: str) -> Dict[str, any]:
         'json_exists': False,
         'json_valid': False,
         'validation_error': None,
-        'last_checked': datetime.now().isoformat()
+        'last_checked': datetime.now().isoformat(),
+        'size': None,
+        'mtime_ns': None,
+        'md5': None,
     }
+    timings = dict.fromkeys(PHASES, 0.0)
 
     # Check if file exists
     if not os.path.exists(item_path):
         result['validation_error'] = "File not found"
-        return result
+        return result, timings
 
     result['json_exists'] = True
 
     # Try to load and validate with pystac
+    t0 = time.perf_counter()
+    phase = 'read'
     try:
-        # Load JSON
-        with open(item_path, 'r') as f:
-            item_dict = json.load(f)
-
-        # Validate with pystac
-        item = pystac.Item.from_dict(item_dict)
-        item.validate()
+        # Load JSON, recording the state of the bytes validated
+        with open(item_path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            data = f.read()
+        result['size'], result['mtime_ns'], result['md5'] = stat.st_size, stat.st_mtime_ns, content_hash(data)
+        item_dict = json.loads(data)
+        t1 = time.perf_counter()
+        timings['read'] = t1 - t0
+
+        if engine == 'schema':
+            phase = 'validate'
+            item_validator().validate(item_dict)
+            timings['validate'] = time.perf_counter() - t1
+        elif engine == 'structure':
+            phase = 'validate'
+            item_validate_structured(item_dict)
+            timings['validate'] = time.perf_counter() - t1
+        else:
+            # Validate with pystac
+            phase = 'parse'
+            item = pystac.Item.from_dict(item_dict)
+            t2 = time.perf_counter()
+            timings['parse'] = t2 - t1
+
+            phase = 'validate'
+            item.validate()
+            timings['validate'] = time.perf_counter() - t2
 
         result['json_valid'] = True
 
@@ -88,35 +148,110 @@ def validate_item(item_path: str) -> Dict[str, any]:
     except Exception as e:
         result['validation_error'] = f"Unexpected error: {type(e).__name__}: {str(e)[:100]}"
 
-    return result
-
-
-def load_existing_results(results_path: str) -> Dict[str, Dict]:
-    """Load existing validation results if they exist."""
-    existing = {}
+    if not result['json_valid']:
+        # Charge the failing phase with the time spent since the last one finished
+        timings[phase] = time.perf_counter() - t0 - sum(timings.values())
 
-    if os.path.exists(results_path):
-        with open(results_path, 'r') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                # Convert string booleans back to bool
-                row['json_exists'] = row['json_exists'].lower() == 'true'
-                row['json_valid'] = row['json_valid'].lower() == 'true'
-                existing[row['item_id']] = row
+    return result, timings
 
-    return existing
 
+def validate_item(item_path: str, engine: str = 'pystac') -> Dict[str, any]:
+    """
+    Validate a single STAC item JSON file.
 
-def save_results(results: List[Dict], results_path: str):
-    """Save validation results to CSV."""
-    os.makedirs(os.path.dirname(results_path), exist_ok=True)
-
-    fieldnames = ['item_path', 'item_id', 'json_exists', 'json_valid', 'validation_error', 'last_checked']
-
-    with open(results_path, 'w', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(results)
+    Returns dict with validation results:
+        {
+            'item_path': str,
+            'item_id': str,
+            'json_exists': bool,
+            'json_valid': bool,
+            'validation_error': str or None,
+            'last_checked': str (ISO timestamp),
+            'size', 'mtime_ns': int (file state when read), 'md5': str
+        }
+    """
+    return validate_item_timed(item_path, engine)[0]
+
+
+def _validate_chunk(item_paths: List[str], engine: str) -> tuple[List[Dict], Dict[str, float]]:
+    """Process-pool task: validate one chunk → (results in input order, summed phase timings)."""
+    results = []
+    totals = dict.fromkeys(PHASES, 0.0)
+    for item_path in item_paths:
+        result, timings = validate_item_timed(item_path, engine)
+        results.append(result)
+        for phase, seconds in timings.items():
+            totals[phase] += seconds
+    return results, totals
+
+
+def items_validate(item_paths: List[str], workers: int = 1,
+                   engine: str = 'pystac') -> tuple[List[Dict], Dict[str, float]]:
+    """Validate item_paths; return (results in item_paths order, summed phase timings).
+
+    workers <= 1 validates serially in this process. Otherwise item_paths
+    is split into chunks (~4 per worker, so the pool stays busy when chunks
+    finish unevenly) across a spawned process pool; chunk results are
+    merged back in submission order. Phase timings are per-item seconds
+    summed over all items (across workers), not wall time.
+    """
+    results = []
+    totals = dict.fromkeys(PHASES, 0.0)
+
+    def merge(chunk_results, chunk_timings):
+        results.extend(chunk_results)
+        for phase, seconds in chunk_timings.items():
+            totals[phase] += seconds
+
+    if workers <= 1:
+        for item_path in tqdm(item_paths, desc="Validating"):
+            result, timings = validate_item_timed(item_path, engine)
+            merge([result], timings)
+        return results, totals
+
+    chunk_size = max(1, -(-len(item_paths) // (workers * 4)))
+    chunks = [item_paths[i:i + chunk_size] for i in range(0, len(item_paths), chunk_size)]
+    ctx = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool, \
+            tqdm(total=len(item_paths), desc="Validating") as progress:
+        futures = [pool.submit(_validate_chunk, chunk, engine) for chunk in chunks]
+        # Collect in submission order so results line up with item_paths
+        for future, chunk in zip(futures, chunks):
+            merge(*future.result())
+            progress.update(len(chunk))
+    return results, totals
+
+
+def items_changed(item_files: List[str], store: ValidationStore) -> tuple[List[str], Dict[str, int]]:
+    """Split item_files into those to validate and those whose bytes are unchanged.
+
+    An item is unchanged if its size and mtime match its stored row (a
+    stat, no read), or failing that if its md5 does. New items, rows with
+    no md5 and files that can't be read are validated.
+
+    Returns (paths to validate, {item_id: mtime_ns} for items whose mtime
+    changed but bytes did not).
+    """
+    to_validate, refreshed = [], {}
+    for item_file in item_files:
+        row = store.get(Path(item_file).stem)
+        if row is None or row['md5'] is None:
+            to_validate.append(item_file)
+            continue
+        try:
+            stat = os.stat(item_file)
+            if stat.st_size == row['size'] and stat.st_mtime_ns == row['mtime_ns']:
+                continue
+            with open(item_file, 'rb') as f:
+                digest = content_hash(f.read())
+        except OSError:
+            to_validate.append(item_file)
+            continue
+        if digest == row['md5']:
+            refreshed[row['item_id']] = stat.st_mtime_ns
+        else:
+            to_validate.append(item_file)
+    return to_validate, refreshed
 
 
 def main():
@@ -134,12 +269,36 @@ def main():
     parser.add_argument(
         '--incremental',
         action='store_true',
-        help="Only validate items not in existing results (faster)"
+        help="Accepted for compatibility; validation is incremental by default"
+    )
+    parser.add_argument(
+        '--full',
+        action='store_true',
+        help="Revalidate every item, changed or not"
+    )
+    parser.add_argument(
+        '--prune',
+        action='store_true',
+        help="Drop results for items no longer in --items-dir (only for a complete catalog directory)"
     )
     parser.add_argument(
         '--output',
-        default=VALIDATION_RESULTS_PATH,
-        help=f"Output CSV path (default: {VALIDATION_RESULTS_PATH})"
+        default=PATH_VALIDATION_CSV,
+        help=f"Output CSV path (default: {PATH_VALIDATION_CSV})"
+    )
+    parser.add_argument(
+        '--engine',
+        choices=ENGINES,
+        default='pystac',
+        help="pystac: Item.from_dict + item.validate(); schema: raw JSON against "
+             "compiled vendored schemas (fetched if missing); structure: template-shape fast "
+             "path, schema for the rest (default: pystac)"
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help="Validate in a process pool of N workers (default: 1, serial)"
     )
 
     args = parser.parse_args()
@@ -150,7 +309,9 @@ def main():
     print(f"Items directory: {args.items_dir}")
     print(f"Collection: {args.collection}")
     print(f"Output: {args.output}")
-    print(f"Mode: {'Incremental' if args.incremental else 'Full'}")
+    print(f"Mode: {'Full' if args.full else 'Incremental'}{' + prune' if args.prune else ''}")
+    print(f"Engine: {args.engine}")
+    print(f"Workers: {args.workers}")
     print()
 
     # Find all item JSON files (exclude collection.json)
@@ -163,45 +324,52 @@ def main():
 
     print(f"Found {len(item_files)} item JSON files")
 
-    # Load existing results if incremental mode
-    existing_results = {}
-    if args.incremental:
-        existing_results = load_existing_results(args.output)
-        print(f"Loaded {len(existing_results)} existing validation results")
-
-    # Filter items to validate
-    items_to_validate = []
-    if args.incremental and existing_results:
-        for item_file in item_files:
-            item_id = Path(item_file).stem
-            if item_id not in existing_results:
-                items_to_validate.append(item_file)
-        print(f"Incremental: Validating {len(items_to_validate)} new items")
-    else:
-        items_to_validate = item_files
+    # Load existing results; find new and changed items
+    store = ValidationStore.load(args.output)
+    print(f"Loaded {len(store)} existing validation results")
+
+    if args.prune:
+        present = {Path(item_file).stem for item_file in item_files}
+        removed = store.delete(store.item_ids() - present)
+        print(f"Pruned {removed} results for items no longer present")
+
+    if args.full:
+        items_to_validate, refreshed = item_files, {}
         print(f"Full validation: Validating all {len(items_to_validate)} items")
+    else:
+        items_to_validate, refreshed = items_changed(item_files, store)
+        for item_id, mtime_ns in refreshed.items():
+            store.touch(item_id, mtime_ns)
+        print(f"Incremental: Validating {len(items_to_validate)} new or changed items "
+              f"({len(refreshed)} touched but unchanged)")
 
     if not items_to_validate:
-        print("✓ No new items to validate")
+        store.save()
+        print("✓ No new or changed items to validate")
         return 0
 
     print()
     print("Validating items...")
 
     # Validate items with progress bar
-    validation_results = []
-    for item_file in tqdm(items_to_validate, desc="Validating"):
-        result = validate_item(item_file)
-        validation_results.append(result)
-
-    # Combine with existing results if incremental
-    if args.incremental and existing_results:
-        all_results = list(existing_results.values()) + validation_results
-    else:
-        all_results = validation_results
+    started = time.perf_counter()
+    validation_results, timings = items_validate(items_to_validate, workers=args.workers,
+                                                 engine=args.engine)
+    elapsed = time.perf_counter() - started
+
+    print()
+    print(f"Validated {len(validation_results)} items in {elapsed:.1f}s "
+          f"({len(validation_results) / elapsed:.0f} items/s)")
+    busy = sum(timings.values()) or 1.0
+    for phase in PHASES:
+        print(f"  {phase:<9} {timings[phase]:8.2f}s  ({timings[phase] / busy * 100:.0f}%)")
+
+    # Newly validated results replace their rows; unchanged verdicts keep theirs
+    for result in validation_results:
+        store.upsert(result)
 
     # Save results
-    save_results(all_results, args.output)
+    ledger_written = store.save()
 
     # Generate summary
     print()
@@ -209,8 +377,8 @@ def main():
     print("Validation Summary")
     print("=" * 60)
 
-    total = len(all_results)
-    valid = sum(1 for r in all_results if r['json_valid'])
+    total = len(store)
+    valid = store.valid_count()
     invalid = total - valid
 
     print(f"Total items: {total}")
@@ -219,12 +387,12 @@ def main():
     print()
 
     # Show invalid items
-    invalid_items = [r for r in all_results if not r['json_valid']]
+    invalid_items = store.invalid()
     if invalid_items:
         print("Invalid items:")
-        for item in invalid_items[:10]:  # Show first 10
-            print(f"  ✗ {item['item_id']}")
-            print(f"    Error: {item['validation_error']}")
+        for item_id, error in invalid_items[:10]:  # Show first 10
+            print(f"  ✗ {item_id}")
+            print(f"    Error: {error}")
 
         if len(invalid_items) > 10:
             print(f"  ... and {len(invalid_items) - 10} more")
@@ -233,6 +401,8 @@ def main():
         print(f"Full results saved to: {args.output}")
     else:
         print("✓ All items are valid!")
+    if not ledger_written:
+        print(f"No result rows changed ({args.output} not rewritten)")
 
     print()
     print("=" * 60)
@@ -0,0 +1,425 @@
+"""
+GeoTIFF metadata cache (data/stac_geotiff_checks.csv + .parquet).
+
+The CSV is the git ledger and the append journal: while a run extracts
+metadata each result is appended as it completes, flushed and fsync'd in
+small batches, so a killed or timed-out run loses at most one batch and
+the next run resumes with zero repeated remote reads. When a URL appears
+more than once (a spatial-metadata upgrade appends a fresh row) the last
+row wins; cache_compact() rewrites the file once at the end of a run so
+the committed ledger keeps one row per URL.
+
+Reads go through a typed Parquet snapshot next to the CSV (gitignored):
+int epsg/height/width, fixed-size float64 lists for transform/bounds,
+boolean flags. It is loaded memory-mapped, so a 100k-row cache loads
+without parsing JSON strings out of CSV cells.
+
+The snapshot records the size, mtime and md5 of the CSV it reflects. If
+only the mtime differs (a git checkout, or a snapshot restored from the
+CI cache), it is re-stamped. If the CSV has grown by appended rows (its
+first source_size bytes still hash to the md5), only the appended rows
+are parsed and merged in. Anything else (a compaction by hand, a pull
+that rewrote rows) rebuilds the snapshot from the whole CSV. Compaction
+writes the snapshot itself.
+
+Usage:
+    python scripts/metadata_cache.py --migrate      # CSV → Parquet snapshot
+    python scripts/metadata_cache.py --export-csv   # Parquet → ledger CSV
+
+Used by:
+- item_create.py (load_validation_cache)
+- item_reprocess.py (MetadataLookup)
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from stac_utils import PATH_RESULTS_CSV, bounds_to_wgs84
+
+logger = logging.getLogger(__name__)
+
+CACHE_COLUMNS = ["url", "is_geotiff", "is_cog", "epsg", "height", "width", "transform", "bounds"]
+PATH_RESULTS_PARQUET = PATH_RESULTS_CSV.removesuffix(".csv") + ".parquet"
+
+CACHE_SCHEMA = pa.schema([
+    ("url", pa.string()),
+    ("is_geotiff", pa.bool_()),
+    ("is_cog", pa.bool_()),
+    ("epsg", pa.int32()),
+    ("height", pa.int32()),
+    ("width", pa.int32()),
+    ("transform", pa.list_(pa.float64(), 6)),
+    ("bounds", pa.list_(pa.float64(), 4)),
+])
+
+
+def _csv_value(col: str, value) -> str:
+    """Format a value the way pandas.to_csv writes this cache.
+
+    epsg/height/width are float columns in pandas (they hold NaN), so ints
+    are written as "2955.0" — appended rows stay byte-compatible with rows
+    written by a full rewrite.
+    """
+    if value is None or (isinstance(value, float) and value != value):
+        return ""
+    if col in ("epsg", "height", "width"):
+        return repr(float(value))
+    return str(value)
+
+
+def cache_repair(path: str) -> int:
+    """Truncate a partial trailing row left by a crash mid-append.
+
+    Returns the number of bytes dropped.
+    """
+    if not os.path.exists(path):
+        return 0
+    with open(path, "rb+") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if size == 0:
+            return 0
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return 0
+        # Walk back to the last complete line
+        pos = size
+        while pos > 0:
+            step = min(65536, pos)
+            pos -= step
+            f.seek(pos)
+            chunk = f.read(step)
+            newline = chunk.rfind(b"\n")
+            if newline != -1:
+                keep = pos + newline + 1
+                break
+        else:
+            keep = 0
+        f.truncate(keep)
+    logger.warning("Dropped %d bytes of partial row from %s", size - keep, path)
+    return size - keep
+
+
+class CacheAppender:
+    """Append extraction records to the cache CSV as they complete.
+
+    Thread-safe. Rows are buffered and written, flushed and fsync'd every
+    batch_size rows or flush_seconds, whichever comes first, and on close.
+    """
+
+    def __init__(self, path: str, batch_size: int = 50, flush_seconds: float = 10.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.pending: list[list[str]] = []
+        self.written = 0
+        self.lock = threading.Lock()
+        self.last_flush = time.monotonic()
+
+        cache_repair(path)
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.file = open(path, "a", newline="")
+        self.writer = csv.writer(self.file, lineterminator="\n")
+        if is_new:
+            self.writer.writerow(CACHE_COLUMNS)
+
+    def append(self, record: dict):
+        with self.lock:
+            self.pending.append([_csv_value(col, record.get(col)) for col in CACHE_COLUMNS])
+            if (len(self.pending) >= self.batch_size
+                    or time.monotonic() - self.last_flush >= self.flush_seconds):
+                self._flush()
+
+    def _flush(self):
+        if self.pending:
+            self.writer.writerows(self.pending)
+            self.written += len(self.pending)
+            self.pending = []
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        with self.lock:
+            self._flush()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def cache_read(path: str) -> pd.DataFrame:
+    """Read the cache CSV, keeping the last row for each URL.
+
+    A cache written before the spatial columns existed is rewritten once
+    with the full column set, so later appends line up with the header.
+    """
+    cache_repair(path)
+    df = pd.read_csv(path)
+    if list(df.columns) != CACHE_COLUMNS:
+        df = df.reindex(columns=CACHE_COLUMNS)
+        df.to_csv(path, index=False)
+        logger.info("Migrated %s to columns %s", path, CACHE_COLUMNS)
+    return df.drop_duplicates("url", keep="last")
+
+
+def cache_compact(path: str, path_parquet: str = PATH_RESULTS_PARQUET) -> int:
+    """Rewrite the cache with one row per URL if appends left duplicates.
+
+    Rows are counted against the (refreshed) snapshot, which already holds
+    the last row per URL, and the rewrite is exported from it, so the CSV
+    is not parsed in full. The rewrite goes through a temp file and
+    os.replace, so a crash leaves either the old or the new file. Returns
+    the number of rows dropped.
+    """
+    table = cache_load(path, path_parquet)
+    with open(path, "rb") as f:
+        rows = sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(1 << 20), b"")) - 1
+    dropped = rows - table.num_rows
+    if dropped:
+        cache_export_csv(table, path)
+        _snapshot_write(table, path, path_parquet)
+        logger.info("Compacted %s: dropped %d superseded rows", path, dropped)
+    return dropped
+
+
+# =============================================================================
+# Typed (Parquet) snapshot
+# =============================================================================
+
+def _file_md5(path: str, size: int | None = None) -> str:
+    """md5 of the first size bytes of path (all of it when size is None)."""
+    digest = hashlib.md5(usedforsecurity=False)
+    remaining = size
+    with open(path, "rb") as f:
+        while remaining is None or remaining > 0:
+            chunk = f.read(1 << 20 if remaining is None else min(1 << 20, remaining))
+            if not chunk:
+                break
+            digest.update(chunk)
+            if remaining is not None:
+                remaining -= len(chunk)
+    return digest.hexdigest()
+
+
+def _source_stamp(path_csv: str) -> dict[bytes, bytes]:
+    stat = os.stat(path_csv)
+    return {b"source_size": str(stat.st_size).encode(), b"source_mtime_ns": str(stat.st_mtime_ns).encode(),
+            b"source_md5": _file_md5(path_csv).encode()}
+
+
+def _snapshot_write(table: pa.Table, path_csv: str, path_parquet: str) -> pa.Table:
+    """Write table as the snapshot of path_csv (stamped), atomically."""
+    table = table.replace_schema_metadata(_source_stamp(path_csv))
+    tmp_path = f"{path_parquet}.tmp"
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, path_parquet)
+    return table
+
+
+def cache_to_table(df: pd.DataFrame) -> pa.Table:
+    """Typed Arrow table from a cache DataFrame as read from the CSV."""
+    def ints(col):
+        return [None if pd.isna(v) else int(v) for v in df[col]]
+
+    def lists(col):
+        return [None if pd.isna(v) else json.loads(v) for v in df[col]]
+
+    return pa.table({
+        "url": df["url"].tolist(),
+        "is_geotiff": df["is_geotiff"].astype(bool).tolist(),
+        "is_cog": df["is_cog"].astype(bool).tolist(),
+        "epsg": ints("epsg"),
+        "height": ints("height"),
+        "width": ints("width"),
+        "transform": lists("transform"),
+        "bounds": lists("bounds"),
+    }, schema=CACHE_SCHEMA)
+
+
+def cache_migrate(path_csv: str = PATH_RESULTS_CSV, path_parquet: str = PATH_RESULTS_PARQUET) -> pa.Table:
+    """Rebuild the Parquet snapshot from the ledger CSV (one row per URL)."""
+    table = _snapshot_write(cache_to_table(cache_read(path_csv)), path_csv, path_parquet)
+    logger.info("Wrote %d cache rows to %s", table.num_rows, path_parquet)
+    return table
+
+
+def cache_refresh(table: pa.Table, path_csv: str, path_parquet: str, offset: int) -> pa.Table:
+    """Merge the rows appended to path_csv after byte offset into the snapshot table."""
+    with open(path_csv, "rb") as f:
+        f.seek(offset)
+        tail = f.read()
+    df_tail = pd.read_csv(io.BytesIO(tail), names=CACHE_COLUMNS, header=None)
+    appended = cache_to_table(df_tail.drop_duplicates("url", keep="last"))
+    # Last row per URL wins: drop the snapshot rows the appended ones supersede
+    kept = table.filter(pc.invert(pc.is_in(table.column("url"), value_set=appended.column("url"))))
+    table = _snapshot_write(pa.concat_tables([kept.replace_schema_metadata(None), appended]),
+                            path_csv, path_parquet)
+    logger.info("Merged %d appended rows into %s", len(df_tail), path_parquet)
+    return table
+
+
+def cache_load(path_csv: str = PATH_RESULTS_CSV, path_parquet: str = PATH_RESULTS_PARQUET) -> pa.Table:
+    """Load the typed cache, refreshing the snapshot when the CSV changed.
+
+    Same size and mtime: loaded as is. Otherwise the CSV's md5 (of the
+    bytes the snapshot was built from) decides: unchanged content is
+    re-stamped, appended rows are merged in, anything else is a full
+    migration.
+    """
+    if os.path.exists(path_parquet):
+        metadata = pq.read_schema(path_parquet).metadata or {}
+        stat = os.stat(path_csv)
+        size = int(metadata.get(b"source_size", b"-1"))
+        if size == stat.st_size and metadata.get(b"source_mtime_ns") == str(stat.st_mtime_ns).encode():
+            return pq.read_table(path_parquet, memory_map=True)
+        md5 = metadata.get(b"source_md5", b"").decode()
+        if md5 and 0 < size <= stat.st_size and cache_repair(path_csv) == 0 \
+                and _file_md5(path_csv, size) == md5:
+            table = pq.read_table(path_parquet)
+            if size == stat.st_size:
+                return _snapshot_write(table, path_csv, path_parquet)
+            return cache_refresh(table, path_csv, path_parquet, size)
+        logger.info("%s changed since %s was built, migrating", path_csv, path_parquet)
+    return cache_migrate(path_csv, path_parquet)
+
+
+class MetadataLookup:
+    """Read-only url → metadata mapping backed by column arrays.
+
+    Built column-wise from the typed cache (URL normalization, null masks
+    and dtype casts applied to whole columns); the per-URL dict that
+    item_create_from_cache expects is only materialized by get().
+    """
+
+    def __init__(self, table: pa.Table):
+        urls = pc.replace_substring_regex(table.column("url"), r"^https:/([^/])", r"https://\1")
+        # Later rows win, matching last-row-wins in the CSV
+        self.index = {url: i for i, url in enumerate(urls.to_pylist())}
+        self.is_geotiff = table.column("is_geotiff").fill_null(False).to_numpy()
+        self.is_cog = table.column("is_cog").fill_null(False).to_numpy()
+        self.ints = {col: self._int_column(table.column(col)) for col in ("epsg", "height", "width")}
+        self.lists = {col: self._list_column(table.column(col), size)
+                      for col, size in (("transform", 6), ("bounds", 4))}
+        self.bbox = np.full((table.num_rows, 4), np.nan)
+
+    @staticmethod
+    def _int_column(column: pa.ChunkedArray) -> tuple[np.ndarray, np.ndarray]:
+        return column.fill_null(0).to_numpy().astype(np.int64), column.is_null().to_numpy()
+
+    @staticmethod
+    def _list_column(column: pa.ChunkedArray, size: int) -> tuple[np.ndarray, np.ndarray]:
+        values = pc.list_flatten(column.fill_null([float("nan")] * size)).to_numpy()
+        return values.reshape(-1, size), column.is_null().to_numpy()
+
+    def subset(self, urls: list[str]) -> "MetadataLookup":
+        """Compact lookup holding only the rows for urls (e.g. one worker's shard)."""
+        rows = np.array(sorted({self.index[url] for url in urls if url in self.index}), dtype=np.int64)
+        position = {i: j for j, i in enumerate(rows.tolist())}
+        part = object.__new__(MetadataLookup)
+        part.index = {url: position[self.index[url]] for url in urls if url in self.index}
+        part.is_geotiff = self.is_geotiff[rows]
+        part.is_cog = self.is_cog[rows]
+        part.ints = {col: (values[rows], missing[rows]) for col, (values, missing) in self.ints.items()}
+        part.lists = {col: (values[rows], missing[rows]) for col, (values, missing) in self.lists.items()}
+        part.bbox = self.bbox[rows]
+        return part
+
+    def bbox_prepare(self, urls: list[str]) -> int:
+        """Precompute WGS84 bboxes for urls, one reprojection per EPSG code.
+
+        get() then carries a "bbox" that item_create_from_cache uses instead
+        of calling transform_bounds per item. Returns the number of rows filled.
+        """
+        rows = np.array(sorted({self.index[url] for url in urls if url in self.index}), dtype=np.int64)
+        epsg, epsg_missing = self.ints["epsg"]
+        bounds, bounds_missing = self.lists["bounds"]
+        rows = rows[~(epsg_missing[rows] | bounds_missing[rows])] if len(rows) else rows
+        for code in np.unique(epsg[rows]):
+            group = rows[epsg[rows] == code]
+            self.bbox[group] = bounds_to_wgs84(int(code), bounds[group])
+        return int(np.isfinite(self.bbox[rows]).all(axis=1).sum())
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self.index
+
+    def get(self, url: str, default=None) -> dict | None:
+        i = self.index.get(url)
+        if i is None:
+            return default
+        entry = {"is_geotiff": bool(self.is_geotiff[i]), "is_cog": bool(self.is_cog[i])}
+        for col, (values, missing) in self.ints.items():
+            entry[col] = None if missing[i] else int(values[i])
+        for col, (values, missing) in self.lists.items():
+            entry[col] = None if missing[i] else values[i].tolist()
+        if not np.isnan(self.bbox[i, 0]):
+            entry["bbox"] = self.bbox[i].tolist()
+        return entry
+
+
+def cache_needs_upgrade(table: pa.Table) -> set[str]:
+    """URLs cached as GeoTIFFs before the spatial columns existed."""
+    mask = pc.and_(table.column("is_geotiff").fill_null(False), table.column("transform").is_null())
+    return set(table.column("url").filter(mask).to_pylist())
+
+
+def cache_export_csv(table: pa.Table, path_csv: str = PATH_RESULTS_CSV):
+    """Write the typed cache as the ledger CSV (same formatting as the appends)."""
+    columns = {col: table.column(col).to_pylist() for col in CACHE_COLUMNS}
+    tmp_path = f"{path_csv}.tmp"
+    with open(tmp_path, "w", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(CACHE_COLUMNS)
+        for row in zip(*columns.values()):
+            record = dict(zip(CACHE_COLUMNS, row))
+            for col in ("transform", "bounds"):
+                if record[col] is not None:
+                    record[col] = json.dumps(record[col])
+            writer.writerow([_csv_value(col, record[col]) for col in CACHE_COLUMNS])
+    os.replace(tmp_path, path_csv)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the GeoTIFF metadata cache")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--migrate", action="store_true", help="Rebuild the Parquet snapshot from the CSV")
+    group.add_argument("--export-csv", action="store_true", help="Rewrite the CSV from the Parquet snapshot")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s",
+                        datefmt="%H:%M:%S")
+
+    if args.migrate:
+        cache_migrate()
+    else:
+        table = pq.read_table(PATH_RESULTS_PARQUET, memory_map=True)
+        cache_export_csv(table)
+        # Re-stamp so the snapshot stays current for the rewritten CSV
+        cache_migrate()
+        logger.info("Exported %d rows to %s", table.num_rows, PATH_RESULTS_CSV)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Upload the built catalog to S3 — only the objects that changed since the
+last publish, planned from a local manifest instead of a bucket listing.
+
+`aws s3 sync` lists the whole bucket (~100k objects) on every run before it
+decides what to send. Here data/s3_manifest.csv records what was last
+published (key, md5, size; md5 = the ETag of a single-part upload), the
+output directory is hashed locally, and only keys that are new or whose
+md5/size differ are uploaded. The manifest is committed with the other
+data/ caches, so a stateless CI runner has it too.
+
+Same two rules as s3_sync-ci.sh:
+
+1. Never delete. A key missing locally is left alone (the CI output dir
+   holds only collection.json and the new items).
+2. Referenced objects before referrers. Uploads go in phases — items and
+   everything else, then nts/ year catalogs, then block catalogs, then
+   collection.json — and a phase starts only if the previous one fully
+   succeeded, so a failure never leaves a published link to a missing
+   object.
+
+Everything under the output directory is published, as with `aws s3
+sync`: items, collection.json, nts/ catalogs and item_index.txt, and also
+the deltas/ and bundles/ that item_create.py and item_bundle.py write
+there (see item_bundle.py). Dotfiles such as .item_hashes.csv and .tmp
+leftovers are not.
+
+The manifest is rewritten after every phase with what has been uploaded so
+far. Files above MULTIPART_THRESHOLD go up in parallel parts; their md5 is
+kept in the manifest even though S3 reports a multipart ETag.
+
+Usage:
+    python scripts/s3_upload.py                        # upload $STAC_OUTPUT_DIR
+    python scripts/s3_upload.py --dryrun               # print the plan only
+    python scripts/s3_upload.py --manifest-from-bucket # seed the manifest from one listing
+    python scripts/s3_upload.py --endpoint-url http://127.0.0.1:5000 --bucket s3://test
+                                                       # local stand-in (moto server, MinIO)
+
+Env: STAC_OUTPUT_DIR (local catalog dir), STAC_S3_BUCKET (default s3://stac-dem-bc)
+
+Exit codes: 0 = uploaded (or nothing to do), 1 = bad input or failed uploads.
+"""
+
+import argparse
+import concurrent.futures
+import csv
+import hashlib
+import logging
+import os
+import sys
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from tqdm import tqdm
+
+from stac_utils import get_output_dir
+
+logger = logging.getLogger(__name__)
+
+PATH_S3_MANIFEST = "data/s3_manifest.csv"
+BUCKET_DEFAULT = "s3://stac-dem-bc"
+MULTIPART_THRESHOLD = 64 * 1024 * 1024
+CONTENT_TYPES = {
+    ".json": "application/json",
+    ".txt": "text/plain",
+    ".gz": "application/gzip",
+}
+PHASES = ["items", "nts years", "nts blocks", "collection"]
+
+
+# =============================================================================
+# Manifest
+# =============================================================================
+
+def bucket_parse(uri: str) -> tuple[str, str]:
+    """s3://bucket/prefix → (bucket, "prefix/") ("" for the bucket root)."""
+    bucket, _, prefix = uri.removeprefix("s3://").strip("/").partition("/")
+    return bucket, f"{prefix}/" if prefix else ""
+
+
+def manifest_read(path: str) -> dict[str, tuple[str, int]]:
+    """{key: (md5, size)} of the last publish ({} if there is no manifest)."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, newline="") as f:
+        return {row["key"]: (row["md5"], int(row["size"])) for row in csv.DictReader(f)}
+
+
+def manifest_write(path: str, entries: dict[str, tuple[str, int]]):
+    """Write the manifest sorted by key, atomically."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(["key", "md5", "size"])
+        writer.writerows((key, md5, size) for key, (md5, size) in sorted(entries.items()))
+    os.replace(tmp_path, path)
+
+
+def manifest_from_bucket(client, bucket: str, prefix: str) -> dict[str, tuple[str, int]]:
+    """Manifest entries from one bucket listing.
+
+    Multipart objects (ETag "<md5>-<parts>") get an empty md5, so the next
+    upload re-sends them once and records their real md5.
+    """
+    entries = {}
+    paginator = client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get("Contents", []):
+            etag = obj["ETag"].strip('"')
+            entries[obj["Key"]] = ("" if "-" in etag else etag, obj["Size"])
+    return entries
+
+
+# =============================================================================
+# Planning
+# =============================================================================
+
+def tree_scan(path_local: str, prefix: str = "") -> dict[str, dict]:
+    """{key: {path, md5, size}} for every publishable file under path_local.
+
+    Skips dotfiles and dot directories (e.g. .item_hashes.csv) and .tmp
+    leftovers, like s3_sync-ci.sh's excludes.
+    """
+    tree = {}
+    for root, dirs, files in os.walk(path_local):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in sorted(files):
+            if name.startswith(".") or name.endswith(".tmp"):
+                continue
+            path = os.path.join(root, name)
+            md5 = hashlib.md5(usedforsecurity=False)
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    md5.update(chunk)
+            key = prefix + os.path.relpath(path, path_local).replace(os.sep, "/")
+            tree[key] = {"path": path, "md5": md5.hexdigest(), "size": os.path.getsize(path)}
+    return tree
+
+
+def upload_phase(key: str, prefix: str = "") -> int:
+    """Index into PHASES: objects are uploaded before anything linking to them."""
+    parts = key[len(prefix):].split("/")
+    if parts == ["collection.json"]:
+        return 3
+    if parts[0] == "nts" and parts[-1] == "catalog.json":
+        return 1 if len(parts) == 4 else 2
+    return 0
+
+
+def upload_plan(tree: dict[str, dict], published: dict[str, tuple[str, int]],
+                prefix: str = "") -> list[list[str]]:
+    """Keys to upload, grouped by phase: new keys and keys whose md5 or size changed."""
+    plan = [[] for _ in PHASES]
+    for key, entry in sorted(tree.items()):
+        if published.get(key) != (entry["md5"], entry["size"]):
+            plan[upload_phase(key, prefix)].append(key)
+    return plan
+
+
+# =============================================================================
+# Upload
+# =============================================================================
+
+def upload_phase_run(client, bucket: str, keys: list[str], tree: dict[str, dict],
+                     workers: int, desc: str) -> list[str]:
+    """Upload keys in parallel → the keys that failed."""
+    config = TransferConfig(multipart_threshold=MULTIPART_THRESHOLD)
+
+    def upload(key):
+        extra = {}
+        content_type = CONTENT_TYPES.get(os.path.splitext(key)[1])
+        if content_type:
+            extra["ContentType"] = content_type
+        client.upload_file(tree[key]["path"], bucket, key, ExtraArgs=extra, Config=config)
+
+    failed = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(upload, key): key for key in keys}
+        for future in tqdm(concurrent.futures.as_completed(futures), total=len(futures), desc=desc):
+            try:
+                future.result()
+            except Exception as e:
+                logger.error("Upload failed for %s: %s", futures[future], e)
+                failed.append(futures[future])
+    return failed
+
+
+# =============================================================================
+# Main
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Upload changed catalog files to S3 from a content-hash manifest")
+    parser.add_argument("--src", help="Local catalog directory (default: the output directory)")
+    parser.add_argument("--bucket", default=os.environ.get("STAC_S3_BUCKET", BUCKET_DEFAULT),
+                        help=f"Target s3://bucket[/prefix] (default: $STAC_S3_BUCKET or {BUCKET_DEFAULT})")
+    parser.add_argument("--manifest", default=PATH_S3_MANIFEST,
+                        help=f"Published-objects manifest (default: {PATH_S3_MANIFEST})")
+    parser.add_argument("--manifest-from-bucket", action="store_true",
+                        help="Rebuild the manifest from a bucket listing, then plan against it")
+    parser.add_argument("--endpoint-url", help="S3 endpoint (e.g. a local moto server or MinIO)")
+    parser.add_argument("--workers", type=int, default=16, help="Parallel uploads (default: 16)")
+    parser.add_argument("--dryrun", action="store_true", help="Print the plan, upload nothing")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s",
+                        datefmt="%H:%M:%S")
+
+    path_local = args.src or get_output_dir(test_only=False)
+    if not os.path.isfile(os.path.join(path_local, "collection.json")):
+        logger.error("collection.json missing in %s", path_local)
+        return 1
+    bucket, prefix = bucket_parse(args.bucket)
+    client = boto3.client("s3", endpoint_url=args.endpoint_url,
+                          config=Config(max_pool_connections=args.workers))
+
+    if args.manifest_from_bucket:
+        published = manifest_from_bucket(client, bucket, prefix)
+        if not args.dryrun:
+            manifest_write(args.manifest, published)
+        logger.info("Manifest rebuilt from s3://%s/%s: %d objects", bucket, prefix, len(published))
+    else:
+        published = manifest_read(args.manifest)
+        logger.info("Manifest %s: %d published objects", args.manifest, len(published))
+
+    tree = tree_scan(path_local, prefix)
+    plan = upload_plan(tree, published, prefix)
+    n_upload = sum(len(keys) for keys in plan)
+    logger.info("%d local files, %d to upload (%s), %d unchanged", len(tree), n_upload,
+                ", ".join(f"{len(keys)} {phase}" for phase, keys in zip(PHASES, plan)),
+                len(tree) - n_upload)
+
+    if args.dryrun:
+        for phase, keys in zip(PHASES, plan):
+            for key in keys:
+                print(f"(dryrun) upload [{phase}] {tree[key]['path']} -> s3://{bucket}/{key}")
+        return 0
+
+    for phase, keys in zip(PHASES, plan):
+        if not keys:
+            continue
+        failed = upload_phase_run(client, bucket, keys, tree, args.workers, f"Uploading {phase}")
+        for key in set(keys) - set(failed):
+            published[key] = (tree[key]["md5"], tree[key]["size"])
+        manifest_write(args.manifest, published)
+        if failed:
+            # Later phases link to these; stop before publishing the links
+            logger.error("%d %s uploads failed, skipping later phases", len(failed), phase)
+            return 1
+
+    logger.info("Upload complete: %d objects to s3://%s/%s", n_upload, bucket, prefix)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
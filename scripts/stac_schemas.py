@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Compiled STAC item validators built from a vendored copy of the JSON schemas.
+
+pystac's item.validate() looks up the core item schema and each extension
+schema on every call and builds a fresh jsonschema validator for each one.
+Anything pystac doesn't bundle, such as the projection extension, is
+fetched over the network. Here the schemas come from scripts/schemas/, a
+mirror of the schema URLs laid out as <host>/<path>. Each schema is read
+once per process and compiled once per URI, then applied directly to the
+raw item dict. No pystac.Item is built.
+
+Schemas are compiled with fastjsonschema when it is installed.
+fastjsonschema generates Python code and resolves every $ref at compile
+time. If a schema won't compile that way (or fastjsonschema is missing),
+it falls back to a jsonschema Draft7Validator over a local registry,
+which resolves refs lazily. Failures are always described by jsonschema,
+whose messages point at the offending field.
+
+A schema whose $ref closure is not fully vendored is fetched (once per
+process, with a warning) and compiled the same way. If a fetch fails,
+every item using that schema fails with a STACValidationError naming the
+missing URI, so --engine schema only works offline once the mirror holds
+every schema the items use.
+
+The core and GeoJSON schemas are pystac's bundled copies and the PROJJSON
+schema is PROJ's. The projection extension schema is not committed; only
+files downloaded from their canonical URL belong in the mirror. Refresh
+the mirror (everything the item and extension schemas $ref, recursively)
+with:
+
+    python scripts/stac_schemas.py --vendor
+
+Used by:
+- item_validate.py (--engine schema)
+"""
+
+import argparse
+import functools
+import json
+import logging
+import os
+import sys
+import urllib.parse
+
+import pystac
+import requests
+from jsonschema import Draft7Validator
+from jsonschema.exceptions import best_match
+from pystac.errors import STACValidationError
+from referencing import Registry, Resource
+
+try:
+    import fastjsonschema
+except ImportError:
+    fastjsonschema = None
+
+logger = logging.getLogger(__name__)
+
+SCHEMAS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schemas")
+ITEM_SCHEMA_URI = "https://schemas.stacspec.org/v{version}/item-spec/json-schema/item.json"
+
+
+def schema_path(uri: str) -> str:
+    """Vendored file for a schema URI: SCHEMAS_DIR/<host>/<path>."""
+    parsed = urllib.parse.urlsplit(uri)
+    return os.path.join(SCHEMAS_DIR, parsed.netloc, *parsed.path.lstrip("/").split("/"))
+
+
+@functools.lru_cache(maxsize=None)
+def schema_load(uri: str) -> dict:
+    """Read a vendored schema (fragment ignored); FileNotFoundError if not vendored."""
+    with open(schema_path(uri.split("#")[0])) as f:
+        return json.load(f)
+
+
+@functools.lru_cache(maxsize=None)
+def schema_fetch(uri: str, timeout: int = 30) -> dict:
+    """Vendored schema, else download it (once per process); STACValidationError naming uri if both fail."""
+    try:
+        return schema_load(uri)
+    except FileNotFoundError:
+        pass
+    try:
+        response = requests.get(uri.split("#")[0], timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+    except (requests.RequestException, ValueError) as e:
+        raise STACValidationError(
+            f"schema {uri} is not vendored and could not be fetched ({e}); "
+            f"run scripts/stac_schemas.py --vendor") from None
+
+
+def schema_missing(uri: str, load=schema_load) -> str | None:
+    """First schema in uri's $ref closure that load can't provide (None if all are).
+
+    load is schema_load (vendored only) or schema_fetch, which raise
+    FileNotFoundError and STACValidationError respectively.
+    """
+    pending, seen = [uri.split("#")[0]], set()
+    while pending:
+        ref = pending.pop()
+        if ref in seen:
+            continue
+        seen.add(ref)
+        try:
+            schema = load(ref)
+        except (FileNotFoundError, STACValidationError):
+            return ref
+        pending.extend(_schema_refs(schema, schema.get("$id", ref)) - seen)
+    return None
+
+
+def item_schema_uris(item_dict: dict) -> list[str]:
+    """The core item schema for the item's stac_version, then its stac_extensions."""
+    if not isinstance(item_dict, dict) or "stac_version" not in item_dict:
+        raise STACValidationError("Item has no stac_version")
+    return [ITEM_SCHEMA_URI.format(version=item_dict["stac_version"]),
+            *item_dict.get("stac_extensions", [])]
+
+
+class ItemSchemaValidator:
+    """Validate raw item dicts against vendored schemas, compiling each schema once."""
+
+    def __init__(self):
+        self._validators = {}
+        self._explainers = {}
+        self.engines = {}
+
+    def _compile(self, uri: str):
+        """Compiled check for uri: item_dict → True if valid.
+
+        If uri or anything it $refs is neither vendored nor fetchable, the
+        check raises STACValidationError naming the missing schema. It is
+        cached like any other, so nothing is retried for every item.
+        """
+        missing = schema_missing(uri)
+        if missing is not None:
+            unreachable = schema_missing(uri, load=schema_fetch)
+            if unreachable is not None:
+                self.engines[uri] = "missing"
+                message = (f"{uri}: schema {unreachable} is not vendored and could not be fetched "
+                           f"(run scripts/stac_schemas.py --vendor)")
+
+                def unavailable(item_dict):
+                    raise STACValidationError(message)
+
+                return unavailable
+            logger.warning("%s is not vendored, fetched it (run scripts/stac_schemas.py --vendor)", missing)
+        if fastjsonschema is not None:
+            try:
+                # use_default=False: don't fill schema defaults into the item
+                validate = fastjsonschema.compile(
+                    schema_fetch(uri), handlers={"https": schema_fetch, "http": schema_fetch},
+                    use_default=False)
+                self.engines[uri] = "fastjsonschema"
+
+                def check(item_dict):
+                    try:
+                        validate(item_dict)
+                    except fastjsonschema.JsonSchemaValueException:
+                        return False
+                    return True
+
+                return check
+            except Exception as e:
+                logger.info("fastjsonschema can't compile %s (%s), using jsonschema", uri, e)
+
+        self.engines[uri] = "jsonschema"
+        return self._explainer(uri).is_valid
+
+    def _explainer(self, uri: str) -> Draft7Validator:
+        """jsonschema validator for uri; also used to describe failures (fastjsonschema's oneOf errors say little)."""
+        if uri not in self._explainers:
+            registry = Registry(retrieve=lambda ref: Resource.from_contents(schema_fetch(ref)))
+            self._explainers[uri] = Draft7Validator(schema_fetch(uri), registry=registry)
+        return self._explainers[uri]
+
+    def validate(self, item_dict: dict) -> None:
+        """Raise STACValidationError on the first schema the item fails."""
+        for uri in item_schema_uris(item_dict):
+            if uri not in self._validators:
+                self._validators[uri] = self._compile(uri)
+            if not self._validators[uri](item_dict):
+                error = best_match(self._explainer(uri).iter_errors(item_dict))
+                where = "/".join(map(str, error.absolute_path)) if error is not None else ""
+                raise STACValidationError(
+                    f"{uri}: {where or '<item>'}: {error.message if error is not None else 'invalid'}")
+
+
+@functools.lru_cache(maxsize=None)
+def item_validator() -> ItemSchemaValidator:
+    """Per-process ItemSchemaValidator (compiled validators are reused across items)."""
+    return ItemSchemaValidator()
+
+
+def _schema_refs(node, base: str) -> set[str]:
+    """Absolute URIs (no fragment) of every non-local $ref in a schema."""
+    refs = set()
+    if isinstance(node, dict):
+        ref = node.get("$ref")
+        if isinstance(ref, str) and not ref.startswith("#"):
+            refs.add(urllib.parse.urljoin(base, ref).split("#")[0])
+        for value in node.values():
+            refs |= _schema_refs(value, base)
+    elif isinstance(node, list):
+        for value in node:
+            refs |= _schema_refs(value, base)
+    return refs
+
+
+def vendor(uris: list[str], timeout: int = 30) -> list[str]:
+    """Download uris and every schema they $ref (recursively) into SCHEMAS_DIR; return the URIs written."""
+    pending, seen = list(uris), set()
+    session = requests.Session()
+    while pending:
+        uri = pending.pop()
+        if uri in seen:
+            continue
+        seen.add(uri)
+        response = session.get(uri, timeout=timeout)
+        response.raise_for_status()
+        schema = response.json()
+        path = schema_path(uri)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(schema, f, indent=2)
+            f.write("\n")
+        logger.info("Vendored %s", uri)
+        pending.extend(_schema_refs(schema, schema.get("$id", uri)) - seen)
+    return sorted(seen)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vendor the STAC item schemas used by item_validate.py")
+    parser.add_argument("--vendor", action="store_true",
+                        help=f"Download the item and extension schemas (and their $refs) into {SCHEMAS_DIR}")
+    parser.add_argument("--stac-version", default=pystac.get_stac_version(),
+                        help="STAC version of the core item schema (default: pystac's)")
+    parser.add_argument("--extension", action="append",
+                        help="Extension schema URI (repeatable; default: the projection extension items use)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s",
+                        datefmt="%Y-%m-%d %H:%M:%S")
+
+    if not args.vendor:
+        parser.print_help()
+        return 1
+
+    from stac_utils import PROJECTION_EXTENSION
+
+    roots = [ITEM_SCHEMA_URI.format(version=args.stac_version), *(args.extension or [PROJECTION_EXTENSION])]
+    written = vendor(roots)
+    logger.info("Vendored %d schemas into %s", len(written), SCHEMAS_DIR)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,15 +12,18 @@ import json
 import logging
 import os
 import re
+import threading
 from datetime import datetime, timezone
 
+import numpy as np
 import pystac
 import rasterio
 import rasterio.warp
 import requests
-from rio_cogeo.cogeo import cog_validate
 from shapely.geometry import box, mapping
 
+from geotiff_header import header_read
+
 logger = logging.getLogger(__name__)
 
 
@@ -52,6 +55,68 @@ def get_output_dir(test_only: bool) -> str:
     return "/Users/airvine/Projects/gis/stac_dem_bc/stac/prod/stac_dem_bc"
 
 
+# =============================================================================
+# GDAL Configuration
+# =============================================================================
+
+# Named GDAL config profiles applied around /vsicurl/ metadata reads
+# (item_create.py --gdal-profile). Measure with scripts/benchmark_extract.py.
+GDAL_PROFILES = {
+    # GDAL defaults: HEAD for the file size, a directory listing and
+    # .aux/.xml sidecar probes on every open, then a 16 KB initial read
+    "default": {},
+    # Single remote GeoTIFF, header only: no listing or sidecar probes, no
+    # HEAD, one larger initial read so IFDs + tag arrays arrive together
+    "header": {
+        "GDAL_DISABLE_READDIR_ON_OPEN": "EMPTY_DIR",
+        "CPL_VSIL_CURL_ALLOWED_EXTENSIONS": ".tif",
+        "CPL_VSIL_CURL_USE_HEAD": "NO",
+        "GDAL_INGESTED_BYTES_AT_OPEN": 65536,
+        "GDAL_HTTP_MULTIPLEX": "YES",
+        "GDAL_HTTP_VERSION": "2",
+        "GDAL_HTTP_MERGE_CONSECUTIVE_RANGES": "YES",
+        "VSI_CACHE": "TRUE",
+        "VSI_CACHE_SIZE": 1_000_000,
+        "CPL_VSIL_CURL_CACHE_SIZE": 64_000_000,
+    },
+}
+
+
+def gdal_env(profile: str = "default", **options) -> rasterio.Env:
+    """rasterio.Env for a named GDAL_PROFILES entry (extra options override)."""
+    if profile not in GDAL_PROFILES:
+        raise ValueError(f"Unknown GDAL profile {profile!r}, expected one of {sorted(GDAL_PROFILES)}")
+    return rasterio.Env(**{**GDAL_PROFILES[profile], **options})
+
+
+class GdalRequestCounter(logging.Handler):
+    """Count the HTTP requests GDAL's /vsicurl/ issues, from its debug log.
+
+    GDAL reports every request under CPL_DEBUG=ON (file size probes, range
+    downloads, directory listings); rasterio forwards those messages to the
+    rasterio._env logger, where this handler tallies them. Attach with
+    attach(), run reads inside gdal_env(..., CPL_DEBUG="ON"), then read
+    .count.
+    """
+
+    _MARKERS = ("VSICURL: GetFileSize(", "VSICURL: Downloading ", "VSICURL: GetFileList(")
+
+    def __init__(self):
+        super().__init__(level=logging.DEBUG)
+        self.count = 0
+
+    def emit(self, record: logging.LogRecord):
+        message = record.getMessage()
+        if any(marker in message for marker in self._MARKERS):
+            self.count += 1
+
+    def attach(self):
+        gdal_logger = logging.getLogger("rasterio._env")
+        gdal_logger.addHandler(self)
+        gdal_logger.setLevel(logging.DEBUG)
+        return self
+
+
 # =============================================================================
 # Date Extraction
 # =============================================================================
@@ -104,28 +169,165 @@ def datetime_parse_item(s: str | None) -> datetime | None:
 # GeoTIFF Validation
 # =============================================================================
 
-def geotiff_extract_metadata(url: str) -> dict:
+def cog_validate_dataset(src: rasterio.io.DatasetReader) -> tuple[bool, list[str], list[str]]:
+    """Validate COG layout on an already-open rasterio dataset.
+
+    Mirrors rio_cogeo.cogeo.cog_validate check for check, but reads IFD and
+    block offsets from the open handle instead of reopening the file.
+    cog_validate opens the source once plus once per overview level — each a
+    fresh /vsicurl/ round trip on top of the metadata read.
+
+    Overview tiling is inferred from the TIFF block offsets (a second block
+    column means tiles). Only an overview with a single block column is
+    ambiguous, and only that case reopens at OVERVIEW_LEVEL.
+
+    Returns (is_valid, errors, warnings) like cog_validate (non-strict).
+    """
+    errors = []
+    warnings = []
+
+    if src.driver != "GTiff":
+        return False, ["The file is not a GeoTIFF"], warnings
+
+    if any(os.path.splitext(f)[1].lower() == ".ovr" for f in src.files):
+        errors.append("Overviews found in external .ovr file. They should be internal")
+
+    overviews = src.overviews(1)
+    if src.width > 512 or src.height > 512:
+        if src.block_shapes and src.block_shapes[0][1] == src.width:
+            errors.append("The file is greater than 512xH or 512xW, but is not tiled")
+        if not overviews:
+            warnings.append("The file is greater than 512xH or 512xW, it is recommended "
+                            "to include internal overviews")
+
+    ifd_offsets = [int(src.get_tag_item("IFD_OFFSET", "TIFF", bidx=1))]
+    if ifd_offsets[0] > 300:
+        errors.append(f"The offset of the main IFD should be < 300. It is {ifd_offsets[0]} instead")
+
+    ghost_headers = src.get_tag_item("GDAL_STRUCTURAL_METADATA", "TIFF")
+    if ghost_headers is not None and "KNOWN_INCOMPATIBLE_EDITION=YES" in ghost_headers:
+        errors.append("This file used to have optimizations in its layout, but those have "
+                      "been, at least partly, invalidated by later changes")
+
+    if overviews and overviews != sorted(overviews):
+        errors.append("Overviews should be sorted")
+
+    for ix, dec in enumerate(overviews):
+        if not dec > 1:
+            errors.append(f"Invalid Decimation {dec} for overview level {ix}")
+        ifd_offsets.append(int(src.get_tag_item("IFD_OFFSET", "TIFF", bidx=1, ovr=ix)))
+        if ifd_offsets[-1] < ifd_offsets[-2]:
+            previous = "the one of the main image" if ix == 0 else f"the one of index {ix - 1}"
+            errors.append(f"The offset of the IFD for overview of index {ix} is {ifd_offsets[-1]}, "
+                          f"whereas it should be greater than {previous}, "
+                          f"which is at byte {ifd_offsets[-2]}")
+
+    # First non-empty block of each level (same block walk as cog_validate)
+    block_size = src.block_shapes[0]
+    level_shapes = [(None, src.width, src.height)] + [
+        (ix, src.width // dec, src.height // dec) for ix, dec in enumerate(overviews)
+    ]
+    data_offsets = []
+    for ix, level_width, level_height in level_shapes:
+        yblocks = (level_height + block_size[1] - 1) // block_size[1]
+        xblocks = (level_width + block_size[0] - 1) // block_size[0]
+        offset = next(
+            (o for o in (_block_offset(src, x, y, ix)
+                         for y in range(yblocks) for x in range(xblocks)) if o > 0),
+            None,
+        )
+        if offset is not None:
+            data_offsets.append(offset)
+
+    if data_offsets and data_offsets[-1] < ifd_offsets[-1]:
+        if overviews:
+            errors.append("The offset of the first block of the smallest overview "
+                          "should be after its IFD")
+        else:
+            errors.append("The offset of the first block of the image should be after its IFD")
+
+    for i in range(len(data_offsets) - 2, 0, -1):
+        if data_offsets[i] < data_offsets[i + 1]:
+            errors.append(f"The offset of the first block of overview of index {i - 1} "
+                          f"should be after the one of the overview of index {i}")
+
+    if len(data_offsets) >= 2 and data_offsets[0] < data_offsets[1]:
+        errors.append("The offset of the first block of the main resolution image should "
+                      f"be after the one of the overview of index {len(overviews) - 1}")
+
+    for ix, dec in enumerate(overviews):
+        if _overview_is_stripped(src, ix, dec):
+            errors.append(f"Overview of index {ix} is not tiled")
+
+    return not errors, errors, warnings
+
+
+def _block_offset(src: rasterio.io.DatasetReader, x: int, y: int, ovr: int | None = None) -> int:
+    """Byte offset of block (x, y) of band 1, 0 when absent or sparse."""
+    offset = src.get_tag_item(f"BLOCK_OFFSET_{x}_{y}", "TIFF", bidx=1, ovr=ovr)
+    return int(offset) if offset is not None else 0
+
+
+def _overview_is_stripped(src: rasterio.io.DatasetReader, ix: int, dec: int) -> bool:
+    """True when a > 512px overview is stored in strips rather than tiles."""
+    ovr_width = -(-src.width // dec)
+    ovr_height = -(-src.height // dec)
+    if ovr_width <= 512 and ovr_height <= 512:
+        return False
+    # Strips are one block wide, so a second block column means tiles
+    if src.get_tag_item("BLOCK_OFFSET_1_0", "TIFF", bidx=1, ovr=ix) is not None:
+        return False
+    with rasterio.open(src.name, OVERVIEW_LEVEL=ix) as ovr_src:
+        return bool(ovr_src.block_shapes) and ovr_src.block_shapes[0][1] == ovr_src.width
+
+
+def metadata_from_header(url: str, header: dict) -> dict:
+    """Cache record for a GeoTIFF decoded by geotiff_header.header_parse."""
+    return {
+        "url": url,
+        "is_geotiff": True,
+        "is_cog": header["is_cog"],
+        "epsg": header["epsg"],
+        "height": header["height"],
+        "width": header["width"],
+        "transform": json.dumps(header["transform"]),
+        "bounds": json.dumps(header["bounds"]),
+    }
+
+
+def geotiff_extract_metadata(url: str, fast: bool = True, gdal_profile: str = "default") -> dict:
     """Extract spatial metadata and validate GeoTIFF/COG status.
 
-    Opens the remote GeoTIFF via /vsicurl/ to extract CRS, bounds, shape, and
-    transform, then validates COG status (second remote read via cog_validate).
-    All metadata needed for STAC item creation is cached so subsequent builds
-    skip remote reads entirely.
+    With fast=True the header is first read with a plain HTTP Range request
+    and parsed in Python (geotiff_header.header_read) — no GDAL. When that
+    parser cannot decide, the remote GeoTIFF is opened via /vsicurl/ once,
+    under the named GDAL_PROFILES entry, and both the spatial metadata (CRS,
+    bounds, shape, transform) and the COG verdict come from the same handle
+    (see cog_validate_dataset). All metadata needed for STAC item creation
+    is cached so subsequent builds skip remote reads entirely.
 
     Returns dict with url, is_geotiff, is_cog, epsg, height, width, transform, bounds.
     """
     gdal_url = encode_url_for_gdal(fix_url(url))
     vsicurl_path = f"/vsicurl/{gdal_url}"
 
+    if fast:
+        try:
+            header = header_read(gdal_url)
+            if header is not None:
+                return metadata_from_header(url, header)
+            logger.debug("Fast header parse undecided for %s, opening with rasterio", url)
+        except Exception as e:
+            logger.debug("Fast header parse failed for %s (%s), opening with rasterio", url, e)
+
     try:
-        with rasterio.open(vsicurl_path) as src:
+        with gdal_env(gdal_profile), rasterio.open(vsicurl_path) as src:
             epsg = src.crs.to_epsg() if src.crs else None
             height = src.height
             width = src.width
             transform = list(src.transform)[:6]
             bounds = list(src.bounds)
-
-        is_valid, _, _ = cog_validate(vsicurl_path, quiet=True)
+            is_valid, _, _ = cog_validate_dataset(src)
 
         return {
             "url": url,
@@ -155,6 +357,41 @@ def geotiff_extract_metadata(url: str) -> dict:
 # STAC Item Creation from Cache
 # =============================================================================
 
+PROJECTION_EXTENSION = "https://stac-extensions.github.io/projection/v1.1.0/schema.json"
+BBOX_DENSIFY_PTS = 21  # rasterio.warp.transform_bounds default
+
+
+def bounds_to_wgs84(epsg: int, bounds: np.ndarray, densify_pts: int = BBOX_DENSIFY_PTS) -> np.ndarray:
+    """WGS84 bboxes for many native-CRS bounds sharing one EPSG code.
+
+    Vectorized rasterio.warp.transform_bounds: every edge is densified with
+    the same points GDAL's OCTTransformBounds uses, and all boxes go through
+    a single rasterio.warp.transform call (one CRS lookup, one transformer).
+
+    bounds is an (n, 4) array of [left, bottom, right, top]; returns (n, 4)
+    [west, south, east, north]. Rows that don't reproject cleanly (non-finite
+    points, antimeridian or pole cases) are NaN — use transform_bounds for those.
+    """
+    side_pts = densify_pts + 1
+    steps = np.arange(side_pts)
+    left, bottom, right, top = (bounds[:, i:i + 1] for i in range(4))
+    delta_x = (right - left) / side_pts
+    delta_y = (top - bottom) / side_pts
+    ones = np.ones(side_pts)
+    # Edge order as in OCTTransformBounds: xmin, ymin, xmax, ymax
+    xs = np.hstack([left * ones, left + steps * delta_x, right * ones, right - steps * delta_x])
+    ys = np.hstack([top - steps * delta_y, bottom * ones, bottom + steps * delta_y, top * ones])
+
+    lon, lat = rasterio.warp.transform(f"EPSG:{epsg}", "EPSG:4326", xs.ravel(), ys.ravel())
+    lon = np.asarray(lon).reshape(xs.shape)
+    lat = np.asarray(lat).reshape(ys.shape)
+
+    bbox = np.column_stack([lon.min(axis=1), lat.min(axis=1), lon.max(axis=1), lat.max(axis=1)])
+    bad = ~(np.isfinite(lon).all(axis=1) & np.isfinite(lat).all(axis=1)) | (bbox[:, 2] - bbox[:, 0] > 180)
+    bbox[bad] = np.nan
+    return bbox
+
+
 def item_create_from_cache(
     url: str,
     item_id: str,
@@ -167,8 +404,9 @@ def item_create_from_cache(
     """Build a pystac.Item from cached metadata without any remote file access.
 
     Uses cached CRS, bounds, shape, and transform to construct the item geometry
-    and proj extension fields. WGS84 bbox/geometry computed locally via
-    rasterio.warp.transform_bounds.
+    and proj extension fields. WGS84 bbox/geometry come from metadata["bbox"]
+    when precomputed in batch (MetadataLookup.bbox_prepare), otherwise are
+    computed locally via rasterio.warp.transform_bounds.
     """
     epsg = metadata["epsg"]
     height = metadata["height"]
@@ -178,9 +416,12 @@ def item_create_from_cache(
 
     # Native CRS bounds → WGS84 bbox
     left, bottom, right, top = bounds
-    w, s, e, n = rasterio.warp.transform_bounds(
-        f"EPSG:{epsg}", "EPSG:4326", left, bottom, right, top
-    )
+    if metadata.get("bbox") is not None:
+        w, s, e, n = metadata["bbox"]
+    else:
+        w, s, e, n = rasterio.warp.transform_bounds(
+            f"EPSG:{epsg}", "EPSG:4326", left, bottom, right, top
+        )
     bbox = [w, s, e, n]
     geometry = mapping(box(w, s, e, n))
 
@@ -205,9 +446,7 @@ def item_create_from_cache(
         bbox=bbox,
         datetime=item_datetime,
         properties=properties,
-        stac_extensions=[
-            "https://stac-extensions.github.io/projection/v1.1.0/schema.json"
-        ],
+        stac_extensions=[PROJECTION_EXTENSION],
     )
 
     item.add_link(pystac.Link(
@@ -229,32 +468,103 @@ def item_create_from_cache(
     return item
 
 
+def item_dict_from_cache(
+    url: str,
+    item_id: str,
+    metadata: dict,
+    collection_id: str,
+    collection_url: str,
+    media_type: str,
+    item_datetime: datetime,
+    datetime_unknown: bool = False,
+) -> dict:
+    """Item JSON dict from cached metadata, without building pystac objects.
+
+    Same content and key order as item_create_from_cache(...).to_dict() with
+    include_self_link=False (pystac writes properties["datetime"] last), so
+    serializing it with pystac's StacIO gives the same bytes as save_object.
+    """
+    transform = json.loads(metadata["transform"]) if isinstance(metadata["transform"], str) else metadata["transform"]
+    left, bottom, right, top = json.loads(metadata["bounds"]) if isinstance(metadata["bounds"], str) else metadata["bounds"]
+    if metadata.get("bbox") is not None:
+        w, s, e, n = metadata["bbox"]
+    else:
+        w, s, e, n = rasterio.warp.transform_bounds(
+            f"EPSG:{metadata['epsg']}", "EPSG:4326", left, bottom, right, top
+        )
+
+    properties = {
+        "proj:epsg": metadata["epsg"],
+        "proj:geometry": _box_geometry(left, bottom, right, top),
+        "proj:bbox": [left, bottom, right, top],
+        "proj:shape": [metadata["height"], metadata["width"]],
+        "proj:transform": transform + [0.0, 0.0, 1.0],
+    }
+    if datetime_unknown:
+        properties["datetime_unknown"] = True
+    properties["datetime"] = pystac.utils.datetime_to_str(item_datetime)
+
+    return {
+        "type": "Feature",
+        "stac_version": pystac.get_stac_version(),
+        "stac_extensions": [PROJECTION_EXTENSION],
+        "id": item_id,
+        "geometry": _box_geometry(w, s, e, n),
+        "bbox": [w, s, e, n],
+        "properties": properties,
+        "links": [{"rel": "collection", "href": collection_url, "type": "application/json"}],
+        "assets": {"image": {"href": fix_url(url), "type": media_type, "roles": ["data"]}},
+        "collection": collection_id,
+    }
+
+
+def _box_geometry(minx: float, miny: float, maxx: float, maxy: float) -> dict:
+    """mapping(shapely.box(...)) as a plain dict (counter-clockwise from (maxx, miny))."""
+    return {
+        "type": "Polygon",
+        "coordinates": [[[maxx, miny], [maxx, maxy], [minx, maxy], [minx, miny], [maxx, miny]]],
+    }
+
+
 # =============================================================================
 # URL Helpers
 # =============================================================================
 
-def check_url_accessible(url: str, timeout: int = 10) -> dict:
+_local = threading.local()
+
+
+def _http_session() -> requests.Session:
+    """Per-thread keep-alive session (requests.Session is not thread-safe)."""
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+    return _local.session
+
+
+def url_access_result(url: str, status_code: int | None, error: str = "") -> dict:
+    """Access check record: url, status_code, accessible, error, last_checked."""
+    return {
+        "url": url,
+        "status_code": status_code,
+        "accessible": status_code == 200,
+        "error": error,
+        "last_checked": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def check_url_accessible(url: str, timeout: int = 10, session: requests.Session | None = None) -> dict:
     """Check if a URL is accessible via HTTP HEAD request.
 
+    Requests go over a per-thread keep-alive session unless one is given,
+    so repeated checks against one host reuse its connections.
+
     Returns dict with url, status_code, accessible, error, last_checked.
     """
+    session = session or _http_session()
     try:
-        resp = requests.head(url, timeout=timeout, allow_redirects=True)
-        return {
-            "url": url,
-            "status_code": resp.status_code,
-            "accessible": resp.status_code == 200,
-            "error": "" if resp.status_code == 200 else resp.reason,
-            "last_checked": datetime.now(timezone.utc).isoformat(),
-        }
+        resp = session.head(url, timeout=timeout, allow_redirects=True)
+        return url_access_result(url, resp.status_code, "" if resp.status_code == 200 else resp.reason)
     except requests.RequestException as e:
-        return {
-            "url": url,
-            "status_code": None,
-            "accessible": False,
-            "error": str(e),
-            "last_checked": datetime.now(timezone.utc).isoformat(),
-        }
+        return url_access_result(url, None, str(e))
 
 
 def fix_url(url: str) -> str:
@@ -4,10 +4,16 @@
 Performs HTTP HEAD requests against source URLs to detect permission issues
 (e.g., 403 Forbidden). Produces a CSV report shareable with GeoBC.
 
+Checks run on the asyncio engine by default (urls_check_async.py): pooled
+keep-alive connections, --concurrency requests in flight, retries with
+jittered backoff on transient 5xx/timeouts and an optional per-host rate
+limit. --engine thread runs check_url_accessible in a thread pool instead.
+
 Usage:
     python scripts/urls_check_access.py                              # Check new URLs only
     python scripts/urls_check_access.py --urls-file data/urls_list.txt  # Specify URL file
     python scripts/urls_check_access.py --recheck                    # Re-check all URLs
+    python scripts/urls_check_access.py --recheck --concurrency 128 --rate-limit 200
 """
 
 import argparse
@@ -19,6 +25,7 @@ import pandas as pd
 from tqdm import tqdm
 
 from stac_utils import check_url_accessible, fix_url
+from urls_check_async import urls_check_batch
 
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
 logger = logging.getLogger(__name__)
@@ -36,9 +43,25 @@ def main():
         "--recheck", action="store_true",
         help="Re-check all URLs, ignoring cache",
     )
+    parser.add_argument(
+        "--engine", choices=["thread", "async"], default="async",
+        help="Check engine (default: async)",
+    )
     parser.add_argument(
         "--workers", type=int, default=16,
-        help="Number of parallel workers (default: 16)",
+        help="Number of parallel workers for --engine thread (default: 16)",
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=64,
+        help="Max in-flight requests for --engine async (default: 64)",
+    )
+    parser.add_argument(
+        "--rate-limit", type=float, default=0.0,
+        help="Max requests/second per host for --engine async (default: 0 = unlimited)",
+    )
+    parser.add_argument(
+        "--retries", type=int, default=3,
+        help="Retries of transient failures (5xx, timeouts) for --engine async (default: 3)",
     )
     parser.add_argument(
         "--timeout", type=int, default=10,
@@ -80,16 +103,28 @@ def main():
         sys.exit(0)
 
     # Run checks in parallel
-    def _check(url):
-        return check_url_accessible(url, timeout=args.timeout)
-
-    logger.info("Checking %d URLs with %d workers...", len(urls_to_check), args.workers)
-    with concurrent.futures.ThreadPoolExecutor(max_workers=args.workers) as executor:
-        results = list(tqdm(
-            executor.map(_check, urls_to_check),
-            total=len(urls_to_check),
-            desc="Checking URLs",
-        ))
+    if args.engine == "async":
+        logger.info("Checking %d URLs (engine=async, concurrency %d)...", len(urls_to_check), args.concurrency)
+        with tqdm(total=len(urls_to_check), desc="Checking URLs") as progress:
+            results = urls_check_batch(
+                urls_to_check,
+                concurrency=args.concurrency,
+                rate_limit=args.rate_limit,
+                retries=args.retries,
+                timeout=args.timeout,
+                on_result=lambda record: progress.update(),
+            )
+    else:
+        def _check(url):
+            return check_url_accessible(url, timeout=args.timeout)
+
+        logger.info("Checking %d URLs with %d workers...", len(urls_to_check), args.workers)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=args.workers) as executor:
+            results = list(tqdm(
+                executor.map(_check, urls_to_check),
+                total=len(urls_to_check),
+                desc="Checking URLs",
+            ))
 
     # Combine with cache and save
     df_new = pd.DataFrame(results)
@@ -0,0 +1,121 @@
+"""
+asyncio URL access checker.
+
+Runs check_url_accessible's HEAD requests over one pooled keep-alive
+connection set (aiohttp) instead of a thread pool, so each objectstore
+connection's TCP and TLS handshake is paid once and then reused for
+thousands of checks. As in extract_async.py, a fixed set of workers pulls
+URLs from a shared iterator, so at most `concurrency` requests are in
+flight, and an optional per-host rate limit spaces request starts.
+
+Transient failures are retried with full-jitter exponential backoff.
+These are the statuses in RETRY_STATUSES, timeouts and dropped
+connections. A 403 or 404 is an answer and is not retried. Any other
+exception (e.g. a malformed URL) becomes that URL's error record, so one
+bad line can't abort the batch.
+
+aiohttp speaks HTTP/1.1 only. For HEADs, keep-alive already removes the
+per-request handshake, which is most of what HTTP/2 multiplexing would
+save.
+
+Records have the same shape as check_url_accessible's.
+
+Used by:
+- urls_check_access.py (--engine async)
+- benchmark_url_check.py
+"""
+
+import asyncio
+import logging
+import random
+from collections.abc import Callable
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from extract_async import RateLimiter
+from stac_utils import url_access_result
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+BACKOFF_MAX = 30.0
+
+
+def backoff_delay(attempt: int, base: float, cap: float = BACKOFF_MAX) -> float:
+    """Full-jitter backoff before retry number attempt + 1: uniform(0, min(cap, base * 2**attempt))."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+async def url_check_async(session: aiohttp.ClientSession, url: str, limiter: RateLimiter,
+                          retries: int = 3, backoff: float = 0.5) -> dict:
+    """HEAD url (following redirects), retrying transient failures up to retries times."""
+    attempt = 0
+    while True:
+        await limiter.acquire()
+        transient = False
+        try:
+            async with session.head(url, allow_redirects=True) as resp:
+                status, error = resp.status, "" if resp.status == 200 else (resp.reason or "")
+            transient = status in RETRY_STATUSES
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            status, error, transient = None, str(e) or type(e).__name__, True
+        except aiohttp.ClientError as e:
+            status, error = None, str(e) or type(e).__name__
+        except Exception as e:
+            # e.g. ValueError for a malformed line: record it, don't abort the batch
+            status, error = None, f"{type(e).__name__}: {e}"
+        if not transient or attempt >= retries:
+            return url_access_result(url, status, error)
+        logger.debug("Retrying %s after %s", url, status or error)
+        await asyncio.sleep(backoff_delay(attempt, backoff))
+        attempt += 1
+
+
+def _host(url: str) -> str:
+    """Rate-limit key for url ("" if it doesn't parse; the HEAD records the error)."""
+    try:
+        return urlsplit(url).netloc
+    except Exception:
+        return ""
+
+
+async def _check_all(urls: list[str], concurrency: int, rate_limit: float, retries: int,
+                     backoff: float, timeout: int, on_result: Callable[[dict], None] | None) -> list[dict]:
+    results: list[dict | None] = [None] * len(urls)
+    pending = iter(enumerate(urls))
+    limiters: dict[str, RateLimiter] = {}
+
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=concurrency,
+                                     ttl_dns_cache=300, keepalive_timeout=60)
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+
+    async with aiohttp.ClientSession(connector=connector, timeout=client_timeout) as session:
+
+        async def worker():
+            for i, url in pending:
+                limiter = limiters.setdefault(_host(url), RateLimiter(rate_limit))
+                results[i] = await url_check_async(session, url, limiter, retries, backoff)
+                if on_result is not None:
+                    on_result(results[i])
+
+        await asyncio.gather(*(worker() for _ in range(min(concurrency, len(urls)))))
+
+    return results
+
+
+def urls_check_batch(urls: list[str], concurrency: int = 64, rate_limit: float = 0.0,
+                     retries: int = 3, backoff: float = 0.5, timeout: int = 10,
+                     on_result: Callable[[dict], None] | None = None) -> list[dict]:
+    """Check many URLs with the asyncio engine.
+
+    concurrency caps in-flight requests (and pooled connections); rate_limit
+    caps request starts per second per host (0 = unlimited), retries
+    included. timeout applies to each attempt. on_result is called with
+    each record as it completes (e.g. a progress bar update).
+
+    Returns records in input order, same shape as check_url_accessible.
+    """
+    if not urls:
+        return []
+    return asyncio.run(_check_all(urls, concurrency, rate_limit, retries, backoff, timeout, on_result))
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Item validation results (data/stac_item_validation.csv + .parquet).
+
+The CSV is the git ledger: one row per item, sorted by item_id, with only
+what describes the item's verdict — whether it is valid, the error, and
+the size and md5 of the bytes validated. It carries no machine-specific
+paths or mtimes, and an item revalidated with the same outcome keeps its
+row (including last_checked, the time the current verdict was recorded)
+as it was. A monthly commit therefore touches only the rows of items that
+were added, changed verdict or changed bytes.
+
+Runs work on a typed Parquet snapshot next to the CSV (gitignored), which
+also keeps each file's mtime_ns so unchanged items are recognized with a
+stat alone. Like the metadata cache it records the CSV it was built from
+and is rebuilt whenever the CSV changes (e.g. a git pull); mtimes are then
+unknown, and items are recognized by md5 instead.
+
+ValidationStore holds the columns as lists with an item_id → row index:
+upserts, deletes and mtime refreshes touch only their own rows, and the
+files are rewritten only if something changed.
+
+Usage:
+    python scripts/validation_store.py --migrate      # CSV → Parquet snapshot
+    python scripts/validation_store.py --export-csv   # rewrite the CSV in ledger form (sorted)
+
+Used by:
+- item_validate.py
+"""
+
+import argparse
+import csv
+import logging
+import os
+import sys
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+PATH_VALIDATION_CSV = "data/stac_item_validation.csv"
+PATH_VALIDATION_PARQUET = PATH_VALIDATION_CSV.removesuffix(".csv") + ".parquet"
+
+LEDGER_COLUMNS = ["item_id", "json_exists", "json_valid", "validation_error", "last_checked", "size", "md5"]
+# What a revalidation must change for the row (and its last_checked) to be rewritten
+VERDICT_COLUMNS = ["json_exists", "json_valid", "validation_error", "size", "md5"]
+
+VALIDATION_SCHEMA = pa.schema([
+    ("item_id", pa.string()),
+    ("json_exists", pa.bool_()),
+    ("json_valid", pa.bool_()),
+    ("validation_error", pa.string()),
+    ("last_checked", pa.string()),
+    ("size", pa.int64()),
+    ("md5", pa.string()),
+    # Local only (not in the CSV)
+    ("mtime_ns", pa.int64()),
+])
+COLUMNS = VALIDATION_SCHEMA.names
+
+
+def _source_stamp(path_csv: str) -> dict[bytes, bytes]:
+    stat = os.stat(path_csv)
+    return {b"source_size": str(stat.st_size).encode(), b"source_mtime_ns": str(stat.st_mtime_ns).encode()}
+
+
+def _csv_value(value) -> str:
+    if value is None:
+        return ""
+    return str(value)
+
+
+def ledger_read(path_csv: str) -> dict[str, list]:
+    """Columns from the ledger CSV, last row per item_id winning.
+
+    Also reads results written before the ledger form (absolute item_path,
+    no size/md5, unsorted): extra columns are dropped, missing ones are null.
+    """
+    rows = {}
+    with open(path_csv, newline="") as f:
+        for row in csv.DictReader(f):
+            rows[row["item_id"]] = row
+    columns = {col: [] for col in COLUMNS}
+    for row in rows.values():
+        columns["item_id"].append(row["item_id"])
+        columns["json_exists"].append(row.get("json_exists", "").lower() == "true")
+        columns["json_valid"].append(row.get("json_valid", "").lower() == "true")
+        columns["validation_error"].append(row.get("validation_error") or None)
+        columns["last_checked"].append(row.get("last_checked") or None)
+        columns["size"].append(int(row["size"]) if row.get("size") else None)
+        columns["md5"].append(row.get("md5") or None)
+        columns["mtime_ns"].append(None)
+    return columns
+
+
+class ValidationStore:
+    """Validation results keyed by item_id, held column-wise."""
+
+    def __init__(self, columns: dict[str, list], path_csv: str = PATH_VALIDATION_CSV,
+                 path_parquet: str = PATH_VALIDATION_PARQUET):
+        self.path_csv = path_csv
+        self.path_parquet = path_parquet
+        self.columns = columns
+        self.index = {item_id: i for i, item_id in enumerate(columns["item_id"])}
+        self.deleted: set[int] = set()
+        self.ledger_dirty = False
+        self.local_dirty = False
+
+    @classmethod
+    def load(cls, path_csv: str = PATH_VALIDATION_CSV, path_parquet: str | None = None) -> "ValidationStore":
+        """Load the snapshot, rebuilding it from the CSV when stale; empty if there is no CSV."""
+        if path_parquet is None:
+            path_parquet = path_csv.removesuffix(".csv") + ".parquet"
+        if not os.path.exists(path_csv):
+            return cls({col: [] for col in COLUMNS}, path_csv, path_parquet)
+        if os.path.exists(path_parquet):
+            metadata = pq.read_schema(path_parquet).metadata or {}
+            if all(metadata.get(k) == v for k, v in _source_stamp(path_csv).items()):
+                table = pq.read_table(path_parquet)
+                return cls({col: table.column(col).to_pylist() for col in COLUMNS}, path_csv, path_parquet)
+            logger.info("%s changed since %s was built, migrating", path_csv, path_parquet)
+        store = cls(ledger_read(path_csv), path_csv, path_parquet)
+        store.local_dirty = True
+        return store
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self.index
+
+    def item_ids(self) -> set[str]:
+        return set(self.index)
+
+    def get(self, item_id: str) -> dict | None:
+        i = self.index.get(item_id)
+        if i is None:
+            return None
+        return {col: self.columns[col][i] for col in COLUMNS}
+
+    def upsert(self, result: dict):
+        """Insert or update an item's row from a validation result.
+
+        The row is left as it is (last_checked included) when the verdict
+        columns match; mtime_ns is refreshed either way.
+        """
+        i = self.index.get(result["item_id"])
+        if i is None:
+            self.index[result["item_id"]] = len(self.columns["item_id"])
+            for col in COLUMNS:
+                self.columns[col].append(result.get(col))
+            self.ledger_dirty = self.local_dirty = True
+            return
+        if any(self.columns[col][i] != result.get(col) for col in VERDICT_COLUMNS):
+            for col in LEDGER_COLUMNS:
+                self.columns[col][i] = result.get(col)
+            self.ledger_dirty = True
+        self.touch(result["item_id"], result.get("mtime_ns"))
+
+    def touch(self, item_id: str, mtime_ns: int | None):
+        """Record the mtime of an item whose bytes are unchanged (local snapshot only)."""
+        i = self.index[item_id]
+        if self.columns["mtime_ns"][i] != mtime_ns:
+            self.columns["mtime_ns"][i] = mtime_ns
+            self.local_dirty = True
+
+    def delete(self, item_ids) -> int:
+        """Drop rows for item_ids; returns how many existed."""
+        dropped = 0
+        for item_id in item_ids:
+            i = self.index.pop(item_id, None)
+            if i is not None:
+                self.deleted.add(i)
+                dropped += 1
+        if dropped:
+            self.ledger_dirty = self.local_dirty = True
+        return dropped
+
+    def invalid(self) -> list[tuple[str, str | None]]:
+        """(item_id, validation_error) of invalid items, sorted by item_id."""
+        valid, errors = self.columns["json_valid"], self.columns["validation_error"]
+        return sorted((item_id, errors[i]) for item_id, i in self.index.items() if not valid[i])
+
+    def valid_count(self) -> int:
+        valid = self.columns["json_valid"]
+        return sum(1 for i in self.index.values() if valid[i])
+
+    def table(self) -> pa.Table:
+        """Live rows sorted by item_id."""
+        order = [self.index[item_id] for item_id in sorted(self.index)]
+        return pa.table({col: [self.columns[col][i] for i in order] for col in COLUMNS},
+                        schema=VALIDATION_SCHEMA)
+
+    def save(self) -> bool:
+        """Write the ledger CSV (if any row changed) and the snapshot; returns whether the CSV was written."""
+        if not (self.ledger_dirty or self.local_dirty):
+            return False
+        table = self.table()
+        if self.ledger_dirty:
+            ledger_export_csv(table, self.path_csv)
+        tmp_path = f"{self.path_parquet}.tmp"
+        pq.write_table(table.replace_schema_metadata(_source_stamp(self.path_csv)), tmp_path)
+        os.replace(tmp_path, self.path_parquet)
+        written = self.ledger_dirty
+        self.ledger_dirty = self.local_dirty = False
+        return written
+
+
+def ledger_export_csv(table: pa.Table, path_csv: str = PATH_VALIDATION_CSV):
+    """Write results as the ledger CSV (LEDGER_COLUMNS, rows in table order)."""
+    os.makedirs(os.path.dirname(path_csv) or ".", exist_ok=True)
+    columns = [table.column(col).to_pylist() for col in LEDGER_COLUMNS]
+    tmp_path = f"{path_csv}.tmp"
+    with open(tmp_path, "w", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(LEDGER_COLUMNS)
+        for row in zip(*columns):
+            writer.writerow([_csv_value(value) for value in row])
+    os.replace(tmp_path, path_csv)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the item validation results")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--migrate", action="store_true", help="Rebuild the Parquet snapshot from the CSV")
+    group.add_argument("--export-csv", action="store_true", help="Rewrite the CSV in ledger form, sorted by item_id")
+    parser.add_argument("--csv", default=PATH_VALIDATION_CSV, help=f"Results CSV (default: {PATH_VALIDATION_CSV})")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s",
+                        datefmt="%H:%M:%S")
+
+    store = ValidationStore.load(args.csv)
+    if args.export_csv:
+        store.ledger_dirty = True
+    store.save()
+    logger.info("%d results in %s", len(store), args.csv if args.export_csv else store.path_parquet)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())